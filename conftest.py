@@ -0,0 +1 @@
+# lets the tests import the hodlem package from the project root
@@ -12,6 +12,9 @@
 # section 3.2
 
 GROUP_ORDER: constant(uint256) = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+FIELD_ORDER: constant(uint256) = 21888242871839275222246405745257275088696311157297823662689037894645226208583
+SQRT_EXPONENT: constant(uint256) = 5472060717959818805561601436314318772174077789324455915672259473661306552146 # (FIELD_ORDER + 1) / 4
+PARITY_BIT: constant(uint256) = 57896044618658097711785492504343953926634992332820282019728792003956564819968 # 2 ** 255
 
 # TODO: we inline these because of https://github.com/vyperlang/vyper/issues/3294
 # TODO: the SIZE is fixed, rather than using DynArrays, because of
@@ -37,14 +40,19 @@ struct CP:
   hx:  uint256[2] # h ** x
   p: Proof
 
+# points are stored compressed in one word: x, with the parity of y in PARITY_BIT
+# (x < 2 ** 254, and 0 is the point at infinity since no point on the curve has x = 0)
+
 struct DrawCard:
-  # successive decryptions
-  c: DynArray[uint256[2], 127]
-  # 1 + index of player the card is initially drawn to (i.e. they skip decryption)
+  # successive decryptions (compressed)
+  c: DynArray[uint256, 127]
+  # hand << 16 | opensAs << 8 | drawnTo, where
+  # hand is the deck's hand the card was drawn in (the card is undrawn in later hands,
+  #   and its decryptions stale, so resetShuffle need not clear them)
+  # drawnTo is 1 + index of player the card is initially drawn to (i.e. they skip decryption)
   # note: a card can only be drawn to a single player
-  drawnTo: uint256
-  # 1 + original index after reveal
-  opensAs: uint256
+  # opensAs is 1 + original index after reveal
+  drawn: uint256
 
 struct Deck:
   # authorised address for drawing cards and reshuffling
@@ -53,28 +61,47 @@ struct Deck:
   addrs: DynArray[address, 127]
   # shuffle[0] is the unencrypted cards (including base card at index 0)
   # shuffle[j+1] is the shuffled encrypted cards from player index j
-  shuffle: DynArray[uint256[2][53], 128] # 127 + 1] <- another Vyper bug with importing
+  # (compressed)
+  # in a hashed deck, only shuffle[0] and the final shuffle are stored, and the
+  # others are kept as digests and their base cards, with the cards in SubmitShuffle logs
+  shuffle: DynArray[uint256[53], 128] # 127 + 1] <- another Vyper bug with importing
+  hashed: bool
+  # in a hashed deck, the block from which this hand's SubmitShuffle logs are emitted
+  # (newDeck or the last resetShuffle), for clients to bound their log queries
+  logsFrom: uint256
+  digests: DynArray[bytes32, 127]
+  bases: DynArray[uint256, 127] # compressed
   challengeReq: DynArray[uint256, 127]
   challengeRes: DynArray[bytes32[2], 127]
   challengeRnd: DynArray[uint256, 127]
   # for decrypting shuffled cards
   # note: cards[i] corresponds to shuffle[_][i+1]
   cards: DrawCard[53]
+  # number of resetShuffle calls
+  hand: uint256
 
 decks: HashMap[uint256, Deck]
 nextId: uint256
 
+event SubmitShuffle:
+  id: indexed(uint256)
+  playerIdx: indexed(uint256)
+  cards: uint256[2][53]
+
 @external
-def newDeck(_players: uint256) -> uint256:
+def newDeck(_players: uint256, _hashed: bool = False) -> uint256:
   assert 0 < _players and _players <= MAX_PLAYERS, "invalid players"
   id: uint256 = self.nextId
   self.decks[id].dealer = msg.sender
+  if _hashed:
+    self.decks[id].hashed = True
+    self.decks[id].logsFrom = block.number
   for i in range(MAX_PLAYERS):
     if i == _players:
       break
     self.decks[id].addrs.append(msg.sender)
     self.decks[id].challengeRes.append(empty(bytes32[2]))
-  self.decks[id].shuffle.append(empty(uint256[2][SIZE+1]))
+  self.decks[id].shuffle.append(empty(uint256[SIZE+1]))
   self.nextId = unsafe_add(id, 1)
   return id
 
@@ -100,16 +127,16 @@ def submitPrep(_id: uint256, _playerIdx: uint256, _hash: bytes32):
 def finishSubmit(_id: uint256):
   numPlayers: uint256 = len(self.decks[_id].addrs)
   assert (len(self.decks[_id].challengeRnd) == 0 and
-          self.decks[_id].cards[0].drawnTo == 0), "already finished"
+          self.decks[_id].cards[0].drawn == 0), "already finished"
   for playerIdx in range(MAX_PLAYERS):
     if playerIdx == numPlayers: break
     assert self._hasSubmittedPrep(_id, playerIdx), "not submitted"
-  self.decks[_id].cards[0].drawnTo = 1
+  self.decks[_id].cards[0].drawn = 1
 
 @external
 def verifyPrep(_id: uint256, _playerIdx: uint256, _prep: CP[53]):
   assert self.decks[_id].addrs[_playerIdx] == msg.sender, "unauthorised"
-  assert self.decks[_id].cards[0].drawnTo == 1, "not submitted"
+  assert self.decks[_id].cards[0].drawn == 1, "not submitted"
   assert len(self.decks[_id].challengeRnd) == 0, "already finished"
   assert not self._hasVerifiedPrep(_id, _playerIdx), "already verified"
   hash: bytes32 = empty(bytes32)
@@ -125,38 +152,53 @@ def verifyPrep(_id: uint256, _playerIdx: uint256, _prep: CP[53]):
   self.decks[_id].challengeRes[_playerIdx][1] = convert(1, bytes32)
   for cardIdx in range(SIZE+1):
     assert self.chaumPederson(_prep[cardIdx]), "invalid prep"
-    self.decks[_id].shuffle[0][cardIdx] = ecadd(
-      self.decks[_id].shuffle[0][cardIdx], _prep[cardIdx].hx)
+    self.decks[_id].shuffle[0][cardIdx] = self.compress(ecadd(
+      self.decompress(self.decks[_id].shuffle[0][cardIdx]), _prep[cardIdx].hx))
 
 @external
 def finishPrep(_id: uint256):
   numPlayers: uint256 = len(self.decks[_id].addrs)
-  assert self.decks[_id].cards[0].drawnTo == 1, "not submitted"
+  assert self.decks[_id].cards[0].drawn == 1, "not submitted"
   assert len(self.decks[_id].challengeRnd) == 0, "already finished"
   for playerIdx in range(MAX_PLAYERS):
     if playerIdx == numPlayers: break
     assert self._hasVerifiedPrep(_id, playerIdx), "not finished"
     self.decks[_id].challengeRnd.append(0)
-  self.decks[_id].cards[0].drawnTo = empty(uint256)
+  self.decks[_id].cards[0].drawn = empty(uint256)
 
 @external
 def resetShuffle(_id: uint256):
   assert self.decks[_id].dealer == msg.sender, "unauthorised"
-  self.decks[_id].shuffle = [self.decks[_id].shuffle[0]]
+  # the cards drawn so far become stale rather than being cleared
+  self.decks[_id].hand = unsafe_add(self.decks[_id].hand, 1)
+  for _ in range(MAX_PLAYERS):
+    if len(self.decks[_id].shuffle) == 1: break
+    self.decks[_id].shuffle.pop()
+  if self.decks[_id].hashed:
+    self.decks[_id].logsFrom = block.number
+    self.decks[_id].digests = []
+    self.decks[_id].bases = []
   self.decks[_id].challengeReq = []
-  self.decks[_id].cards = empty(DrawCard[SIZE+1])
 
 @external
 def submitShuffle(_id: uint256, _playerIdx: uint256, _shuffle: uint256[2][53]):
   assert self.decks[_id].addrs[_playerIdx] == msg.sender, "unauthorised"
-  assert len(self.decks[_id].shuffle) == unsafe_add(_playerIdx, 1), "wrong player"
-  self.decks[_id].shuffle.append(_shuffle)
+  assert self._shuffleCount(_id) == _playerIdx, "wrong player"
+  if self.decks[_id].hashed:
+    self.decks[_id].digests.append(self.digest(_shuffle))
+    self.decks[_id].bases.append(self.compress(_shuffle[0]))
+    log SubmitShuffle(_id, _playerIdx, _shuffle)
+  if not self.decks[_id].hashed or unsafe_add(_playerIdx, 1) == len(self.decks[_id].addrs):
+    compressed: uint256[SIZE+1] = empty(uint256[SIZE+1])
+    for i in range(SIZE+1):
+      compressed[i] = self.compress(_shuffle[i])
+    self.decks[_id].shuffle.append(compressed)
   self.decks[_id].challengeReq.append(0)
   self.decks[_id].challengeRes[_playerIdx] = empty(bytes32[2])
 
 @external
 def challenge(_id: uint256, _playerIdx: uint256, _rounds: uint256):
-  assert _playerIdx + 1 < len(self.decks[_id].shuffle), "not submitted"
+  assert _playerIdx < self._shuffleCount(_id), "not submitted"
   assert self.decks[_id].challengeReq[_playerIdx] == 0, "ongoing challenge"
   assert 0 < _rounds and _rounds <= MAX_SECURITY, "invalid rounds"
   self.decks[_id].challengeReq[_playerIdx] = _rounds
@@ -173,7 +215,10 @@ def respondChallenge(_id: uint256, _playerIdx: uint256, _hash: bytes32) -> uint2
 
 @external
 def defuseNextChallenge(_id: uint256, _playerIdx: uint256,
-                        _commitment: uint256[2][53], _scalar: uint256, _permutation: uint256[53]):
+                        _commitment: uint256[2][53], _scalar: uint256, _permutation: uint256[53],
+                        _source: uint256[2][53] = empty(uint256[2][53])):
+  # _source: in a hashed deck, the challenged shuffle (this player's or the one before)
+  # unless that is shuffle[0] or the final shuffle
   assert self.decks[_id].addrs[_playerIdx] == msg.sender, "unauthorised"
   k: uint256 = self.decks[_id].challengeReq[_playerIdx]
   assert k != 0, "no challenge"
@@ -187,58 +232,134 @@ def defuseNextChallenge(_id: uint256, _playerIdx: uint256,
   bits: uint256 = self.decks[_id].challengeRnd[_playerIdx]
   self.decks[_id].challengeRnd[_playerIdx] = shift(bits, -1)
   j: uint256 = unsafe_add(_playerIdx, bits & 1)
+  if self.decks[_id].hashed and j != 0 and j != len(self.decks[_id].addrs):
+    assert self.digest(_source) == self.decks[_id].digests[unsafe_sub(j, 1)], "wrong source"
+    for i in range(SIZE+1):
+      assert self.pointEq(_commitment[i], ecmul(_source[_permutation[i]], _scalar)), "verification failed"
+    return
+  if j != 0 and self.decks[_id].hashed:
+    j = 1
   for i in range(SIZE+1):
     assert self.pointEq(
       _commitment[i],
-      ecmul(self.decks[_id].shuffle[j][_permutation[i]], _scalar)
+      ecmul(self.decompress(self.decks[_id].shuffle[j][_permutation[i]]), _scalar)
     ), "verification failed"
 
 @external
 def drawCard(_id: uint256, _playerIdx: uint256, _cardIdx: uint256):
   assert self.decks[_id].dealer == msg.sender, "unauthorised"
-  assert self.decks[_id].cards[_cardIdx].drawnTo == 0, "already drawn"
-  self.decks[_id].cards[_cardIdx].drawnTo = unsafe_add(_playerIdx, 1)
-  self.decks[_id].cards[_cardIdx].c.append(
-    self.decks[_id].shuffle[len(self.decks[_id].addrs)][unsafe_add(_cardIdx, 1)])
+  assert self.drawState(_id, _cardIdx) == 0, "already drawn"
+  self.decks[_id].cards[_cardIdx].drawn = shift(self.decks[_id].hand, 16) | unsafe_add(_playerIdx, 1)
+  self.decks[_id].cards[_cardIdx].c = [
+    self.decks[_id].shuffle[unsafe_sub(len(self.decks[_id].shuffle), 1)][unsafe_add(_cardIdx, 1)]]
 
 @external
 def decryptCard(_id: uint256, _playerIdx: uint256, _cardIdx: uint256,
                 _card: uint256[2], _proof: Proof):
   assert self.decks[_id].addrs[_playerIdx] == msg.sender, "unauthorised"
-  assert self.decks[_id].cards[_cardIdx].drawnTo != 0, "not drawn"
+  drawnTo: uint256 = self.drawState(_id, _cardIdx) & 255
+  assert drawnTo != 0, "not drawn"
   assert len(self.decks[_id].cards[_cardIdx].c) == unsafe_add(_playerIdx, 1), "out of turn"
-  if unsafe_add(_playerIdx, 1) == self.decks[_id].cards[_cardIdx].drawnTo:
-    assert self.pointEq(_card, self.decks[_id].cards[_cardIdx].c[_playerIdx]), "wrong card"
+  if unsafe_add(_playerIdx, 1) == drawnTo:
+    assert self.compress(_card) == self.decks[_id].cards[_cardIdx].c[_playerIdx], "wrong card"
   else:
     assert self.chaumPederson(CP({
-      g: self.decks[_id].shuffle[_playerIdx][0],
+      g: self.base(_id, _playerIdx),
       h: _card,
-      gx: self.decks[_id].shuffle[unsafe_add(_playerIdx, 1)][0],
-      hx: self.decks[_id].cards[_cardIdx].c[_playerIdx],
+      gx: self.base(_id, unsafe_add(_playerIdx, 1)),
+      hx: self.decompress(self.decks[_id].cards[_cardIdx].c[_playerIdx]),
       p: _proof})), "verification failed"
-  self.decks[_id].cards[_cardIdx].c.append(_card)
+  self.decks[_id].cards[_cardIdx].c.append(self.compress(_card))
 
 @external
 def openCard(_id: uint256, _playerIdx: uint256, _cardIdx: uint256,
              _openIdx: uint256, _proof: Proof):
   assert self.decks[_id].addrs[_playerIdx] == msg.sender, "unauthorised"
-  assert self.decks[_id].cards[_cardIdx].drawnTo == unsafe_add(_playerIdx, 1), "wrong player"
+  state: uint256 = self.drawState(_id, _cardIdx)
+  assert state & 255 == unsafe_add(_playerIdx, 1), "wrong player"
   assert len(self.decks[_id].cards[_cardIdx].c) == unsafe_add(
     len(self.decks[_id].addrs), 1), "not decrypted"
-  assert self.decks[_id].cards[_cardIdx].opensAs == 0, "already open"
+  assert shift(state, -8) == 0, "already open"
   assert self.chaumPederson(CP({
-    g: self.decks[_id].shuffle[_playerIdx][0],
-    h: self.decks[_id].shuffle[0][_openIdx],
-    gx: self.decks[_id].shuffle[unsafe_add(_playerIdx, 1)][0],
-    hx: self.decks[_id].cards[_cardIdx].c[len(self.decks[_id].addrs)],
+    g: self.base(_id, _playerIdx),
+    h: self.decompress(self.decks[_id].shuffle[0][_openIdx]),
+    gx: self.base(_id, unsafe_add(_playerIdx, 1)),
+    hx: self.decompress(self.decks[_id].cards[_cardIdx].c[len(self.decks[_id].addrs)]),
     p: _proof})), "verification failed"
-  self.decks[_id].cards[_cardIdx].opensAs = unsafe_add(_openIdx, 1)
+  self.decks[_id].cards[_cardIdx].drawn |= shift(unsafe_add(_openIdx, 1), 8)
 
 @internal
 @pure
 def pointEq(a: uint256[2], b: uint256[2]) -> bool:
   return a[0] == b[0] and a[1] == b[1]
 
+@internal
+@pure
+def compress(_p: uint256[2]) -> uint256:
+  if _p[0] == 0 and _p[1] == 0:
+    return 0
+  assert (_p[0] < FIELD_ORDER and _p[1] < FIELD_ORDER and
+          uint256_mulmod(_p[1], _p[1], FIELD_ORDER) == uint256_addmod(
+            uint256_mulmod(uint256_mulmod(_p[0], _p[0], FIELD_ORDER), _p[0], FIELD_ORDER), 3, FIELD_ORDER)
+         ), "invalid point"
+  return _p[0] | shift(_p[1] & 1, 255)
+
+@internal
+@view
+def decompress(_c: uint256) -> uint256[2]:
+  # only ever applied to stored points, which compress checked are on the curve
+  if _c == 0:
+    return empty(uint256[2])
+  x: uint256 = _c & unsafe_sub(PARITY_BIT, 1)
+  y2: uint256 = uint256_addmod(
+    uint256_mulmod(uint256_mulmod(x, x, FIELD_ORDER), x, FIELD_ORDER), 3, FIELD_ORDER)
+  # y = y2 ** ((FIELD_ORDER + 1) / 4), a square root since FIELD_ORDER % 4 == 3
+  y: uint256 = extract32(raw_call(
+    0x0000000000000000000000000000000000000005,
+    concat(convert(32, bytes32), convert(32, bytes32), convert(32, bytes32),
+           convert(y2, bytes32), convert(SQRT_EXPONENT, bytes32), convert(FIELD_ORDER, bytes32)),
+    max_outsize=32, is_static_call=True), 0, output_type=uint256)
+  if y & 1 != shift(_c, -255):
+    y = unsafe_sub(FIELD_ORDER, y)
+  return [x, y]
+
+@internal
+@pure
+def digest(_cards: uint256[2][53]) -> bytes32:
+  return sha256(_abi_encode(_cards))
+
+@internal
+@view
+def base(_id: uint256, _idx: uint256) -> uint256[2]:
+  # shuffle[_idx][0]
+  if _idx != 0 and self.decks[_id].hashed:
+    return self.decompress(self.decks[_id].bases[unsafe_sub(_idx, 1)])
+  return self.decompress(self.decks[_id].shuffle[_idx][0])
+
+@internal
+@view
+def drawState(_id: uint256, _cardIdx: uint256) -> uint256:
+  # opensAs << 8 | drawnTo for the current hand
+  drawn: uint256 = self.decks[_id].cards[_cardIdx].drawn
+  if shift(drawn, -16) != self.decks[_id].hand:
+    return 0
+  return drawn & 65535
+
+@internal
+@view
+def _decryptCount(_id: uint256, _cardIdx: uint256) -> uint256:
+  # 1 + decryptions (0 if undrawn)
+  if self.drawState(_id, _cardIdx) == 0:
+    return 0
+  return len(self.decks[_id].cards[_cardIdx].c)
+
+@internal
+@view
+def _shuffleCount(_id: uint256) -> uint256:
+  if self.decks[_id].hashed:
+    return len(self.decks[_id].digests)
+  return unsafe_sub(len(self.decks[_id].shuffle), 1)
+
 @internal
 @pure
 def hash(g: uint256[2], h: uint256[2],
@@ -300,17 +421,37 @@ def hasVerifiedPrep(_id: uint256, _playerIdx: uint256) -> bool:
 @external
 @view
 def allSubmittedPrep(_id: uint256) -> bool:
-  return self.decks[_id].cards[0].drawnTo == 1
+  return self.decks[_id].cards[0].drawn == 1
+
+@internal
+@view
+def decompressAll(_cards: uint256[53]) -> uint256[2][53]:
+  points: uint256[2][53] = empty(uint256[2][53])
+  for i in range(SIZE+1):
+    points[i] = self.decompress(_cards[i])
+  return points
+
+@external
+@view
+def hashed(_id: uint256) -> bool:
+  return self.decks[_id].hashed
+
+@external
+@view
+def logsFrom(_id: uint256) -> uint256:
+  return self.decks[_id].logsFrom
 
 @external
 @view
 def shuffleCount(_id: uint256) -> uint256:
-  return unsafe_sub(len(self.decks[_id].shuffle), 1)
+  return self._shuffleCount(_id)
 
 @external
 @view
 def lastShuffle(_id: uint256) -> uint256[2][53]:
-  return self.decks[_id].shuffle[unsafe_sub(len(self.decks[_id].shuffle), 1)]
+  assert (not self.decks[_id].hashed or self._shuffleCount(_id) == 0 or
+          self._shuffleCount(_id) == len(self.decks[_id].addrs)), "in SubmitShuffle logs"
+  return self.decompressAll(self.decks[_id].shuffle[unsafe_sub(len(self.decks[_id].shuffle), 1)])
 
 @external
 @view
@@ -325,25 +466,46 @@ def challengeRnd(_id: uint256, _playerIdx: uint256) -> uint256:
 @external
 @view
 def decryptCount(_id: uint256, _cardIdx: uint256) -> uint256:
-  return unsafe_sub(len(self.decks[_id].cards[_cardIdx].c), 1)
+  return unsafe_sub(self._decryptCount(_id, _cardIdx), 1)
+
+@internal
+@view
+def _lastDecrypt(_id: uint256, _cardIdx: uint256) -> uint256[2]:
+  return self.decompress(self.decks[_id].cards[_cardIdx].c[
+    unsafe_sub(self._decryptCount(_id, _cardIdx), 1)])
 
 @external
 @view
 def lastDecrypt(_id: uint256, _cardIdx: uint256) -> uint256[2]:
-  return self.decks[_id].cards[_cardIdx].c[
-    unsafe_sub(len(self.decks[_id].cards[_cardIdx].c), 1)]
+  return self._lastDecrypt(_id, _cardIdx)
+
+@external
+@view
+def lastDecrypts(_id: uint256, _cardIdxs: DynArray[uint256, 53]) -> DynArray[uint256[2], 53]:
+  points: DynArray[uint256[2], 53] = [] # SIZE+1
+  for cardIdx in _cardIdxs:
+    points.append(self._lastDecrypt(_id, cardIdx))
+  return points
 
 @external
 @view
 def shuffleBase(_id: uint256, _idx: uint256) -> uint256[2]:
-  return self.decks[_id].shuffle[_idx][0]
+  return self.base(_id, _idx)
+
+@external
+@view
+def shuffleBases(_id: uint256, _idxs: DynArray[uint256, 128]) -> DynArray[uint256[2], 128]:
+  points: DynArray[uint256[2], 128] = [] # MAX_PLAYERS+1
+  for idx in _idxs:
+    points.append(self.base(_id, idx))
+  return points
 
 @external
 @view
 def baseCards(_id: uint256) -> uint256[2][53]:
-  return self.decks[_id].shuffle[0]
+  return self.decompressAll(self.decks[_id].shuffle[0])
 
 @external
 @view
 def openedCard(_id: uint256, _cardIdx: uint256) -> uint256:
-  return self.decks[_id].cards[_cardIdx].opensAs
+  return shift(self.drawState(_id, _cardIdx), -8)
@@ -95,21 +95,85 @@ struct Game:
   actionIndex: uint256            # seat index of currently active player
   actionBlock: uint256            # block from which action was on the active player
 
-games: public(HashMap[uint256, Game])
+# a Game as stored, with the hole cards and the board packed into a word each
+struct PackedGame:
+  startBlock:  uint256            # block number when game started
+  stack:       uint256[MAX_SEATS] # stack at each seat (zero for eliminated or all-in players)
+  dealer:      uint256            # seat index of current dealer
+  hands:       uint256            # deck indices of hole cards, a byte each (2 per seat)
+  board:       uint256            # board cards, a byte each
+  bet:         uint256[MAX_SEATS] # current round bet of each player
+  betIndex:    uint256            # seat index of player who introduced the current bet
+  stopIndex:   uint256            # seat index of first player with no need to act this round
+  minRaise:    uint256            # size of the minimum raise
+  liveUntil:   uint256[MAX_SEATS] # index of first pot player is not live in
+  pot:         uint256[MAX_SEATS] # pot and side pots
+  numInHand:   uint256            # number of live players in this hand
+  untilPot:    uint256            # 1 + index of rightmost pot
+  actionIndex: uint256            # seat index of currently active player
+  actionBlock: uint256            # block from which action was on the active player
+
+packedGames: HashMap[uint256, PackedGame]
+
+# the parts of a table's config the game needs, cached from the Room when the game starts:
+# startsWith, untilLeft and the number of levels, a byte each, then levelBlocks and actBlocks,
+# 64 bits each (capped: a block count that large never runs out)
+configs: HashMap[uint256, uint256]
+MAX_BLOCKS: constant(uint256) = 2 ** 64 - 1
 
 PENDING_REVEAL: constant(uint256) = 53
 
+@internal
+@pure
+def byteAt(_bytes: uint256, _index: uint256) -> uint256:
+  return shift(_bytes, -convert(unsafe_mul(_index, 8), int128)) & 255
+
+@internal
+@pure
+def setByte(_bytes: uint256, _index: uint256, _value: uint256) -> uint256:
+  offset: int128 = convert(unsafe_mul(_index, 8), int128)
+  return (_bytes & ~shift(255, offset)) | shift(_value, offset)
+
+@internal
+@view
+def unpackGame(_tableId: uint256) -> Game:
+  game: PackedGame = self.packedGames[_tableId]
+  hands: uint256[2][MAX_SEATS] = empty(uint256[2][MAX_SEATS])
+  packed: uint256 = game.hands
+  for seatIndex in range(MAX_SEATS):
+    hands[seatIndex] = [packed & 255, shift(packed, -8) & 255]
+    packed = shift(packed, -16)
+  board: uint256[5] = empty(uint256[5])
+  packed = game.board
+  for boardIndex in range(5):
+    board[boardIndex] = packed & 255
+    packed = shift(packed, -8)
+  return Game({startBlock: game.startBlock, stack: game.stack, dealer: game.dealer,
+               hands: hands, board: board, bet: game.bet, betIndex: game.betIndex,
+               stopIndex: game.stopIndex, minRaise: game.minRaise, liveUntil: game.liveUntil,
+               pot: game.pot, numInHand: game.numInHand, untilPot: game.untilPot,
+               actionIndex: game.actionIndex, actionBlock: game.actionBlock})
+
+@external
+@view
+def games(_tableId: uint256) -> Game:
+  return self.unpackGame(_tableId)
+
 @external
 def afterShuffle(_tableId: uint256):
   assert T.address == msg.sender, "unauthorised"
-  if self.games[_tableId].startBlock == empty(uint256):
+  if self.packedGames[_tableId].startBlock == empty(uint256):
     self.dealHighCard(_tableId)
   else:
     self.dealHoleCards(_tableId)
 
 @internal
 def dealHighCard(_tableId: uint256):
-  numPlayers: uint256 = T.numPlayers(_tableId)
+  params: uint256[12] = T.configParams(_tableId)
+  numPlayers: uint256 = params[2]
+  self.configs[_tableId] = (
+    numPlayers | shift(params[3], 8) | shift(T.numLevels(_tableId), 16) |
+    shift(min(params[4], MAX_BLOCKS), 64) | shift(min(params[10], MAX_BLOCKS), 128))
   for seatIndex in range(MAX_SEATS):
     if seatIndex == numPlayers: break
     T.showCard(_tableId, T.dealTo(_tableId, seatIndex))
@@ -121,16 +185,19 @@ event DealRound:
 
 @internal
 def dealHoleCards(_tableId: uint256):
-  numPlayers: uint256 = T.numPlayers(_tableId)
+  numPlayers: uint256 = self.numPlayers(_tableId)
   log DealRound(_tableId, 1)
-  dealer: uint256 = self.games[_tableId].dealer
+  dealer: uint256 = self.packedGames[_tableId].dealer
   seatIndex: uint256 = dealer
+  hands: uint256 = 0
   for i in range(2):
     for _ in range(MAX_SEATS):
       seatIndex = self.roundNextActor(numPlayers, _tableId, seatIndex, dealer)
-      self.games[_tableId].hands[seatIndex][i] = T.dealTo(_tableId, seatIndex)
+      hands = self.setByte(hands, unsafe_add(unsafe_mul(seatIndex, 2), i),
+                           T.dealTo(_tableId, seatIndex))
       if seatIndex == dealer:
         break
+  self.packedGames[_tableId].hands = hands
   T.startDeal(_tableId, Phase_PLAY)
 
 event SelectDealer:
@@ -139,15 +206,16 @@ event SelectDealer:
 
 @internal
 def selectDealer(_tableId: uint256):
-  numPlayers: uint256 = T.numPlayers(_tableId)
+  numPlayers: uint256 = self.numPlayers(_tableId)
+  buyIn: uint256 = T.buyIn(_tableId)
   highestRank: uint256 = empty(uint256)
   highestSuit: uint256 = empty(uint256)
   highestCardSeatIndex: uint256 = empty(uint256)
   for seatIndex in range(MAX_PLAYERS):
     if seatIndex == numPlayers:
       break
-    self.games[_tableId].liveUntil[seatIndex] = 1
-    self.games[_tableId].stack[seatIndex] = T.buyIn(_tableId)
+    self.packedGames[_tableId].liveUntil[seatIndex] = 1
+    self.packedGames[_tableId].stack[seatIndex] = buyIn
     card: uint256 = unsafe_sub(T.cardAt(_tableId, seatIndex), 1)
     rank: uint256 = unsafe_add(card % 13, 1)
     suit: uint256 = unsafe_div(card, 13)
@@ -155,11 +223,11 @@ def selectDealer(_tableId: uint256):
       highestRank = rank
       highestSuit = suit
       highestCardSeatIndex = seatIndex
-  self.games[_tableId].untilPot = 1
-  self.games[_tableId].numInHand = numPlayers
-  self.games[_tableId].startBlock = block.number
+  self.packedGames[_tableId].untilPot = 1
+  self.packedGames[_tableId].numInHand = numPlayers
+  self.packedGames[_tableId].startBlock = block.number
   T.reshuffle(_tableId)
-  self.games[_tableId].dealer = highestCardSeatIndex
+  self.packedGames[_tableId].dealer = highestCardSeatIndex
   log SelectDealer(_tableId, highestCardSeatIndex)
 
 event PostBlind:
@@ -171,11 +239,11 @@ event PostBlind:
 @internal
 def postBlinds(_tableId: uint256):
   assert T.authorised(_tableId, Phase_PLAY), "unauthorised"
-  assert self.games[_tableId].startBlock != empty(uint256), "not started"
-  assert self.games[_tableId].board[0] == empty(uint256), "board not empty"
-  assert self.games[_tableId].actionBlock == empty(uint256), "already betting"
-  numPlayers: uint256 = T.numPlayers(_tableId)
-  dealer: uint256 = self.games[_tableId].dealer
+  assert self.packedGames[_tableId].startBlock != empty(uint256), "not started"
+  assert self.packedGames[_tableId].board == empty(uint256), "board not empty"
+  assert self.packedGames[_tableId].actionBlock == empty(uint256), "already betting"
+  numPlayers: uint256 = self.numPlayers(_tableId)
+  dealer: uint256 = self.packedGames[_tableId].dealer
   seatIndex: uint256 = self.roundNextActor(numPlayers, _tableId, dealer, dealer)
   blind: uint256 = self.smallBlind(_tableId)
   placed: uint256 = self.placeBet(_tableId, seatIndex, blind)
@@ -184,24 +252,24 @@ def postBlinds(_tableId: uint256):
   blind = unsafe_add(blind, blind)
   placed = self.placeBet(_tableId, seatIndex, blind)
   log PostBlind(_tableId, seatIndex, blind, placed)
-  self.games[_tableId].betIndex = seatIndex
-  self.games[_tableId].minRaise = blind
-  self.games[_tableId].actionIndex = self.roundNextActor(numPlayers, _tableId, seatIndex, seatIndex)
-  self.games[_tableId].stopIndex = self.games[_tableId].actionIndex
-  self.games[_tableId].actionBlock = block.number
+  self.packedGames[_tableId].betIndex = seatIndex
+  self.packedGames[_tableId].minRaise = blind
+  self.packedGames[_tableId].actionIndex = self.roundNextActor(numPlayers, _tableId, seatIndex, seatIndex)
+  self.packedGames[_tableId].stopIndex = self.packedGames[_tableId].actionIndex
+  self.packedGames[_tableId].actionBlock = block.number
 
 @internal
 def validateTurn(_tableId: uint256, _seatIndex: uint256, _phase: uint256 = Phase_PLAY):
   assert T.authorised(_tableId, _phase, _seatIndex, msg.sender), "unauthorised"
-  assert self.games[_tableId].actionBlock != empty(uint256), "not active"
-  assert self.games[_tableId].actionIndex == _seatIndex, "wrong turn"
+  assert self.packedGames[_tableId].actionBlock != empty(uint256), "not active"
+  assert self.packedGames[_tableId].actionIndex == _seatIndex, "wrong turn"
 
 @internal
 def removeFromPots(_tableId: uint256, _seatIndex: uint256):
-  self.games[_tableId].liveUntil[_seatIndex] = 0
-  assert self.games[_tableId].numInHand != 0, "TODO: internal consistency check removeFromPots"
-  self.games[_tableId].numInHand = unsafe_sub(
-    self.games[_tableId].numInHand, 1)
+  self.packedGames[_tableId].liveUntil[_seatIndex] = 0
+  assert self.packedGames[_tableId].numInHand != 0, "TODO: internal consistency check removeFromPots"
+  self.packedGames[_tableId].numInHand = unsafe_sub(
+    self.packedGames[_tableId].numInHand, 1)
 
 event Fold:
   table: indexed(uint256)
@@ -223,8 +291,8 @@ event CallBet:
 @external
 def callBet(_tableId: uint256, _seatIndex: uint256):
   self.validateTurn(_tableId, _seatIndex)
-  bet: uint256 = self.games[_tableId].bet[self.games[_tableId].betIndex]
-  raiseBy: uint256 = unsafe_sub(bet, self.games[_tableId].bet[_seatIndex])
+  bet: uint256 = self.packedGames[_tableId].bet[self.packedGames[_tableId].betIndex]
+  raiseBy: uint256 = unsafe_sub(bet, self.packedGames[_tableId].bet[_seatIndex])
   placed: uint256 = 0
   if 0 < raiseBy:
     placed = self.placeBet(_tableId, _seatIndex, raiseBy)
@@ -240,17 +308,17 @@ event RaiseBet:
 @external
 def raiseBet(_tableId: uint256, _seatIndex: uint256, _raiseTo: uint256):
   self.validateTurn(_tableId, _seatIndex)
-  bet: uint256 = self.games[_tableId].bet[self.games[_tableId].betIndex]
+  bet: uint256 = self.packedGames[_tableId].bet[self.packedGames[_tableId].betIndex]
   assert _raiseTo > bet, "not a bet/raise"
   raiseBy: uint256 = _raiseTo - bet
-  size: uint256 = _raiseTo - self.games[_tableId].bet[_seatIndex]
+  size: uint256 = _raiseTo - self.packedGames[_tableId].bet[_seatIndex]
   assert self.placeBet(_tableId, _seatIndex, size) == size, "size exceeds stack"
-  self.games[_tableId].betIndex = _seatIndex
-  self.games[_tableId].stopIndex = _seatIndex
-  if raiseBy >= self.games[_tableId].minRaise:
-    self.games[_tableId].minRaise = raiseBy
+  self.packedGames[_tableId].betIndex = _seatIndex
+  self.packedGames[_tableId].stopIndex = _seatIndex
+  if raiseBy >= self.packedGames[_tableId].minRaise:
+    self.packedGames[_tableId].minRaise = raiseBy
   else: # raising all-in
-    assert self.games[_tableId].stack[_seatIndex] == 0, "below minimum"
+    assert self.packedGames[_tableId].stack[_seatIndex] == 0, "below minimum"
   log RaiseBet(_tableId, _seatIndex, _raiseTo, size)
   self.afterAct(_tableId, _seatIndex)
 
@@ -258,30 +326,32 @@ def raiseBet(_tableId: uint256, _seatIndex: uint256, _raiseTo: uint256):
 def afterDeal(_tableId: uint256, _phase: uint256):
   assert T.address == msg.sender, "unauthorised"
   if _phase == Phase_PLAY:
-    if self.games[_tableId].startBlock == empty(uint256):
+    if self.packedGames[_tableId].startBlock == empty(uint256):
       self.selectDealer(_tableId)
-    elif self.games[_tableId].board[0] == empty(uint256):
-      if self.games[_tableId].actionBlock == empty(uint256):
+    elif self.packedGames[_tableId].board == empty(uint256):
+      if self.packedGames[_tableId].actionBlock == empty(uint256):
         self.postBlinds(_tableId)
       else:
         raise "internal consistency failure afterDeal play"
     else:
       # fill board with revealed cards
+      board: uint256 = self.packedGames[_tableId].board
       for boardIndex in range(5):
-        b: uint256 = self.games[_tableId].board[boardIndex]
+        b: uint256 = self.byteAt(board, boardIndex)
         if PENDING_REVEAL <= b:
           cardIndex: uint256 = unsafe_sub(b, PENDING_REVEAL)
-          self.games[_tableId].board[boardIndex] = T.cardAt(_tableId, cardIndex)
+          board = self.setByte(board, boardIndex, T.cardAt(_tableId, cardIndex))
         elif b == 0: break
-      if self.games[_tableId].actionBlock == empty(uint256):
+      self.packedGames[_tableId].board = board
+      if self.packedGames[_tableId].actionBlock == empty(uint256):
           # skip to showdown when all but at most one players are all-in
-          dealer: uint256 = self.games[_tableId].dealer
-          self.games[_tableId].actionIndex = dealer
+          dealer: uint256 = self.packedGames[_tableId].dealer
+          self.packedGames[_tableId].actionIndex = dealer
           self.afterAct(_tableId, dealer)
       else:
-        self.games[_tableId].actionBlock = block.number
+        self.packedGames[_tableId].actionBlock = block.number
   elif _phase == Phase_SHOW:
-    self.autoShow(T.numPlayers(_tableId), _tableId)
+    self.autoShow(self.numPlayers(_tableId), _tableId)
   else:
     raise "internal consistency failure afterDeal"
 
@@ -292,18 +362,19 @@ event Timeout:
 @external
 def actTimeout(_tableId: uint256):
   assert T.authorised(_tableId, Phase_PLAY), "unauthorised"
-  assert self.games[_tableId].actionBlock != empty(uint256), "not active"
-  assert block.number > (self.games[_tableId].actionBlock +
-                         T.actBlocks(_tableId)), "deadline not passed"
-  seatIndex: uint256 = self.games[_tableId].actionIndex
+  assert self.packedGames[_tableId].actionBlock != empty(uint256), "not active"
+  assert block.number > (self.packedGames[_tableId].actionBlock +
+                         shift(self.configs[_tableId], -128)), "deadline not passed"
+  seatIndex: uint256 = self.packedGames[_tableId].actionIndex
   self.removeFromPots(_tableId, seatIndex)
   log Timeout(_tableId, seatIndex)
   self.afterAct(_tableId, seatIndex)
 
 @internal
 def showHand(_tableId: uint256, _seatIndex: uint256):
-  T.showCard(_tableId, self.games[_tableId].hands[_seatIndex][0])
-  T.showCard(_tableId, self.games[_tableId].hands[_seatIndex][1])
+  hands: uint256 = self.packedGames[_tableId].hands
+  T.showCard(_tableId, self.byteAt(hands, unsafe_mul(_seatIndex, 2)))
+  T.showCard(_tableId, self.byteAt(hands, unsafe_add(unsafe_mul(_seatIndex, 2), 1)))
 
 @external
 def showCards(_tableId: uint256, _seatIndex: uint256, _data: uint256[7][2]):
@@ -316,7 +387,7 @@ def foldCards(_tableId: uint256, _seatIndex: uint256):
   self.validateTurn(_tableId, _seatIndex, Phase_SHOW)
   self.removeFromPots(_tableId, _seatIndex)
   log Fold(_tableId, _seatIndex)
-  self.autoShow(T.numPlayers(_tableId), _tableId)
+  self.autoShow(self.numPlayers(_tableId), _tableId)
 
 event ShowHand:
   table: indexed(uint256)
@@ -324,127 +395,149 @@ event ShowHand:
   rank: uint256
 
 @internal
-@view
-def hasCard(_tableId: uint256, _seatIndex: uint256, _suit: int128, _rank: uint256) -> bool:
-  for i in range(2):
-    card: uint256 = T.cardAt(_tableId, self.games[_tableId].hands[_seatIndex][i])
-    if self.rank(card) == _rank and self.suit(card) == _suit:
-      return True
-  return False
-
-@internal
-def decidePot(_numPlayers: uint256, _stopIndex: uint256,
-              _untilPot: uint256, _tableId: uint256) -> uint256:
-  bestHandRank: uint256 = 0
-  hand: uint256[7] = [self.games[_tableId].board[0],
-                      self.games[_tableId].board[1],
-                      self.games[_tableId].board[2],
-                      self.games[_tableId].board[3],
-                      self.games[_tableId].board[4],
-                      0, 0]
-  winners: DynArray[uint256, MAX_SEATS] = []
-  potIndex: uint256 = unsafe_sub(_untilPot, 1)
-  for contestantIndex in range(MAX_SEATS):
-    if contestantIndex == _numPlayers:
+def settlePots(_numPlayers: uint256, _tableId: uint256):
+  # settle every pot in one pass: the cards of each player still in the hand are
+  # read and ranked once, then each pot (rightmost first) goes to its best hands
+  board: uint256 = self.packedGames[_tableId].board
+  hands: uint256 = self.packedGames[_tableId].hands
+  hand: uint256[7] = [self.byteAt(board, 0), self.byteAt(board, 1), self.byteAt(board, 2),
+                      self.byteAt(board, 3), self.byteAt(board, 4), 0, 0]
+  liveUntil: uint256[MAX_SEATS] = empty(uint256[MAX_SEATS])
+  handRank: uint256[MAX_SEATS] = empty(uint256[MAX_SEATS])
+  oddChipKey: uint256[MAX_SEATS] = empty(uint256[MAX_SEATS])
+  # from the rightmost pot, even if everyone in it has since folded
+  untilPot: uint256 = self.packedGames[_tableId].untilPot
+  deckIndices: DynArray[uint256, 18] = [] # 2 * MAX_SEATS
+  for seatIndex in range(MAX_SEATS):
+    if seatIndex == _numPlayers:
       break
-    liveUntil: uint256 = self.games[_tableId].liveUntil[contestantIndex]
-    if liveUntil != _untilPot:
-      assert liveUntil < _untilPot, "TODO: internal consistency check showdown"
+    liveUntil[seatIndex] = self.packedGames[_tableId].liveUntil[seatIndex]
+    if liveUntil[seatIndex] == 0:
       continue
-    self.games[_tableId].liveUntil[contestantIndex] = potIndex
-    hand[5] = T.cardAt(_tableId, self.games[_tableId].hands[contestantIndex][0])
-    hand[6] = T.cardAt(_tableId, self.games[_tableId].hands[contestantIndex][1])
-    handRank: uint256 = self.bestHandRank(hand)
-    log ShowHand(_tableId, contestantIndex, handRank)
-    if bestHandRank < handRank:
-      winners = [contestantIndex]
-      bestHandRank = handRank
-    elif bestHandRank == handRank:
-      winners.append(contestantIndex)
-  share: uint256 = unsafe_div(self.games[_tableId].pot[potIndex], len(winners))
-  collections: uint256[MAX_SEATS] = empty(uint256[MAX_SEATS])
-  for winnerIndex in winners:
-    self.games[_tableId].pot[potIndex] = unsafe_sub(self.games[_tableId].pot[potIndex], share)
-    self.games[_tableId].stack[winnerIndex] = unsafe_add(self.games[_tableId].stack[winnerIndex], share)
-    collections[winnerIndex] = share
-  # odd chip(s) distributed according to overall card rank
-  if self.games[_tableId].pot[potIndex] != 0:
-    done: bool = False
-    for negRank in range(13):
-      rank: uint256 = unsafe_sub(12, negRank)
-      for negSuit in range(4):
-        suit: int128 = unsafe_sub(3, negSuit)
-        for winnerIndex in winners:
-          if self.hasCard(_tableId, winnerIndex, suit, rank):
-            self.games[_tableId].pot[potIndex] = unsafe_sub(self.games[_tableId].pot[potIndex], 1)
-            self.games[_tableId].stack[winnerIndex] = unsafe_add(self.games[_tableId].stack[winnerIndex], 1)
-            collections[winnerIndex] = unsafe_add(collections[winnerIndex], 1)
-            done = self.games[_tableId].pot[potIndex] == 0
-            if done: break
-        if done: break
-      if done: break
-  for winnerIndex in winners:
-    log CollectPot(_tableId, winnerIndex, collections[winnerIndex])
-  return potIndex
+    self.packedGames[_tableId].liveUntil[seatIndex] = 0
+    deckIndices.append(self.byteAt(hands, unsafe_mul(seatIndex, 2)))
+    deckIndices.append(self.byteAt(hands, unsafe_add(unsafe_mul(seatIndex, 2), 1)))
+  cards: DynArray[uint256, 18] = T.cardsAt(_tableId, deckIndices)
+  cardIndex: uint256 = 0
+  for seatIndex in range(MAX_SEATS):
+    if seatIndex == _numPlayers:
+      break
+    if liveUntil[seatIndex] == 0:
+      continue
+    hand[5] = cards[cardIndex]
+    hand[6] = cards[unsafe_add(cardIndex, 1)]
+    cardIndex = unsafe_add(cardIndex, 2)
+    handRank[seatIndex] = self.bestHandRank(hand)
+    log ShowHand(_tableId, seatIndex, handRank[seatIndex])
+    oddChipKey[seatIndex] = max(self.cardKey(hand[5]), self.cardKey(hand[6]))
+  won: uint256[MAX_SEATS] = empty(uint256[MAX_SEATS])
+  amount: uint256 = 0
+  for negPot in range(MAX_SEATS):
+    if negPot == untilPot:
+      break
+    potIndex: uint256 = unsafe_sub(unsafe_sub(untilPot, 1), negPot)
+    # a pot nobody is left in (its players folded) goes to the pot below
+    amount = unsafe_add(amount, self.packedGames[_tableId].pot[potIndex])
+    self.packedGames[_tableId].pot[potIndex] = empty(uint256)
+    bestHandRank: uint256 = 0
+    winners: DynArray[uint256, MAX_SEATS] = []
+    for seatIndex in range(MAX_SEATS):
+      if seatIndex == _numPlayers:
+        break
+      if potIndex < liveUntil[seatIndex]:
+        if bestHandRank < handRank[seatIndex]:
+          winners = [seatIndex]
+          bestHandRank = handRank[seatIndex]
+        elif bestHandRank == handRank[seatIndex]:
+          winners.append(seatIndex)
+    if len(winners) == 0:
+      continue
+    share: uint256 = unsafe_div(amount, len(winners))
+    collections: uint256[MAX_SEATS] = empty(uint256[MAX_SEATS])
+    for winnerIndex in winners:
+      collections[winnerIndex] = share
+    # odd chips, one each to the winners with the highest cards (by rank, then suit)
+    oddChips: uint256 = unsafe_sub(amount, unsafe_mul(share, len(winners)))
+    for _ in range(MAX_SEATS):
+      if oddChips == 0:
+        break
+      bestKey: uint256 = 0
+      oddIndex: uint256 = 0
+      for winnerIndex in winners:
+        if collections[winnerIndex] == share and bestKey < oddChipKey[winnerIndex]:
+          bestKey = oddChipKey[winnerIndex]
+          oddIndex = winnerIndex
+      collections[oddIndex] = unsafe_add(share, 1)
+      oddChips = unsafe_sub(oddChips, 1)
+    for winnerIndex in winners:
+      won[winnerIndex] = unsafe_add(won[winnerIndex], collections[winnerIndex])
+      log CollectPot(_tableId, winnerIndex, collections[winnerIndex])
+    amount = 0
+  for seatIndex in range(MAX_SEATS):
+    if seatIndex == _numPlayers:
+      break
+    if won[seatIndex] != 0:
+      self.packedGames[_tableId].stack[seatIndex] = unsafe_add(
+        self.packedGames[_tableId].stack[seatIndex], won[seatIndex])
 
 @internal
 def autoShow(_numPlayers: uint256, _tableId: uint256):
-  seatIndex: uint256 = self.games[_tableId].actionIndex
-  stopIndex: uint256 = self.games[_tableId].stopIndex
-  untilPot: uint256 = self.games[_tableId].untilPot
+  # going round from the last to act: show the hands of players all in up to the first
+  # other player still to show or fold, and pass the action to them
+  # settle once a whole round finds every hand shown
+  startIndex: uint256 = self.packedGames[_tableId].actionIndex
+  hands: uint256 = self.packedGames[_tableId].hands
+  shown: uint256 = T.cardsShown(_tableId)
+  seatIndex: uint256 = startIndex
   needDeal: bool = False
-  for _ in range(MAX_SEATS * MAX_SEATS):
-    seatIndex = self.nextInPot(_numPlayers, _tableId, seatIndex, stopIndex)
-    if seatIndex == stopIndex:
-      if not needDeal and (
-           self.games[_tableId].liveUntil[stopIndex] < untilPot or
-           T.cardShown(_tableId, self.games[_tableId].hands[stopIndex][0])):
-        untilPot = self.decidePot(_numPlayers, stopIndex, untilPot, _tableId)
-        if untilPot == 0:
-          if self.playersLeft(_numPlayers, _tableId) <= T.maxPlayers(_tableId):
-            self.gameOver(_numPlayers, _tableId)
-          else:
-            self.nextHand(_numPlayers, _tableId)
-          return
-        else:
-          self.games[_tableId].untilPot = untilPot
-          continue
-    if not T.cardShown(_tableId, self.games[_tableId].hands[seatIndex][0]):
-      if self.games[_tableId].stack[seatIndex] == 0:
+  needAction: bool = False
+  for _ in range(MAX_SEATS):
+    seatIndex = uint256_addmod(seatIndex, 1, _numPlayers)
+    if (self.packedGames[_tableId].liveUntil[seatIndex] != 0 and
+        shown & shift(1, convert(self.byteAt(hands, unsafe_mul(seatIndex, 2)), int128)) == 0):
+      if self.packedGames[_tableId].stack[seatIndex] == 0:
         self.showHand(_tableId, seatIndex)
         needDeal = True
-        if seatIndex == stopIndex: break
       else:
-        self.games[_tableId].actionIndex = seatIndex
-        self.games[_tableId].actionBlock = block.number
+        self.packedGames[_tableId].actionIndex = seatIndex
+        self.packedGames[_tableId].actionBlock = block.number
+        needAction = True
         break
+    if seatIndex == startIndex:
+      break
   if needDeal:
     T.startDeal(_tableId, Phase_SHOW)
+  elif not needAction:
+    self.settlePots(_numPlayers, _tableId)
+    if self.playersLeft(_numPlayers, _tableId) <= self.maxPlayers(_tableId):
+      self.gameOver(_numPlayers, _tableId)
+    else:
+      self.nextHand(_numPlayers, _tableId)
 
 @internal
 def nextHand(_numPlayers: uint256, _tableId: uint256):
-  self.games[_tableId].numInHand = 0
+  self.packedGames[_tableId].numInHand = 0
   for seatIndex in range(MAX_SEATS):
     if seatIndex == _numPlayers:
       break
-    if self.games[_tableId].stack[seatIndex] == empty(uint256):
+    if self.packedGames[_tableId].stack[seatIndex] == empty(uint256):
       T.eliminate(_tableId, seatIndex)
     else:
-      self.games[_tableId].numInHand = unsafe_add(
-        self.games[_tableId].numInHand, 1)
-      self.games[_tableId].liveUntil[seatIndex] = 1
-  self.games[_tableId].untilPot = 1
-  self.games[_tableId].board = empty(uint256[5])
+      self.packedGames[_tableId].numInHand = unsafe_add(
+        self.packedGames[_tableId].numInHand, 1)
+      self.packedGames[_tableId].liveUntil[seatIndex] = 1
+  self.packedGames[_tableId].untilPot = 1
+  self.packedGames[_tableId].board = empty(uint256)
   T.reshuffle(_tableId)
-  dealer: uint256 = self.games[_tableId].dealer
-  self.games[_tableId].dealer = self.roundNextActor(_numPlayers, _tableId, dealer, dealer)
-  self.games[_tableId].actionBlock = empty(uint256)
+  dealer: uint256 = self.packedGames[_tableId].dealer
+  self.packedGames[_tableId].dealer = self.roundNextActor(_numPlayers, _tableId, dealer, dealer)
+  self.packedGames[_tableId].actionBlock = empty(uint256)
 
 @internal
 @view
 def isAllIn(_gameId: uint256, _seatIndex: uint256) -> bool:
-  return (0 < self.games[_gameId].liveUntil[_seatIndex] and
-          self.games[_gameId].stack[_seatIndex] == 0)
+  return (0 < self.packedGames[_gameId].liveUntil[_seatIndex] and
+          self.packedGames[_gameId].stack[_seatIndex] == 0)
 
 @internal
 def collectPots(_numPlayers: uint256, _gameId: uint256):
@@ -452,7 +545,7 @@ def collectPots(_numPlayers: uint256, _gameId: uint256):
   for seatIndex in range(MAX_SEATS):
     if seatIndex == _numPlayers: break
     if self.isAllIn(_gameId, seatIndex):
-      potLimit = min(potLimit, self.games[_gameId].bet[seatIndex])
+      potLimit = min(potLimit, self.packedGames[_gameId].bet[seatIndex])
 
   potLiveUntil: uint256 = 0
   nextLiveUntil: uint256 = 1
@@ -463,16 +556,18 @@ def collectPots(_numPlayers: uint256, _gameId: uint256):
     collected: bool = False
     for seatIndex in range(MAX_SEATS):
       if seatIndex == _numPlayers: break
-      bet: uint256 = self.games[_gameId].bet[seatIndex]
+      bet: uint256 = self.packedGames[_gameId].bet[seatIndex]
       if 0 < bet:
         amount: uint256 = min(bet, potLimit)
         nextBet: uint256 = unsafe_sub(bet, amount)
-        self.games[_gameId].bet[seatIndex] = nextBet
-        self.games[_gameId].pot[potIndex] = unsafe_add(self.games[_gameId].pot[potIndex], amount)
+        self.packedGames[_gameId].bet[seatIndex] = nextBet
+        self.packedGames[_gameId].pot[potIndex] = unsafe_add(self.packedGames[_gameId].pot[potIndex], amount)
         collected = True
         if 0 < nextBet:
-          if self.games[_gameId].liveUntil[seatIndex] == potLiveUntil:
-            self.games[_gameId].liveUntil[seatIndex] = nextLiveUntil
+          if self.packedGames[_gameId].liveUntil[seatIndex] == potLiveUntil:
+            self.packedGames[_gameId].liveUntil[seatIndex] = nextLiveUntil
+            if self.packedGames[_gameId].untilPot < nextLiveUntil:
+              self.packedGames[_gameId].untilPot = nextLiveUntil
           if self.isAllIn(_gameId, seatIndex):
             nextPotLimit = min(nextPotLimit, nextBet)
     if not collected:
@@ -493,8 +588,9 @@ def settleUncontested(_numPlayers: uint256, _gameId: uint256) -> uint256:
   for seatIndex in range(MAX_SEATS):
     if seatIndex == _numPlayers:
       break
+    liveUntil: uint256 = self.packedGames[_gameId].liveUntil[seatIndex]
     for potIndex in range(MAX_SEATS):
-      if potIndex == self.games[_gameId].liveUntil[seatIndex]:
+      if potIndex == liveUntil:
         break
       potPlayers[potIndex] = unsafe_add(potPlayers[potIndex], 1)
       contestant[potIndex] = seatIndex
@@ -503,15 +599,15 @@ def settleUncontested(_numPlayers: uint256, _gameId: uint256) -> uint256:
       break
     elif potPlayers[potIndex] == 1:
       contestantIndex: uint256 = contestant[potIndex]
-      amount: uint256 = self.games[_gameId].pot[potIndex]
-      self.games[_gameId].stack[contestant[potIndex]] = unsafe_add(
-        self.games[_gameId].stack[contestant[potIndex]], amount)
-      self.games[_gameId].pot[potIndex] = empty(uint256)
+      amount: uint256 = self.packedGames[_gameId].pot[potIndex]
+      self.packedGames[_gameId].stack[contestant[potIndex]] = unsafe_add(
+        self.packedGames[_gameId].stack[contestant[potIndex]], amount)
+      self.packedGames[_gameId].pot[potIndex] = empty(uint256)
       log CollectPot(_gameId, contestantIndex, amount)
-      if potIndex < self.games[_gameId].liveUntil[contestantIndex]:
-        self.games[_gameId].liveUntil[contestantIndex] = potIndex
-      if potIndex < self.games[_gameId].untilPot:
-        self.games[_gameId].untilPot = potIndex
+      if potIndex < self.packedGames[_gameId].liveUntil[contestantIndex]:
+        self.packedGames[_gameId].liveUntil[contestantIndex] = potIndex
+      if potIndex < self.packedGames[_gameId].untilPot:
+        self.packedGames[_gameId].untilPot = potIndex
     else:
       numContested = unsafe_add(numContested, 1)
   return numContested
@@ -523,7 +619,7 @@ def playersLeft(_numPlayers: uint256, _gameId: uint256) -> uint256:
   for seatIndex in range(MAX_SEATS):
     if seatIndex == _numPlayers:
       break
-    if self.games[_gameId].stack[seatIndex] != empty(uint256):
+    if self.packedGames[_gameId].stack[seatIndex] != empty(uint256):
       playersLeft = unsafe_add(playersLeft, 1)
   return playersLeft
 
@@ -533,23 +629,24 @@ def gameOver(_numPlayers: uint256, _tableId: uint256):
   stack: uint256 = empty(uint256)
   for seatIndex in range(MAX_SEATS):
     if seatIndex == _numPlayers: break
-    stack = self.games[_tableId].stack[seatIndex]
+    stack = self.packedGames[_tableId].stack[seatIndex]
     if stack == 0 and T.present(_tableId, seatIndex):
       T.eliminate(_tableId, seatIndex)
     T.refundPlayer(_tableId, seatIndex, stack)
   # delete the game
-  self.games[_tableId] = empty(Game)
+  self.packedGames[_tableId] = empty(PackedGame)
+  self.configs[_tableId] = empty(uint256)
   T.deleteTable(_tableId)
 
 @internal
 def drawNextCard(_tableId: uint256):
-  self.games[_tableId].minRaise = shift(self.smallBlind(_tableId), 1)
-  numPlayers: uint256 = T.numPlayers(_tableId)
-  dealer: uint256 = self.games[_tableId].dealer
-  self.games[_tableId].actionIndex = self.roundNextActor(
+  self.packedGames[_tableId].minRaise = shift(self.smallBlind(_tableId), 1)
+  numPlayers: uint256 = self.numPlayers(_tableId)
+  dealer: uint256 = self.packedGames[_tableId].dealer
+  self.packedGames[_tableId].actionIndex = self.roundNextActor(
     numPlayers, _tableId, dealer, dealer)
-  self.games[_tableId].actionBlock = empty(uint256)
-  numInHand: uint256 = self.games[_tableId].numInHand
+  self.packedGames[_tableId].actionBlock = empty(uint256)
+  numInHand: uint256 = self.packedGames[_tableId].numInHand
   allInIndices: DynArray[uint256, MAX_SEATS] = []
   for seatIndex in range(MAX_SEATS):
     if seatIndex == numPlayers: break
@@ -558,7 +655,7 @@ def drawNextCard(_tableId: uint256):
   notAtMostOneNotAllIn: bool = 1 < unsafe_sub(numInHand, len(allInIndices))
   done: bool = False
   for street in range(2, 5):
-    if self.games[_tableId].board[street] == empty(uint256):
+    if self.byteAt(self.packedGames[_tableId].board, street) == empty(uint256):
       log DealRound(_tableId, street)
       T.burnCard(_tableId)
       if street == 2:
@@ -571,29 +668,29 @@ def drawNextCard(_tableId: uint256):
             self.showHand(_tableId, allInIndex)
       done = notAtMostOneNotAllIn
     if done:
-      self.games[_tableId].betIndex = self.games[_tableId].actionIndex
-      self.games[_tableId].stopIndex = self.games[_tableId].actionIndex
-      self.games[_tableId].actionBlock = 1 # will be set by self.afterDeal
+      self.packedGames[_tableId].betIndex = self.packedGames[_tableId].actionIndex
+      self.packedGames[_tableId].stopIndex = self.packedGames[_tableId].actionIndex
+      self.packedGames[_tableId].actionBlock = 1 # will be set by self.afterDeal
       break
   T.startDeal(_tableId, Phase_PLAY)
 
 @internal
 def afterAct(_tableId: uint256, _seatIndex: uint256):
-  numPlayers: uint256 = T.numPlayers(_tableId)
-  stopIndex: uint256 = self.games[_tableId].stopIndex
+  numPlayers: uint256 = self.numPlayers(_tableId)
+  stopIndex: uint256 = self.packedGames[_tableId].stopIndex
   nextActor: uint256 = self.roundNextActor(numPlayers, _tableId, _seatIndex, stopIndex)
-  if nextActor == stopIndex or self.games[_tableId].numInHand == 1:
+  if nextActor == stopIndex or self.packedGames[_tableId].numInHand == 1:
     # nobody is left to act in this round
     # move bets to pots and create side pots if necessary
     self.collectPots(numPlayers, _tableId)
     # settle uncontested pots
     numContested: uint256 = self.settleUncontested(numPlayers, _tableId)
     if numContested == 0: # hand is over
-      if self.playersLeft(numPlayers, _tableId) <= T.maxPlayers(_tableId):
+      if self.playersLeft(numPlayers, _tableId) <= self.maxPlayers(_tableId):
         self.gameOver(numPlayers, _tableId)
       else:
         self.nextHand(numPlayers, _tableId)
-    elif self.games[_tableId].board[4] == empty(uint256):
+    elif self.byteAt(self.packedGames[_tableId].board, 4) == empty(uint256):
       self.drawNextCard(_tableId)
     else:
       # showdown to settle remaining pots
@@ -603,51 +700,52 @@ def afterAct(_tableId: uint256, _seatIndex: uint256):
   else:
     # a player is still left to act in this round
     # pass action to them and set new actionBlock
-    self.games[_tableId].actionIndex = nextActor
-    self.games[_tableId].actionBlock = block.number
+    self.packedGames[_tableId].actionIndex = nextActor
+    self.packedGames[_tableId].actionBlock = block.number
 
 @internal
 def drawToBoard(_tableId: uint256, _boardIndex: uint256):
-  cardIndex: uint256 = T.dealTo(_tableId, self.games[_tableId].dealer)
+  cardIndex: uint256 = T.dealTo(_tableId, self.packedGames[_tableId].dealer)
   T.showCard(_tableId, cardIndex)
-  self.games[_tableId].board[_boardIndex] = unsafe_add(PENDING_REVEAL, cardIndex)
+  self.packedGames[_tableId].board = self.setByte(
+    self.packedGames[_tableId].board, _boardIndex, unsafe_add(PENDING_REVEAL, cardIndex))
 
 @internal
 @view
-def nextInPot(_numPlayers: uint256, _gameId: uint256, _seatIndex: uint256, _stopAt: uint256) -> uint256:
+def roundNextActor(_numPlayers: uint256, _gameId: uint256, _seatIndex: uint256, _stopAt: uint256) -> uint256:
   nextIndex: uint256 = _seatIndex
   for _ in range(MAX_SEATS):
     nextIndex = uint256_addmod(nextIndex, 1, _numPlayers)
-    if (nextIndex == _stopAt or
-        self.games[_gameId].liveUntil[nextIndex] == self.games[_gameId].untilPot):
+    if nextIndex == _stopAt or (
+         self.packedGames[_gameId].liveUntil[nextIndex] != 0 and
+         self.packedGames[_gameId].stack[nextIndex] != 0):
       return nextIndex
   raise "_stopAt not found"
 
 @internal
 @view
-def roundNextActor(_numPlayers: uint256, _gameId: uint256, _seatIndex: uint256, _stopAt: uint256) -> uint256:
-  nextIndex: uint256 = _seatIndex
-  for _ in range(MAX_SEATS):
-    nextIndex = uint256_addmod(nextIndex, 1, _numPlayers)
-    if nextIndex == _stopAt or (
-         self.games[_gameId].liveUntil[nextIndex] != 0 and
-         self.games[_gameId].stack[nextIndex] != 0):
-      return nextIndex
-  raise "_stopAt not found"
+def numPlayers(_tableId: uint256) -> uint256:
+  return self.byteAt(self.configs[_tableId], 0)
+
+@internal
+@view
+def maxPlayers(_tableId: uint256) -> uint256:
+  return self.byteAt(self.configs[_tableId], 1)
 
 @internal
 @view
 def smallBlind(_tableId: uint256) -> uint256:
+  config: uint256 = self.configs[_tableId]
   return T.level(_tableId,
-    min(unsafe_sub(T.numLevels(_tableId), 1),
-        unsafe_div(unsafe_sub(block.number, self.games[_tableId].startBlock),
-                   T.levelBlocks(_tableId))))
+    min(unsafe_sub(self.byteAt(config, 2), 1),
+        unsafe_div(unsafe_sub(block.number, self.packedGames[_tableId].startBlock),
+                   shift(config, -64) & MAX_BLOCKS)))
 
 @internal
 def placeBet(_gameId: uint256, _seatIndex: uint256, _size: uint256) -> uint256:
-  amount: uint256 = min(_size, self.games[_gameId].stack[_seatIndex])
-  self.games[_gameId].stack[_seatIndex] = unsafe_sub(self.games[_gameId].stack[_seatIndex], amount)
-  self.games[_gameId].bet[_seatIndex] = unsafe_add(self.games[_gameId].bet[_seatIndex], amount)
+  amount: uint256 = min(_size, self.packedGames[_gameId].stack[_seatIndex])
+  self.packedGames[_gameId].stack[_seatIndex] = unsafe_sub(self.packedGames[_gameId].stack[_seatIndex], amount)
+  self.packedGames[_gameId].bet[_seatIndex] = unsafe_add(self.packedGames[_gameId].bet[_seatIndex], amount)
   return amount
 
 # hand rankings
@@ -667,130 +765,149 @@ def placeBet(_gameId: uint256, _seatIndex: uint256, _size: uint256) -> uint256:
 
 @internal
 @pure
-def handRank(hand: uint256[13]) -> uint256:
-  straight: uint256 = self.checkStraight(hand)
-  flush: uint256 = self.checkFlush(hand)
-  if straight != 0 and flush != 0:
-    return shift(9, 5 * 8) | shift(straight, 4 * 8)
-  ranks: DynArray[uint256, 5][4] = self.getRanksByCount(hand)
-  if len(ranks[3]) != 0:
-    return shift(8, 5 * 8) | shift(ranks[3][0], 4 * 8) | shift(ranks[0][0], 3 * 8)
-  if len(ranks[2]) != 0 and len(ranks[1]) != 0:
-    return shift(7, 5 * 8) | shift(ranks[2][0], 4 * 8) | shift(ranks[1][0], 3 * 8)
-  if flush != 0:
-    return shift(6, 5 * 8) | (
-      shift(ranks[0][4], 4 * 8) |
-      shift(ranks[0][3], 3 * 8) |
-      shift(ranks[0][2], 2 * 8) |
-      shift(ranks[0][1], 1 * 8) |
-      shift(ranks[0][0], 0 * 8))
-  if straight != 0:
-    return shift(5, 5 * 8) | shift(straight, 4 * 8)
-  if len(ranks[2]) != 0:
-    return shift(4, 5 * 8) | (
-      shift(ranks[2][0], 4 * 8) |
-      shift(ranks[0][1], 3 * 8) |
-      shift(ranks[0][0], 2 * 8))
-  if len(ranks[1]) == 2:
-    return shift(3, 5 * 8) | (
-      shift(ranks[1][1], 4 * 8) |
-      shift(ranks[1][0], 3 * 8) |
-      shift(ranks[0][0], 2 * 8))
-  if len(ranks[1]) == 1:
-    return shift(2, 5 * 8) | (
-      shift(ranks[1][0], 4 * 8) |
-      shift(ranks[0][2], 3 * 8) |
-      shift(ranks[0][1], 2 * 8) |
-      shift(ranks[0][0], 1 * 8))
-  return shift(1, 5 * 8) | (
-           shift(ranks[0][4], 4 * 8) |
-           shift(ranks[0][3], 3 * 8) |
-           shift(ranks[0][2], 2 * 8) |
-           shift(ranks[0][1], 1 * 8) |
-           shift(ranks[0][0], 0 * 8))
+def rank(card: uint256) -> uint256:
+  return unsafe_sub(card, 1) % 13
 
 @internal
 @pure
-def getRanksByCount(hand: uint256[13]) -> DynArray[uint256, 5][4]:
-  result: DynArray[uint256, 5][4] = [[], [], [], []]
-  for rank in range(13):
-    count: uint256 = self.suitCount(hand[rank])
-    if count != 0:
-      result[unsafe_sub(count, 1)].append(rank)
-  return result
+# orders cards by rank, then suit, from 1 for the lowest
+def cardKey(card: uint256) -> uint256:
+  return unsafe_add(unsafe_add(unsafe_mul(self.rank(card), 4), unsafe_div(unsafe_sub(card, 1), 13)), 1)
 
 @internal
 @pure
-# return highest rank in straight, or 0
-def checkStraight(hand: uint256[13]) -> uint256:
-  count: uint256 = 0
-  if hand[12] != 0:
-    count = unsafe_add(count, 1)
-  for i in range(13):
-    if hand[i] != 0:
-      count = unsafe_add(count, 1)
-    else:
-      count = 0
-    if count == 5:
-      return i
-  return 0
+def bit(rank: uint256) -> uint256:
+  return shift(1, convert(rank, int128))
 
 @internal
 @pure
-# return 1 + suit of flush, or 0
-def checkFlush(hand: uint256[13]) -> uint256:
-  count: uint256[4] = empty(uint256[4])
-  for i in range(13):
-    bit: uint256 = 1
-    for suit in range(4):
-      if hand[i] & bit != 0:
-        count[suit] = unsafe_add(count[suit], 1)
-        if (count[suit] == 5):
-          return unsafe_add(suit, 1)
-      bit = shift(bit, 1)
-  return 0
+# the _n highest ranks in _mask, highest in the most significant byte
+def topRanks(_mask: uint256, _n: uint256) -> uint256:
+  result: uint256 = 0
+  count: uint256 = 0
+  for negRank in range(13):
+    if count == _n: break
+    rank: uint256 = unsafe_sub(12, negRank)
+    if _mask & self.bit(rank) != 0:
+      result = shift(result, 8) | rank
+      count = unsafe_add(count, 1)
+  return result
 
 @internal
 @pure
-def rank(card: uint256) -> uint256:
-  return unsafe_sub(card, 1) % 13
+# return highest rank in a straight in _mask, or 0
+def highStraight(_mask: uint256) -> uint256:
+  # bit 0 is the ace played low, bit 1 + rank is rank
+  mask: uint256 = shift(_mask, 1) | shift(_mask, -12)
+  for negRank in range(10):
+    rank: uint256 = unsafe_sub(12, negRank)
+    if shift(mask, -convert(unsafe_sub(rank, 3), int128)) & 31 == 31:
+      return rank
+  return 0
 
 @internal
 @pure
-# TODO: convert to int128 because of this bug
-# https://github.com/vyperlang/vyper/issues/3309
-def suit(card: uint256) -> int128:
-  return convert(unsafe_div(unsafe_sub(card, 1), 13), int128)
+# rank of the best 5-card hand among _cards, in a single pass over them:
+# bitmasks of the ranks present, paired, tripled and quadrupled, and of the ranks in each suit
+def bestHandRank(_cards: uint256[7]) -> uint256:
+  ranks: uint256 = 0
+  pairs: uint256 = 0
+  trips: uint256 = 0
+  quads: uint256 = 0
+  suitRanks: uint256[4] = empty(uint256[4])
+  suitCount: uint256[4] = empty(uint256[4])
+  for card in _cards:
+    suit: uint256 = unsafe_div(unsafe_sub(card, 1), 13)
+    bit: uint256 = self.bit(self.rank(card))
+    suitRanks[suit] |= bit
+    suitCount[suit] = unsafe_add(suitCount[suit], 1)
+    if trips & bit != 0:
+      quads |= bit
+    elif pairs & bit != 0:
+      trips |= bit
+    elif ranks & bit != 0:
+      pairs |= bit
+    else:
+      ranks |= bit
+  flush: uint256 = 0
+  for suit in range(4):
+    if 5 <= suitCount[suit]:
+      flush = suitRanks[suit]
+  if flush != 0:
+    straight: uint256 = self.highStraight(flush)
+    if straight != 0:
+      return shift(9, 5 * 8) | shift(straight, 4 * 8)
+  if quads != 0:
+    quad: uint256 = self.topRanks(quads, 1)
+    return shift(8, 5 * 8) | shift(quad, 4 * 8) | shift(
+      self.topRanks(ranks & ~self.bit(quad), 1), 3 * 8)
+  triplet: uint256 = self.topRanks(trips, 1)
+  if trips != 0:
+    pair: uint256 = pairs & ~self.bit(triplet)
+    if pair != 0:
+      return shift(7, 5 * 8) | shift(triplet, 4 * 8) | shift(self.topRanks(pair, 1), 3 * 8)
+  if flush != 0:
+    return shift(6, 5 * 8) | self.topRanks(flush, 5)
+  straight: uint256 = self.highStraight(ranks)
+  if straight != 0:
+    return shift(5, 5 * 8) | shift(straight, 4 * 8)
+  if trips != 0:
+    return shift(4, 5 * 8) | shift(triplet, 4 * 8) | shift(
+      self.topRanks(ranks & ~self.bit(triplet), 2), 2 * 8)
+  if pairs != 0:
+    high: uint256 = self.topRanks(pairs, 1)
+    low: uint256 = pairs & ~self.bit(high)
+    if low != 0:
+      low = self.topRanks(low, 1)
+      return shift(3, 5 * 8) | shift(high, 4 * 8) | shift(low, 3 * 8) | shift(
+        self.topRanks(ranks & ~self.bit(high) & ~self.bit(low), 1), 2 * 8)
+    return shift(2, 5 * 8) | shift(high, 4 * 8) | shift(
+      self.topRanks(ranks & ~self.bit(high), 3), 1 * 8)
+  return shift(1, 5 * 8) | self.topRanks(ranks, 5)
 
-@internal
+@external
 @pure
-def suitCount(suits: uint256) -> uint256:
-  count: uint256 = 0
-  bit: uint256 = 1
-  for _ in range(4):
-    if suits & bit != 0:
-      count = unsafe_add(count, 1)
-    bit = shift(bit, 1)
-  return count
+def handRank(_cards: uint256[7]) -> uint256:
+  return self.bestHandRank(_cards)
+
+# for off-chain viewing
+
+struct TableState:
+  config:      Config
+  deckId:      uint256
+  seats:       address[MAX_SEATS]
+  phase:       uint256
+  commitBlock: uint256
+  present:     uint256             # bitmask of seats contributing to the current shuffle
+  shuffled:    uint256             # bitmask of seats that verified their current shuffle
+  deckIndex:   uint256
+  cards:       uint256[26][4]      # Room.cardInfo: requirement, drawIndex, decryptCount, opened
+  game:        Game
 
-@internal
-@pure
-def bestHandRank(cards: uint256[7]) -> uint256:
-  hand: uint256[13] = empty(uint256[13])
-  suits: int128[7] = empty(int128[7])
-  ranks: uint256[7] = empty(uint256[7])
-  for i in range(7):
-    suits[i] = self.suit(cards[i])
-    ranks[i] = self.rank(cards[i])
-    hand[ranks[i]] |= shift(1, suits[i])
-  bestRank: uint256 = 0
-  for i in range(7):
-    hand[ranks[i]] ^= shift(1, suits[i])
-    for delta in range(7):
-      j: uint256 = unsafe_add(unsafe_add(i, delta), 1)
-      if j == 7: break
-      hand[ranks[j]] ^= shift(1, suits[j])
-      bestRank = max(bestRank, self.handRank(hand))
-      hand[ranks[j]] ^= shift(1, suits[j])
-    hand[ranks[i]] ^= shift(1, suits[i])
-  return bestRank
+@external
+@view
+def tableState(_tableId: uint256) -> TableState:
+  # everything observable about a table in one call
+  params: uint256[12] = T.configParams(_tableId)
+  phaseCommit: uint256[2] = T.phaseCommit(_tableId)
+  state: TableState = TableState({
+    config: Config({
+      buyIn: params[0], bond: params[1], startsWith: params[2], untilLeft: params[3],
+      structure: T.configStructure(_tableId), levelBlocks: params[4], verifRounds: params[5],
+      prepBlocks: params[6], shuffBlocks: params[7], verifBlocks: params[8],
+      dealBlocks: params[9], actBlocks: params[10]}),
+    deckId: params[11],
+    seats: empty(address[MAX_SEATS]),
+    phase: phaseCommit[0],
+    commitBlock: phaseCommit[1],
+    present: empty(uint256),
+    shuffled: T.shuffled(_tableId),
+    deckIndex: T.deckIndex(_tableId),
+    cards: T.cardInfo(_tableId),
+    game: self.unpackGame(_tableId)})
+  for seatIndex in range(MAX_SEATS):
+    if seatIndex == params[2]: break
+    state.seats[seatIndex] = T.playerAt(_tableId, seatIndex)
+    if T.present(_tableId, seatIndex):
+      state.present |= shift(1, convert(seatIndex, int128)) # TODO: https://github.com/vyperlang/vyper/issues/3309
+  return state
@@ -0,0 +1,82 @@
+# @version ^0.3.7
+# paged views of the Room's table lists for off-chain viewing
+# (lobbies list tables a page per call instead of a call per table)
+
+# copied from Room.vy
+MAX_SEATS:  constant(uint256) =   9 # maximum seats per table
+MAX_LEVELS: constant(uint256) = 100 # maximum number of levels in tournament structure
+# end copy
+
+MAX_PAGE: constant(uint256) = 64 # maximum tables per page
+
+interface RoomManager:
+  def nextWaitingTable(_tableId: uint256) -> uint256: view
+  def nextLiveTable(_player: address, _tableId: uint256) -> uint256: view
+  def configParams(_tableId: uint256) -> uint256[12]: view
+  def configStructure(_tableId: uint256) -> DynArray[uint256, MAX_LEVELS]: view
+  def playerAt(_tableId: uint256, _seatIndex: uint256) -> address: view
+
+T: immutable(RoomManager)
+
+struct TableSummary:
+  tableId:   uint256
+  params:    uint256[12]            # Room.configParams
+  structure: DynArray[uint256, MAX_LEVELS]
+  seats:     address[MAX_SEATS]     # empty for seats not taken
+
+struct Page:
+  tables: DynArray[TableSummary, MAX_PAGE]
+  cursor: uint256                   # to pass for the next page, 0 after the last
+
+@external
+def __init__(roomAddress: address):
+  T = RoomManager(roomAddress)
+
+@external
+@view
+def roomAddress() -> address:
+  return T.address
+
+@internal
+@view
+def next(_player: address, _tableId: uint256) -> uint256:
+  # waiting tables if _player is empty, otherwise the player's live tables
+  if _player == empty(address):
+    return T.nextWaitingTable(_tableId)
+  return T.nextLiveTable(_player, _tableId)
+
+@internal
+@view
+def page(_player: address, _cursor: uint256, _count: uint256) -> Page:
+  # an empty page could not say whether tables remain
+  assert _count != 0, "invalid count"
+  result: Page = empty(Page)
+  tableId: uint256 = self.next(_player, _cursor)
+  for i in range(MAX_PAGE):
+    if i == _count or tableId == empty(uint256): break
+    summary: TableSummary = TableSummary({
+      tableId: tableId,
+      params: T.configParams(tableId),
+      structure: T.configStructure(tableId),
+      seats: empty(address[MAX_SEATS])})
+    for seatIndex in range(MAX_SEATS):
+      if seatIndex == summary.params[2]: break
+      summary.seats[seatIndex] = T.playerAt(tableId, seatIndex)
+    result.tables.append(summary)
+    result.cursor = tableId
+    tableId = self.next(_player, tableId)
+  if tableId == empty(uint256):
+    result.cursor = empty(uint256)
+  return result
+
+@external
+@view
+def waitingTables(_cursor: uint256, _count: uint256) -> Page:
+  # up to _count tables waiting for players, after the table _cursor (0 for the first page)
+  return self.page(empty(address), _cursor, _count)
+
+@external
+@view
+def liveTables(_player: address, _cursor: uint256, _count: uint256) -> Page:
+  # up to _count of _player's live tables, after the table _cursor (0 for the first page)
+  return self.page(_player, _cursor, _count)
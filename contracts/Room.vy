@@ -72,8 +72,8 @@ struct Table:
   shuffled:    uint256              # whether each player has verified their current shuffle
   commitBlock: uint256              # block from which new commitments were required
   deckIndex:   uint256              # index of next card in deck
-  drawIndex:   uint256[26]          # player the card is drawn to
-  requirement: uint256[26]          # revelation requirement level
+  drawIndex:   uint256              # player each card is drawn to, a nibble per card
+  requirement: uint256              # revelation requirement level of each card, a nibble per card
 
 tables: HashMap[uint256, Table]
 nextTableId: uint256
@@ -159,6 +159,17 @@ def gameAuth():
 def checkAuth(_tableId: uint256, _seatIndex: uint256):
   assert self.tables[_tableId].seats[_seatIndex] == msg.sender, "unauthorised"
 
+@internal
+@pure
+def nibble(_nibbles: uint256, _index: uint256) -> uint256:
+  return shift(_nibbles, -convert(unsafe_mul(_index, 4), int128)) & 15
+
+@internal
+@pure
+def setNibble(_nibbles: uint256, _index: uint256, _value: uint256) -> uint256:
+  offset: int128 = convert(unsafe_mul(_index, 4), int128)
+  return (_nibbles & ~shift(15, offset)) | shift(_value, offset)
+
 @external
 @payable
 def createTable(_seatIndex: uint256, _config: Config) -> uint256:
@@ -277,7 +288,7 @@ def verifyShuffleTimeout(_tableId: uint256, _seatIndex: uint256):
 def decryptTimeout(_tableId: uint256, _seatIndex: uint256, _cardIndex: uint256):
   self.validatePhase(_tableId, Phase_DEAL)
   self.checkDeadline(_tableId, self.tables[_tableId].config.dealBlocks)
-  assert self.tables[_tableId].requirement[_cardIndex] != Req_DECK, "not required"
+  assert self.nibble(self.tables[_tableId].requirement, _cardIndex) != Req_DECK, "not required"
   assert self.decryptCount(_tableId, _cardIndex) == _seatIndex, "already decrypted"
   self.failChallenge(_tableId, _seatIndex, 4)
 
@@ -285,8 +296,8 @@ def decryptTimeout(_tableId: uint256, _seatIndex: uint256, _cardIndex: uint256):
 def revealTimeout(_tableId: uint256, _seatIndex: uint256, _cardIndex: uint256):
   self.validatePhase(_tableId, Phase_DEAL)
   self.checkDeadline(_tableId, self.tables[_tableId].config.dealBlocks)
-  assert self.tables[_tableId].drawIndex[_cardIndex] == _seatIndex, "wrong player"
-  assert self.tables[_tableId].requirement[_cardIndex] == Req_SHOW, "not required"
+  assert self.nibble(self.tables[_tableId].drawIndex, _cardIndex) == _seatIndex, "wrong player"
+  assert self.nibble(self.tables[_tableId].requirement, _cardIndex) == Req_SHOW, "not required"
   assert D.openedCard(self.tables[_tableId].deckId, _cardIndex) == 0, "already opened"
   self.failChallenge(_tableId, _seatIndex, 5)
 
@@ -343,10 +354,14 @@ def verifyPrep(_tableId: uint256, _seatIndex: uint256, _prep: CP[53]):
   self.tables[_tableId].deckIndex = numVerified
   if numVerified == self.tables[_tableId].config.startsWith:
     D.finishPrep(deckId)
+    drawIndex: uint256 = 0
+    requirement: uint256 = 0
     for seatIndex in range(MAX_SEATS):
       if seatIndex == numVerified: break
-      self.tables[_tableId].drawIndex[seatIndex] = seatIndex
-      self.tables[_tableId].requirement[seatIndex] = Req_SHOW
+      drawIndex = self.setNibble(drawIndex, seatIndex, seatIndex)
+      requirement = self.setNibble(requirement, seatIndex, Req_SHOW)
+    self.tables[_tableId].drawIndex = drawIndex
+    self.tables[_tableId].requirement = requirement
     self.tables[_tableId].deckIndex = 0
     self.tables[_tableId].phase = Phase_SHUF
     self.tables[_tableId].nextPhase = Phase_PLAY
@@ -379,16 +394,20 @@ def submitShuffle(_tableId: uint256, _seatIndex: uint256,
 
 @external
 def verifyShuffle(_tableId: uint256, _seatIndex: uint256,
-                  _commitments: uint256[2][53][63],
-                  _scalars: uint256[63],
-                  _permutations: uint256[53][63]):
+                  _commitments: DynArray[uint256[2][53], 63], # MAX_SECURITY <- Vyper bug with importing
+                  _scalars: DynArray[uint256, 63],
+                  _permutations: DynArray[uint256[53], 63]):
   self.validatePhase(_tableId, Phase_SHUF)
   self.checkAuth(_tableId, _seatIndex)
   bit: uint256 = shift(1, convert(_seatIndex, int128)) # TODO: https://github.com/vyperlang/vyper/issues/3309
   assert self.tables[_tableId].shuffled & bit == 0, "already verified"
   self.tables[_tableId].shuffled ^= bit
+  verifRounds: uint256 = self.tables[_tableId].config.verifRounds
+  assert (len(_commitments) == verifRounds and
+          len(_scalars) == verifRounds and
+          len(_permutations) == verifRounds), "wrong rounds"
   for i in range(MAX_SECURITY):
-    if i == self.tables[_tableId].config.verifRounds: break
+    if i == verifRounds: break
     D.defuseNextChallenge(
       self.tables[_tableId].deckId, _seatIndex,
       _commitments[i], _scalars[i], _permutations[i])
@@ -406,6 +425,8 @@ def autoShuffle(_tableId: uint256):
     if self.tables[_tableId].present & shift(1, convert(seatIndex, int128)) == 0: # TODO: https://github.com/vyperlang/vyper/issues/3309
       # just copy the shuffle: use identity permutation and secret key = 1
       # do not challenge it; external challenges can just be ignored
+      # (a hashed deck keeps the shuffle to copy only in logs, and Room never makes one)
+      assert not D.hashed(deckId), "hashed deck"
       D.submitShuffle(deckId, seatIndex, D.lastShuffle(deckId))
       seatIndex = unsafe_add(seatIndex, 1)
     else:
@@ -416,7 +437,7 @@ def autoShuffle(_tableId: uint256):
 def autoVerif(_tableId: uint256):
   end: uint256 = shift(1, convert(self.tables[_tableId].config.startsWith, int128)) # TODO: https://github.com/vyperlang/vyper/issues/3309
   cur: uint256 = 1
-  for _ in range(MAX_SEATS):
+  for _ in range(MAX_SEATS + 1):
     if cur == end:
       self.tables[_tableId].shuffled |= cur
       self.tables[_tableId].game.afterShuffle(_tableId)
@@ -435,10 +456,13 @@ def reshuffle(_tableId: uint256):
   self.gameAuth()
   D.resetShuffle(self.tables[_tableId].deckId)
   self.tables[_tableId].shuffled = 0
-  self.tables[_tableId].requirement = empty(uint256[26])
+  self.tables[_tableId].requirement = empty(uint256)
   self.tables[_tableId].deckIndex = 0
   self.tables[_tableId].phase = Phase_SHUF
   self.tables[_tableId].commitBlock = block.number
+  # eliminated seats before the first present one shuffle at once, as nobody else can start
+  if self.tables[_tableId].present & 1 == 0:
+    self.autoShuffle(_tableId)
 
 # deal
 
@@ -480,7 +504,7 @@ def decryptCards(_tableId: uint256, _seatIndex: uint256, _data: DynArray[uint256
   self.checkAuth(_tableId, _seatIndex)
   for data in _data:
     cardIndex: uint256 = data[0]
-    assert self.tables[_tableId].requirement[cardIndex] != Req_DECK, "decrypt not allowed"
+    assert self.nibble(self.tables[_tableId].requirement, cardIndex) != Req_DECK, "decrypt not allowed"
     D.decryptCard(
       self.tables[_tableId].deckId, _seatIndex, cardIndex, [data[1], data[2]],
       Proof({gs: [data[3], data[4]], hs: [data[5], data[6]], scx: data[7]}))
@@ -515,22 +539,27 @@ def revealCards(_tableId: uint256, _seatIndex: uint256, _data: DynArray[uint256[
   deckId: uint256 = self.tables[_tableId].deckId
   for data in _data:
     cardIndex: uint256 = self._revealCard(deckId, _seatIndex, _tableId, msg.sender, data)
-    assert self.tables[_tableId].drawIndex[cardIndex] == _seatIndex, "wrong player"
-    assert self.tables[_tableId].requirement[cardIndex] == Req_SHOW, "reveal not allowed"
+    assert self.nibble(self.tables[_tableId].drawIndex, cardIndex) == _seatIndex, "wrong player"
+    assert self.nibble(self.tables[_tableId].requirement, cardIndex) == Req_SHOW, "reveal not allowed"
   if _end:
     self.endDeal(_tableId)
 
 @internal
 @view
 def checkRevelations(_tableId: uint256) -> bool:
+  drawIndex: uint256 = self.tables[_tableId].drawIndex
+  requirement: uint256 = self.tables[_tableId].requirement
   for cardIndex in range(26):
-    if (self.tables[_tableId].requirement[cardIndex] == Req_SHOW and
+    if requirement == 0: # no more cards required
+      break
+    if (requirement & 15 == Req_SHOW and
         D.openedCard(self.tables[_tableId].deckId, cardIndex) == 0):
       return False
-    if (self.tables[_tableId].requirement[cardIndex] != Req_DECK and
-        self.decryptCount(_tableId, cardIndex) <=
-        self.tables[_tableId].drawIndex[cardIndex]):
+    if (requirement & 15 != Req_DECK and
+        self.decryptCount(_tableId, cardIndex) <= drawIndex & 15):
       return False
+    drawIndex = shift(drawIndex, -4)
+    requirement = shift(requirement, -4)
   return True
 
 @internal
@@ -551,16 +580,19 @@ def startDeal(_tableId: uint256, _nextPhase: uint256):
 def dealTo(_tableId: uint256, _seatIndex: uint256) -> uint256:
   self.gameAuth()
   deckIndex: uint256 = self.tables[_tableId].deckIndex
-  self.tables[_tableId].drawIndex[deckIndex] = _seatIndex
-  self.tables[_tableId].requirement[deckIndex] = Req_HAND
+  self.tables[_tableId].drawIndex = self.setNibble(self.tables[_tableId].drawIndex, deckIndex, _seatIndex)
+  self.tables[_tableId].requirement = self.setNibble(self.tables[_tableId].requirement, deckIndex, Req_HAND)
   D.drawCard(self.tables[_tableId].deckId, _seatIndex, deckIndex)
+  # likewise for decrypting
+  if self.tables[_tableId].present & 1 == 0:
+    self.autoDecrypt(_tableId, deckIndex)
   self.tables[_tableId].deckIndex = unsafe_add(deckIndex, 1)
   return deckIndex
 
 @external
 def showCard(_tableId: uint256, _cardIndex: uint256):
   self.gameAuth()
-  self.tables[_tableId].requirement[_cardIndex] = Req_SHOW
+  self.tables[_tableId].requirement = self.setNibble(self.tables[_tableId].requirement, _cardIndex, Req_SHOW)
 
 @external
 def burnCard(_tableId: uint256):
@@ -589,7 +621,21 @@ def eliminate(_tableId: uint256, _seatIndex: uint256):
 @external
 @view
 def cardShown(_tableId: uint256, _cardIndex: uint256) -> bool:
-  return self.tables[_tableId].requirement[_cardIndex] == Req_SHOW
+  return self.nibble(self.tables[_tableId].requirement, _cardIndex) == Req_SHOW
+
+@external
+@view
+def cardsShown(_tableId: uint256) -> uint256:
+  # bit cardIndex is set when cardShown(_tableId, cardIndex)
+  requirement: uint256 = self.tables[_tableId].requirement
+  shown: uint256 = 0
+  for cardIndex in range(26):
+    if requirement == 0: # no more cards required
+      break
+    if requirement & 15 == Req_SHOW:
+      shown |= shift(1, convert(cardIndex, int128)) # TODO: https://github.com/vyperlang/vyper/issues/3309
+    requirement = shift(requirement, -4)
+  return shown
 
 @external
 @view
@@ -610,6 +656,14 @@ def _cardAt(_tableId: uint256, _deckIndex: uint256) -> uint256:
 def cardAt(_tableId: uint256, _deckIndex: uint256) -> uint256:
   return unsafe_sub(self._cardAt(_tableId, _deckIndex), 1)
 
+@external
+@view
+def cardsAt(_tableId: uint256, _deckIndices: DynArray[uint256, 18]) -> DynArray[uint256, 18]:
+  cards: DynArray[uint256, 18] = [] # 2 * MAX_SEATS
+  for deckIndex in _deckIndices:
+    cards.append(unsafe_sub(self._cardAt(_tableId, deckIndex), 1))
+  return cards
+
 @external
 @view
 def deckIndex(_tableId: uint256) -> uint256:
@@ -701,8 +755,8 @@ def phaseCommit(_tableId: uint256) -> uint256[2]:
 def cardInfo(_tableId: uint256) -> uint256[26][4]:
   result: uint256[26][4] = empty(uint256[26][4])
   for cardIndex in range(26):
-    result[0][cardIndex] = self.tables[_tableId].requirement[cardIndex]
-    result[1][cardIndex] = self.tables[_tableId].drawIndex[cardIndex]
+    result[0][cardIndex] = self.nibble(self.tables[_tableId].requirement, cardIndex)
+    result[1][cardIndex] = self.nibble(self.tables[_tableId].drawIndex, cardIndex)
     result[2][cardIndex] = self.decryptCount(_tableId, cardIndex)
     result[3][cardIndex] = self._cardAt(_tableId, cardIndex)
   return result
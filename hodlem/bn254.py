@@ -0,0 +1,156 @@
+# arithmetic on the alt-bn128 G1 group (https://neuromancer.sk/std/bn/bn254)
+# the same curve used by the ecadd/ecmul precompiles and by @noble/curves' bn254
+#
+# affine points are (x, y) pairs of ints, with (0, 0) for the point at infinity
+# as in the precompiles; internally we use Jacobian coordinates (X, Y, Z)
+
+import hashlib
+import secrets
+
+P = 21888242871839275222246405745257275088696311157297823662689037894645226208583
+N = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+B = 3
+G = (1, 2)
+ZERO = (0, 0)
+
+WINDOW = 4
+
+def isOnCurve(p):
+    x, y = p
+    return p == ZERO or (x < P and y < P and (y * y - x * x * x - B) % P == 0)
+
+def toJacobian(p):
+    return (0, 1, 0) if p == ZERO else (p[0], p[1], 1)
+
+def toAffine(j):
+    x, y, z = j
+    if z == 0:
+        return ZERO
+    zi = pow(z, -1, P)
+    zi2 = zi * zi % P
+    return (x * zi2 % P, y * zi2 * zi % P)
+
+def jacobianDouble(j):
+    x, y, z = j
+    if z == 0 or y == 0:
+        return (0, 1, 0)
+    a = x * x % P
+    b = y * y % P
+    c = b * b % P
+    d = 2 * ((x + b) * (x + b) - a - c) % P
+    e = 3 * a % P
+    x3 = (e * e - 2 * d) % P
+    return (x3, (e * (d - x3) - 8 * c) % P, 2 * y * z % P)
+
+def jacobianAdd(j, k):
+    x1, y1, z1 = j
+    x2, y2, z2 = k
+    if z1 == 0:
+        return k
+    if z2 == 0:
+        return j
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+    if u1 == u2:
+        return jacobianDouble(j) if s1 == s2 else (0, 1, 0)
+    h = (u2 - u1) % P
+    i = 4 * h * h % P
+    hi = h * i % P
+    r = 2 * (s2 - s1) % P
+    v = u1 * i % P
+    x3 = (r * r - hi - 2 * v) % P
+    y3 = (r * (v - x3) - 2 * s1 * hi) % P
+    z3 = ((z1 + z2) * (z1 + z2) - z1z1 - z2z2) * h % P
+    return (x3, y3, z3)
+
+def jacobianMultiply(j, n):
+    # fixed-window double-and-add, most significant window first
+    n %= N
+    table = [(0, 1, 0), j]
+    for _ in range(2, 1 << WINDOW):
+        table.append(jacobianAdd(table[-1], j))
+    r = (0, 1, 0)
+    for shift in range(((n.bit_length() + WINDOW - 1) // WINDOW - 1) * WINDOW, -1, -WINDOW):
+        for _ in range(WINDOW):
+            r = jacobianDouble(r)
+        r = jacobianAdd(r, table[(n >> shift) & ((1 << WINDOW) - 1)])
+    return r
+
+def add(p, q):
+    return toAffine(jacobianAdd(toJacobian(p), toJacobian(q)))
+
+def multiply(p, n):
+    return toAffine(jacobianMultiply(toJacobian(p), n))
+
+# randomness comes from the secrets module, or from rng, a SeededRandom for reproducible runs
+
+class SeededRandom:
+    # a CSPRNG stream: SHA-256 of a key (the hash of the seed) and a 64-bit block counter,
+    # the same bytes as seededRandom in interface/lib.js
+
+    def __init__(self, seed):
+        self.key = sha256(str(seed).encode())
+        self.counter = 0
+        self.buffer = b''
+
+    def bytes(self, n):
+        while len(self.buffer) < n:
+            self.buffer += sha256(self.key + self.counter.to_bytes(8, 'big'))
+            self.counter += 1
+        out, self.buffer = self.buffer[:n], self.buffer[n:]
+        return out
+
+    def below(self, n):
+        # uniform in [0, n), by rejection of the values of n's bit length that are too big
+        k = n.bit_length()
+        while True:
+            v = int.from_bytes(self.bytes((k + 7) // 8), 'big') & ((1 << k) - 1)
+            if v < n:
+                return v
+
+def randomBelow(n, rng=None):
+    return rng.below(n) if rng else secrets.randbelow(n)
+
+def randomScalar(rng=None):
+    return randomBelow(N - 1, rng) + 1
+
+def randomPoint(rng=None):
+    return multiply(G, randomScalar(rng))
+
+# points as Deck stores them: x, with the parity of y in bit 255 (0 for the point at infinity)
+
+PARITY_BIT = 1 << 255
+
+def compress(p):
+    assert isOnCurve(p), "invalid point"
+    return 0 if p == ZERO else p[0] | (p[1] & 1) << 255
+
+def decompress(c):
+    if c == 0:
+        return ZERO
+    x = c & (PARITY_BIT - 1)
+    y = pow((x * x * x + B) % P, (P + 1) // 4, P) # P % 4 == 3
+    if y & 1 != c >> 255:
+        y = P - y
+    assert isOnCurve((x, y)), "invalid compressed point"
+    return (x, y)
+
+def uint256ToBytes(n):
+    return int(n).to_bytes(32, 'big')
+
+def pointToBytes(p):
+    return uint256ToBytes(p[0]) + uint256ToBytes(p[1])
+
+def bytesToPoint(b):
+    return (int.from_bytes(b[:32], 'big'), int.from_bytes(b[32:64], 'big'))
+
+def sha256(data):
+    return hashlib.sha256(data).digest()
+
+def hashPoints(*points):
+    # the challenge in a Chaum-Pedersen proof, as computed by Deck.hash
+    return int.from_bytes(sha256(b''.join(map(pointToBytes, points))), 'big') % N
@@ -0,0 +1,197 @@
+# secret storage for deck preparation and shuffles
+# reads and writes the same file formats as interface/store.js
+# so either implementation can pick up where the other left off
+# every store has transaction(): pushes made through it are buffered, and written once
+# when the block exits, or dropped if it raises
+
+import json
+import os
+from contextlib import contextmanager
+
+class JsonDB:
+    # the node-json-db format: one JSON document, rewritten on every save
+
+    def __init__(self, filename):
+        if not filename.endswith('.json'):
+            filename += '.json'
+        self.filename = filename
+        try:
+            with open(filename) as f:
+                self.data = json.load(f)
+        except FileNotFoundError:
+            self.data = {}
+
+    def keys(self, path):
+        return [k for k in path.split('/') if k]
+
+    def push(self, path, value):
+        *parents, last = self.keys(path)
+        node = self.data
+        for k in parents:
+            node = node.setdefault(k, {})
+        node[last] = value
+
+    def getData(self, path):
+        node = self.data
+        for k in self.keys(path):
+            node = node[int(k) if isinstance(node, list) else k]
+        return node
+
+    def exists(self, path):
+        try:
+            self.getData(path)
+            return True
+        except (KeyError, IndexError):
+            return False
+
+    def save(self):
+        tmp = f'{self.filename}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.data, f, separators=(',', ':'))
+        os.replace(tmp, self.filename)
+
+    @contextmanager
+    def transaction(self):
+        tx = JsonTransaction(self)
+        yield tx
+        tx.commit()
+
+class JsonTransaction:
+    def __init__(self, db):
+        self.db = db
+        self.writes = [] # (keys, value), in order
+
+    def getData(self, path):
+        # the latest push to the path or to a parent of it, else the database's
+        keys = self.db.keys(path)
+        for written, value in reversed(self.writes):
+            if keys[:len(written)] == written:
+                for k in keys[len(written):]:
+                    value = value[int(k) if isinstance(value, list) else k]
+                return value
+        return self.db.getData(path)
+
+    def exists(self, path):
+        try:
+            self.getData(path)
+            return True
+        except (KeyError, IndexError):
+            return False
+
+    def push(self, path, value):
+        self.writes.append((self.db.keys(path), value))
+
+    def commit(self):
+        if not self.writes:
+            return
+        for keys, value in self.writes:
+            self.db.push('/'.join(keys), value)
+        self.db.save()
+        self.writes = []
+
+def splitPath(path):
+    keys = [k for k in path.split('/') if k]
+    return '/'.join(keys[:2]), '/'.join(keys[2:])
+
+class LogDB:
+    # append-only log, namespaced by /<address>/<tableId>
+    # each transaction appends one line per namespace it touched:
+    #   {"ns": "<address>/<tableId>", "set": {"<rest of path>": value, ...}}
+    # in a single write; a torn last line is dropped on load
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.data = {}
+        try:
+            with open(filename, 'rb') as f:
+                log = f.read()
+        except FileNotFoundError:
+            return
+        end = log.rfind(b'\n') + 1
+        for line in log[:end].splitlines():
+            record = json.loads(line)
+            self.data.setdefault(record['ns'], {}).update(record['set'])
+        if end < len(log):
+            # drop a torn last line so the next append starts on a fresh line
+            with open(filename, 'r+b') as f:
+                f.truncate(end)
+
+    def getData(self, path):
+        ns, key = splitPath(path)
+        return self.data[ns][key]
+
+    def exists(self, path):
+        ns, key = splitPath(path)
+        return key in self.data.get(ns, {})
+
+    def push(self, path, value):
+        with self.transaction() as tx:
+            tx.push(path, value)
+
+    def save(self):
+        pass
+
+    @contextmanager
+    def transaction(self):
+        tx = LogTransaction(self)
+        yield tx
+        tx.commit()
+
+class LogTransaction:
+    def __init__(self, db):
+        self.db = db
+        self.writes = {}
+
+    def getData(self, path):
+        ns, key = splitPath(path)
+        if key in self.writes.get(ns, {}):
+            return self.writes[ns][key]
+        return self.db.getData(path)
+
+    def exists(self, path):
+        ns, key = splitPath(path)
+        return key in self.writes.get(ns, {}) or self.db.exists(path)
+
+    def push(self, path, value):
+        ns, key = splitPath(path)
+        self.writes.setdefault(ns, {})[key] = value
+
+    def commit(self):
+        if not self.writes:
+            return
+        lines = ''.join(json.dumps(dict(ns=ns, set=set), separators=(',', ':')) + '\n'
+                        for ns, set in self.writes.items())
+        with open(self.db.filename, 'a') as f:
+            f.write(lines)
+        for ns, set in self.writes.items():
+            self.db.data.setdefault(ns, {}).update(set)
+        self.writes = {}
+
+def dbFilename(name):
+    # the file openDb(name), or deck.js --db name, keeps the database in
+    return name if name.endswith('.log') or name.endswith('.json') else f'{name}.json'
+
+def dumpDb(name):
+    # the whole database as text, for loadDb to put back later
+    try:
+        with open(dbFilename(name)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return ''
+
+def loadDb(name, text):
+    filename = dbFilename(name)
+    if not text:
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+        return
+    tmp = f'{filename}.tmp'
+    with open(tmp, 'w') as f:
+        f.write(text)
+    os.replace(tmp, filename)
+
+def openDb(name):
+    # *.log files are LogDBs, anything else is a JsonDB
+    return LogDB(name) if name.endswith('.log') else JsonDB(name)
@@ -0,0 +1,301 @@
+# Python port of the card cryptography in interface/lib.js
+# given the same randomness (rng, a SeededRandom, or None for the secrets module), every
+# function returns exactly what its JavaScript counterpart returns, drawing it in the same
+# order, and secrets are kept in the same db layout
+#
+# the scalar multiplications of preps, shuffles and decryptions can be spread over a pool
+# of processes (pool: a concurrent.futures executor, e.g. from cryptoPool, or None to work
+# in this process); the randomness is always drawn here, so the results do not depend on it
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from .bn254 import (G, N, SeededRandom, multiply, randomBelow, randomScalar,
+                    pointToBytes, bytesToPoint, uint256ToBytes, sha256, hashPoints)
+from .db import openDb, dumpDb, loadDb
+
+CHUNK = 8 # multiplications per task sent to a pool
+
+def cryptoPool(workers):
+    return ProcessPoolExecutor(workers) if workers > 1 else None
+
+def mapPool(pool, f, *args):
+    if pool is None:
+        return list(map(f, *args))
+    return list(pool.map(f, *args, chunksize=CHUNK))
+
+def encodeBytes(b):
+    return ','.join(map(str, b))
+
+def decodeBytes(s):
+    return bytes(map(int, s.split(',')))
+
+def point(a):
+    return (int(a[0]), int(a[1]))
+
+def proveEquality(g, h, gx, hx, x, s):
+    # Chaum-Pedersen proof that log_g(gx) = log_h(hx) = x, with nonce s
+    gs = multiply(g, s)
+    hs = multiply(h, s)
+    c = hashPoints(g, h, gx, hx, gs, hs)
+    return gs, hs, (s + c * x) % N
+
+def prepCard(gScalar, x, hScalar):
+    g = multiply(G, gScalar)
+    return g, multiply(g, x), multiply(G, hScalar)
+
+def submitPrep(db, address, tableId, pool=None, rng=None):
+    key = f'/{address}/{tableId}/prep'
+    # g (as a random point), x and h (as a random point) for each card
+    scalars = [(randomScalar(rng), randomScalar(rng), randomScalar(rng)) for _ in range(53)]
+    cards = mapPool(pool, prepCard, *zip(*scalars))
+    hash = bytes(32)
+    for i, ((_, x, _), (g, gx, h)) in enumerate(zip(scalars, cards)):
+        gb = pointToBytes(g)
+        db.push(f'{key}/{i}/g', encodeBytes(gb))
+        db.push(f'{key}/{i}/x', str(x))
+        gxb = pointToBytes(gx)
+        db.push(f'{key}/{i}/gx', encodeBytes(gxb))
+        hb = pointToBytes(h)
+        db.push(f'{key}/{i}/h', encodeBytes(hb))
+        hash = sha256(hash + gb + gxb + hb)
+    return hash
+
+def prepProof(g, h, gx, x, s):
+    hx = multiply(h, x)
+    return hx, proveEquality(g, h, gx, hx, x, s)
+
+def verifyPrep(db, address, tableId, pool=None, rng=None):
+    key = f'/{address}/{tableId}/prep'
+    gs, xs, gxs, hs = [], [], [], []
+    for i in range(53):
+        gs.append(bytesToPoint(decodeBytes(db.getData(f'{key}/{i}/g'))))
+        xs.append(int(db.getData(f'{key}/{i}/x')))
+        gxs.append(bytesToPoint(decodeBytes(db.getData(f'{key}/{i}/gx'))))
+        hs.append(bytesToPoint(decodeBytes(db.getData(f'{key}/{i}/h'))))
+    nonces = [randomScalar(rng) for _ in range(53)]
+    cards = []
+    for g, h, gx, (hx, (ps, pt, scx)) in zip(gs, hs, gxs,
+                                             mapPool(pool, prepProof, gs, hs, gxs, xs, nonces)):
+        cards.append(dict(g=list(g), h=list(h), gx=list(gx), hx=list(hx),
+                          p=dict(gs=list(ps), hs=list(pt), scx=scx)))
+    return cards
+
+def shuffleArray(a, rng=None):
+    # Fisher-Yates, as shuffleArray in lib.js
+    for i in range(len(a) - 1, 0, -1):
+        j = randomBelow(i + 1, rng)
+        a[i], a[j] = a[j], a[i]
+
+def hashCommitment(c):
+    hash = bytes(32)
+    for d in c:
+        for p in d:
+            hash = sha256(hash + uint256ToBytes(p[0]) + uint256ToBytes(p[1]))
+    return hash
+
+def shuffleFromLogs(deck, deckId, index):
+    # shuffle[index] (submitted by player index - 1) of a hashed deck, which keeps it only in logs
+    # (the latest submission since the deck was made or last reshuffled)
+    logs = list(deck.SubmitShuffle.range(deck.logsFrom(deckId), deck.chain_manager.blocks.height + 1,
+                                         search_topics=dict(id=deckId, playerIdx=index - 1)))
+    return [point(c) for c in logs[-1].event_arguments['cards']]
+
+def lastShuffle(deck, deckId):
+    count = deck.shuffleCount(deckId)
+    if count and deck.hashed(deckId):
+        return shuffleFromLogs(deck, deckId, count)
+    return deck.lastShuffle(deckId)
+
+def shuffleWithPermutation(db, deck, address, tableId, deckId, verifRounds, permutation,
+                           pool=None, rng=None):
+    key = f'/{address}/{tableId}/shuffle'
+    x = randomScalar(rng)
+    db.push(f'{key}/secret', str(x))
+    permutation = [0] + list(permutation)
+    db.push(f'{key}/permutation', permutation)
+    lastCards = lastShuffle(deck, deckId)
+    cards = mapPool(pool, multiply, [point(lastCards[i]) for i in permutation], repeat(x))
+    secrets = [randomScalar(rng) for _ in range(verifRounds)]
+    permutations = []
+    for _ in secrets:
+        a = list(range(53))
+        shuffleArray(a, rng)
+        permutations.append(a)
+    db.push(f'{key}/secrets', [str(s) for s in secrets])
+    db.push(f'{key}/permutations', permutations)
+    # every round in one map
+    committed = mapPool(pool, multiply, [cards[i] for p in permutations for i in p],
+                        [s for s in secrets for _ in range(53)])
+    commitment = [committed[k * 53:(k + 1) * 53] for k in range(verifRounds)]
+    db.push(f'{key}/commitment', [[[str(n) for n in c] for c in d] for d in commitment])
+    return [list(c) for c in cards], hashCommitment(commitment)
+
+def shuffle(db, deck, address, tableId, deckId, verifRounds, pool=None, rng=None):
+    permutation = list(range(1, 53))
+    shuffleArray(permutation, rng)
+    return shuffleWithPermutation(db, deck, address, tableId, deckId, verifRounds,
+                                  permutation, pool, rng)
+
+def verifyShuffle(db, deck, address, tableId, deckId, seatIndex):
+    key = f'/{address}/{tableId}/shuffle'
+    challenge = deck.challengeRnd(deckId, seatIndex)
+    secret = int(db.getData(f'{key}/secret'))
+    permutation = db.getData(f'{key}/permutation')
+    secrets = db.getData(f'{key}/secrets')
+    permutations = db.getData(f'{key}/permutations')
+    commitment = [[[int(n) for n in c] for c in d] for d in db.getData(f'{key}/commitment')]
+    scalars = []
+    responsePermutations = []
+    for s, p in zip(secrets, permutations):
+        if challenge % 2 == 0:
+            scalars.append(secret * int(s) % N)
+            responsePermutations.append([permutation[j] for j in p])
+        else:
+            scalars.append(int(s))
+            responsePermutations.append(p)
+        challenge //= 2
+    return commitment, scalars, responsePermutations
+
+def shuffleSources(deck, deckId, seatIndex, verifRounds):
+    # for defuseNextChallenge on a hashed deck: the shuffle each round is checked against,
+    # the one before seatIndex's (challenge bit 0) or seatIndex's own (bit 1)
+    challenge = deck.challengeRnd(deckId, seatIndex)
+    shuffles = {}
+    sources = []
+    for _ in range(verifRounds):
+        index = seatIndex + challenge % 2
+        if index not in shuffles:
+            shuffles[index] = ([point(c) for c in deck.baseCards(deckId)] if index == 0
+                               else shuffleFromLogs(deck, deckId, index))
+        sources.append([list(c) for c in shuffles[index]])
+        challenge //= 2
+    return sources
+
+def baseCardIndex(deck, deckId, base, cache=None):
+    # {card: its index in baseCards} for finding the index of a decrypted card in one lookup
+    # the base cards are fixed once the deck is prepped, so the index is built once per deck,
+    # cached by deck and base card since deck ids repeat when a chain is restored
+    key = (deckId, base)
+    if cache is None or key not in cache:
+        index = {point(c): i for i, c in enumerate(deck.baseCards(deckId))}
+        if cache is None:
+            return index
+        cache[key] = index
+    return cache[key]
+
+def decryptProof(g, gx, lastDecrypt, secret, s):
+    decrypt = multiply(lastDecrypt, pow(secret, -1, N))
+    return decrypt, proveEquality(g, decrypt, gx, lastDecrypt, secret, s)
+
+def decryptCards(db, deck, address, tableId, deckId, seatIndex, cardIndices, drawIndices,
+                 pool=None, rng=None):
+    lastDecrypts = [point(c) for c in deck.lastDecrypts(deckId, list(cardIndices))]
+    proving = [lastDecrypt for drawIndex, lastDecrypt in zip(drawIndices, lastDecrypts)
+               if drawIndex != seatIndex]
+    if not proving:
+        return [[cardIndex, *lastDecrypt, 0, 0, 0, 0, 0]
+                for cardIndex, lastDecrypt in zip(cardIndices, lastDecrypts)]
+    secret = int(db.getData(f'/{address}/{tableId}/shuffle/secret'))
+    g, gx = map(point, deck.shuffleBases(deckId, [seatIndex, seatIndex + 1]))
+    nonces = [randomScalar(rng) for _ in proving]
+    proofs = iter(mapPool(pool, decryptProof, repeat(g), repeat(gx), proving, repeat(secret),
+                          nonces))
+    result = []
+    for cardIndex, drawIndex, lastDecrypt in zip(cardIndices, drawIndices, lastDecrypts):
+        if drawIndex == seatIndex:
+            result.append([cardIndex, *lastDecrypt, 0, 0, 0, 0, 0])
+        else:
+            decrypt, (gs, hs, scx) = next(proofs)
+            result.append([cardIndex, *decrypt, *gs, *hs, scx])
+    return result
+
+def lookAtCards(db, deck, address, tableId, deckId, cardIndices, cache=None, seatIndex=None):
+    # one shuffleBases and one lastDecrypts call for all the cards (the base cards are cached)
+    # with seatIndex, also returns the bases of that seat's shuffle for revealing
+    secret = int(db.getData(f'/{address}/{tableId}/shuffle/secret'))
+    inverse = pow(secret, -1, N)
+    idxs = [0] if seatIndex is None else [0, seatIndex, seatIndex + 1]
+    shuffleBases = [point(b) for b in deck.shuffleBases(deckId, idxs)]
+    index = baseCardIndex(deck, deckId, shuffleBases[0], cache)
+    looked = []
+    for lastDecrypt in map(point, deck.lastDecrypts(deckId, list(cardIndices))):
+        card = multiply(lastDecrypt, inverse)
+        openIndex = index.get(card, len(index))
+        looked.append(dict(openIndex=openIndex, card=card, lastDecrypt=lastDecrypt, secret=secret))
+    return looked, shuffleBases[1:]
+
+def lookAtCard(db, deck, address, tableId, deckId, cardIndex, cache=None):
+    return lookAtCards(db, deck, address, tableId, deckId, [cardIndex], cache)[0][0]
+
+def revealCards(db, deck, address, tableId, deckId, seatIndex, cardIndices, cache=None,
+                rng=None):
+    looked, (g, gx) = lookAtCards(db, deck, address, tableId, deckId, cardIndices, cache, seatIndex)
+    result = []
+    for cardIndex, card in zip(cardIndices, looked):
+        gs, hs, scx = proveEquality(g, card['card'], gx, card['lastDecrypt'], card['secret'],
+                                    randomScalar(rng))
+        result.append([cardIndex, card['openIndex'], *gs, *hs, scx])
+    return result
+
+class DeckClient:
+    # runs the deck protocol for the holders of accounts on one Deck contract
+    # in-process, keeping secrets in db (one transaction per operation)
+    # and the base card index of each deck it has looked at in baseCardIndex
+    # with pool (which several clients can share), the multiplications run in its processes
+    # with seed, each account draws from its own SeededRandom(f'{seed}/{address}'),
+    # as deck.js --seed does, so runs are reproducible
+
+    def __init__(self, deck, db, pool=None, seed=None):
+        self.deck = deck
+        self.db = openDb(db) if isinstance(db, str) else db
+        self.pool = pool
+        self.seed = seed
+        self.rngs = {}
+        self.baseCardIndex = {}
+
+    def rng(self, address):
+        if self.seed is None:
+            return None
+        if address not in self.rngs:
+            self.rngs[address] = SeededRandom(f'{self.seed}/{address}')
+        return self.rngs[address]
+
+    def submitPrep(self, address, tableId):
+        with self.db.transaction() as tx:
+            return submitPrep(tx, address, tableId, self.pool, self.rng(address))
+
+    def verifyPrep(self, address, tableId):
+        return verifyPrep(self.db, address, tableId, self.pool, self.rng(address))
+
+    def shuffle(self, address, tableId, deckId, verifRounds, permutation=None):
+        with self.db.transaction() as tx:
+            if permutation is None:
+                return shuffle(tx, self.deck, address, tableId, deckId, verifRounds, self.pool,
+                               self.rng(address))
+            return shuffleWithPermutation(tx, self.deck, address, tableId, deckId, verifRounds,
+                                          permutation, self.pool, self.rng(address))
+
+    def verifyShuffle(self, address, tableId, deckId, seatIndex):
+        return verifyShuffle(self.db, self.deck, address, tableId, deckId, seatIndex)
+
+    def decryptCards(self, address, tableId, deckId, seatIndex, cardIndices, drawIndices):
+        return decryptCards(self.db, self.deck, address, tableId, deckId, seatIndex,
+                            cardIndices, drawIndices, self.pool, self.rng(address))
+
+    def revealCards(self, address, tableId, deckId, seatIndex, cardIndices):
+        return revealCards(self.db, self.deck, address, tableId, deckId, seatIndex, cardIndices,
+                           self.baseCardIndex, self.rng(address))
+
+    def lookAtCards(self, address, tableId, deckId, cardIndices):
+        # the open index of each card (drawn to address, and decrypted by everyone else)
+        looked, _ = lookAtCards(self.db, self.deck, address, tableId, deckId, cardIndices,
+                                self.baseCardIndex)
+        return [card['openIndex'] for card in looked]
+
+    def dump(self):
+        return dumpDb(self.db.filename)
+
+    def load(self, text):
+        # replace the secrets with an earlier dump()
+        loadDb(self.db.filename, text)
+        self.db = openDb(self.db.filename)
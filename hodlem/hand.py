@@ -0,0 +1,108 @@
+# hand ranks with the encoding of Game.handRank (see the comment above it in Game.vy):
+# a category byte followed by five rank bytes, higher is better
+# cards are numbered as in the contracts: 1 + 13 * suit + rank, with rank 12 the ace
+#
+# a hand is reduced to 13-bit rank masks (ranks present, paired, tripled, quadrupled and
+# per suit), which index precomputed tables of the straight and of the top ranks in each mask
+# handRanks scores an (n, 5) to (n, 7) array of hands at once, handRank a single hand
+
+import numpy as np
+
+HIGH_CARD = 1
+PAIR = 2
+TWO_PAIR = 3
+THREE_OF_A_KIND = 4
+STRAIGHT = 5
+FLUSH = 6
+FULL_HOUSE = 7
+FOUR_OF_A_KIND = 8
+STRAIGHT_FLUSH = 9
+
+def encode(category, *ranks):
+    rank = category
+    for i in range(5):
+        rank = (rank << 8) | (ranks[i] if i < len(ranks) else 0)
+    return rank
+
+def decode(rank):
+    return tuple((rank >> (8 * i)) & 0xff for i in range(5, -1, -1))
+
+def card(rank, suit):
+    return 1 + 13 * suit + rank
+
+def highStraight(mask):
+    # bit 0 is the ace played low, bit 1 + rank is rank
+    mask = (mask << 1) | (mask >> 12)
+    for rank in range(12, 2, -1):
+        if (mask >> (rank - 3)) & 31 == 31:
+            return rank
+    return 0
+
+def topRanks(mask, n):
+    result = 0
+    for rank in range(12, -1, -1):
+        if n == 0:
+            break
+        if mask & (1 << rank):
+            result = (result << 8) | rank
+            n -= 1
+    return result
+
+STRAIGHTS = np.array([highStraight(m) for m in range(1 << 13)], dtype=np.int64)
+TOP = {n: np.array([topRanks(m, n) for m in range(1 << 13)], dtype=np.int64) for n in (1, 2, 3, 5)}
+RANK_BITS = np.array([0] + [1 << ((c - 1) % 13) for c in range(1, 53)], dtype=np.int64)
+POPCOUNT = np.array([bin(m).count('1') for m in range(1 << 13)], dtype=np.int64)
+
+def handRanks(cards):
+    # cards: integer array of shape (n, k) with 5 <= k <= 7; returns an int64 array of n ranks
+    cards = np.ascontiguousarray(np.asarray(cards, dtype=np.int64).T)
+    n = cards.shape[1]
+    ranks, pairs, trips, quads, suited = (np.zeros(n, dtype=np.int64) for _ in range(5))
+    # one card at a time, as Game.bestHandRank does
+    # (the masks are nested, so each update needs no branching)
+    for column in cards:
+        bit = RANK_BITS[column]
+        quads |= trips & bit
+        trips |= pairs & bit
+        pairs |= ranks & bit
+        ranks |= bit
+        suited |= np.int64(1) << (column - 1)
+    suits = np.stack([(suited >> (13 * s)) & 0x1fff for s in range(4)], axis=1)
+    flush = np.where(POPCOUNT[suits] >= 5, suits, 0).max(axis=1)
+    one = np.int64(1)
+
+    quad = TOP[1][quads]
+    triplet = TOP[1][trips]
+    fullPair = pairs & ~(one << triplet)
+    high = TOP[1][pairs]
+    low = TOP[1][pairs & ~(one << high)]
+    twoPair = pairs & ~(one << high) != 0
+
+    return np.select(
+        [(flush != 0) & (STRAIGHTS[flush] != 0),
+         quads != 0,
+         (trips != 0) & (fullPair != 0),
+         flush != 0,
+         STRAIGHTS[ranks] != 0,
+         trips != 0,
+         twoPair,
+         pairs != 0],
+        [(STRAIGHT_FLUSH << 40) | (STRAIGHTS[flush] << 32),
+         (FOUR_OF_A_KIND << 40) | (quad << 32) | (TOP[1][ranks & ~(one << quad)] << 24),
+         (FULL_HOUSE << 40) | (triplet << 32) | (TOP[1][fullPair] << 24),
+         (FLUSH << 40) | TOP[5][flush],
+         (STRAIGHT << 40) | (STRAIGHTS[ranks] << 32),
+         (THREE_OF_A_KIND << 40) | (triplet << 32) | (TOP[2][ranks & ~(one << triplet)] << 16),
+         (TWO_PAIR << 40) | (high << 32) | (low << 24) |
+         (TOP[1][ranks & ~(one << high) & ~(one << low)] << 16),
+         (PAIR << 40) | (high << 32) | (TOP[3][ranks & ~(one << high)] << 8)],
+        (HIGH_CARD << 40) | TOP[5][ranks])
+
+def handRank(cards):
+    return int(handRanks([cards])[0])
+
+def winners(board, holes):
+    # seat indices (into holes) holding the best hand, and that hand's rank
+    ranks = handRanks([list(board) + list(hole) for hole in holes])
+    best = int(ranks.max())
+    return [i for i, r in enumerate(ranks) if r == best], best
@@ -0,0 +1,213 @@
+# indexes Room and Game events into SQLite, keyed by (table, block, logIndex)
+# so a table's history is one range scan of the primary key
+# logs are fetched with eth_getLogs over ranges of blocks (halving a range the node
+# refuses), and each range is written in one SQLite transaction with the checkpoint,
+# so an interrupted run resumes where it stopped
+# the hashes of recently indexed blocks are kept: when the chain no longer has them
+# (a reorg), events from the orphaned blocks are dropped and indexing resumes from
+# the last block still on the chain
+#
+# usage: python -m hodlem.indexer --rpc URL --room ADDRESS --game ADDRESS [--follow]
+
+import argparse
+import json
+import sqlite3
+import time
+import urllib.request
+
+from eth_abi import decode
+from eth_utils import keccak, to_checksum_address
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+  tableId  INTEGER NOT NULL,
+  block    INTEGER NOT NULL,
+  logIndex INTEGER NOT NULL,
+  txHash   TEXT NOT NULL,
+  contract TEXT NOT NULL,
+  name     TEXT NOT NULL,
+  args     TEXT NOT NULL,
+  PRIMARY KEY (tableId, block, logIndex)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS eventsByBlock ON events (block);
+CREATE TABLE IF NOT EXISTS blocks (
+  number INTEGER PRIMARY KEY,
+  hash   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS checkpoint (
+  id    INTEGER PRIMARY KEY CHECK (id = 0),
+  block INTEGER NOT NULL
+);
+'''
+
+class RPCError(Exception):
+    pass
+
+class RPC:
+    def __init__(self, url):
+        self.url = url
+        self.nextId = 0
+
+    def __call__(self, method, *params):
+        self.nextId += 1
+        body = json.dumps(dict(jsonrpc='2.0', id=self.nextId, method=method, params=list(params)))
+        request = urllib.request.Request(self.url, body.encode(), {'Content-Type': 'application/json'})
+        with urllib.request.urlopen(request) as f:
+            response = json.load(f)
+        if 'error' in response:
+            raise RPCError(response['error'])
+        return response['result']
+
+def eventDecoders(abi):
+    # topic0 -> (name, decode(topics, data) -> dict of arguments)
+    decoders = {}
+    for item in abi:
+        if item.get('type') != 'event':
+            continue
+        inputs = item['inputs']
+        signature = f"{item['name']}({','.join(i['type'] for i in inputs)})"
+        def decoder(topics, data, inputs=inputs):
+            indexed = iter(topics[1:])
+            values = iter(decode([i['type'] for i in inputs if not i['indexed']], data))
+            args = {}
+            for i in inputs:
+                value = decode([i['type']], next(indexed))[0] if i['indexed'] else next(values)
+                if i['type'] == 'address':
+                    value = to_checksum_address(value)
+                elif isinstance(value, bytes):
+                    value = '0x' + value.hex()
+                args[i['name']] = value
+            return args
+        decoders['0x' + keccak(text=signature).hex()] = (item['name'], decoder)
+    return decoders
+
+def readAbi(path):
+    with open(path) as f:
+        return json.load(f)['abi']
+
+class Indexer:
+    def __init__(self, rpc, room, game, db='events.sqlite', roomAbi='.build/Room.json',
+                 gameAbi='.build/Game.json', startBlock=0, batchSize=2000, reorgDepth=64):
+        self.rpc = RPC(rpc) if isinstance(rpc, str) else rpc
+        self.addresses = [to_checksum_address(room), to_checksum_address(game)]
+        self.decoders = eventDecoders(readAbi(roomAbi)) | eventDecoders(readAbi(gameAbi))
+        self.startBlock = startBlock
+        self.batchSize = batchSize
+        self.reorgDepth = reorgDepth
+        self.db = sqlite3.connect(db)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def checkpoint(self):
+        # the last block indexed
+        row = self.db.execute('SELECT block FROM checkpoint').fetchone()
+        return row[0] if row else self.startBlock - 1
+
+    def blockHash(self, number):
+        block = self.rpc('eth_getBlockByNumber', hex(number), False)
+        return block and block['hash']
+
+    def rewind(self):
+        # find the last indexed block still on the chain and drop everything after it
+        checkpoint = self.checkpoint()
+        for number, hash in self.db.execute(
+                'SELECT number, hash FROM blocks WHERE number <= ? ORDER BY number DESC',
+                (checkpoint,)).fetchall():
+            if self.blockHash(number) == hash:
+                break
+        else:
+            # deeper than the hashes kept: start over from the oldest one
+            number = self.db.execute('SELECT min(number) FROM blocks').fetchone()[0]
+            number = self.startBlock - 1 if number is None else number - 1
+        if number == checkpoint:
+            return False
+        with self.db:
+            self.db.execute('DELETE FROM events WHERE block > ?', (number,))
+            self.db.execute('DELETE FROM blocks WHERE number > ?', (number,))
+            self.setCheckpoint(number)
+        return True
+
+    def setCheckpoint(self, number):
+        self.db.execute('INSERT OR REPLACE INTO checkpoint (id, block) VALUES (0, ?)', (number,))
+
+    def getLogs(self, fromBlock, toBlock):
+        # returns the logs and the last block they cover, which is toBlock
+        # unless the node refused the range and it had to be narrowed
+        while True:
+            try:
+                return self.rpc('eth_getLogs', dict(address=self.addresses,
+                                                    fromBlock=hex(fromBlock),
+                                                    toBlock=hex(toBlock))), toBlock
+            except RPCError:
+                if toBlock == fromBlock:
+                    raise
+                toBlock = (fromBlock + toBlock) // 2
+
+    def sync(self, head=None):
+        # index up to head (the latest block by default); returns the number of new events
+        if head is None:
+            head = int(self.rpc('eth_blockNumber'), 16)
+        self.rewind()
+        count = 0
+        fromBlock = self.checkpoint() + 1
+        while fromBlock <= head:
+            logs, toBlock = self.getLogs(fromBlock, min(head, fromBlock + self.batchSize - 1))
+            rows = []
+            hashes = {toBlock: self.blockHash(toBlock)}
+            for log in logs:
+                if log.get('removed') or log['topics'][0] not in self.decoders:
+                    continue
+                name, decoder = self.decoders[log['topics'][0]]
+                topics = [bytes.fromhex(t[2:]) for t in log['topics']]
+                args = decoder(topics, bytes.fromhex(log['data'][2:]))
+                block = int(log['blockNumber'], 16)
+                hashes[block] = log['blockHash']
+                rows.append((args['table'], block, int(log['logIndex'], 16), log['transactionHash'],
+                             to_checksum_address(log['address']), name, json.dumps(args)))
+            with self.db:
+                self.db.executemany('INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+                self.db.executemany('INSERT OR REPLACE INTO blocks VALUES (?, ?)', hashes.items())
+                self.db.execute('DELETE FROM blocks WHERE number < ?', (toBlock - self.reorgDepth,))
+                self.setCheckpoint(toBlock)
+            count += len(rows)
+            fromBlock = toBlock + 1
+        return count
+
+    def follow(self, interval=2):
+        while True:
+            self.sync()
+            time.sleep(interval)
+
+    def tableHistory(self, tableId, fromBlock=0):
+        # the table's events in chain order
+        return [dict(block=block, logIndex=logIndex, txHash=txHash, contract=contract,
+                     name=name, args=json.loads(args))
+                for block, logIndex, txHash, contract, name, args in self.db.execute(
+                    'SELECT block, logIndex, txHash, contract, name, args FROM events '
+                    'WHERE tableId = ? AND block >= ? ORDER BY block, logIndex',
+                    (tableId, fromBlock))]
+
+def main():
+    parser = argparse.ArgumentParser(description='index Room and Game events into SQLite')
+    parser.add_argument('--rpc', required=True)
+    parser.add_argument('--room', required=True)
+    parser.add_argument('--game', required=True)
+    parser.add_argument('--db', default='events.sqlite')
+    parser.add_argument('--room-abi', default='.build/Room.json')
+    parser.add_argument('--game-abi', default='.build/Game.json')
+    parser.add_argument('--start-block', type=int, default=0)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--follow', action='store_true', help='keep polling for new blocks')
+    parser.add_argument('--interval', type=float, default=2)
+    args = parser.parse_args()
+    indexer = Indexer(args.rpc, args.room, args.game, args.db, args.room_abi, args.game_abi,
+                      args.start_block, args.batch_size)
+    if args.follow:
+        indexer.follow(args.interval)
+    else:
+        print(f'{indexer.sync()} events indexed up to block {indexer.checkpoint()}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# attributes the gas of transactions to the Vyper functions and source lines that spent it
+# each transaction is replayed with debug_traceTransaction (anvil's, or any node with the
+# default struct logger), and every step's gas is charged to the line its pc maps to in the
+# compiler's source map, under the stack of functions running it: external calls are
+# followed from contract to contract, and internal calls found from the source map's jumps
+# into functions, so Room.showCards;Game.autoShow;Game.bestHand;Game.vy:412 is a line of
+# bestHand run by autoShow when Room.showCards called it
+# the stacks come out in collapsed form (one "frame;frame;... gas" line per stack, for
+# flamegraph.pl or speedscope), and summed per function (self and inclusive gas) and per line
+#
+# usage: python -m hodlem.profile --rpc URL --contract Deck=ADDRESS --contract Room=ADDRESS
+#          --contract Game=ADDRESS [--folded FILE] [--lines 20] TXHASH...
+
+import argparse
+import json
+import os
+import re
+import subprocess
+from collections import defaultdict
+
+from eth_utils import to_checksum_address
+
+from hodlem.indexer import RPC
+
+CONTRACTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'contracts')
+CALLS = {'CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL'}
+# the gas of a transaction outside its steps: intrinsic and calldata gas, less refunds
+OVERHEAD = '(intrinsic - refund)'
+
+class SourceMap:
+    # pc -> line, and pc -> function for the pcs of function bodies, of a contract's runtime
+    # code (from vyper -f source_map, which maps the first pcs of each statement)
+
+    def __init__(self, name, path=None):
+        self.name = name
+        path = os.path.abspath(path or os.path.join(CONTRACTS, f'{name}.vy'))
+        self.file = os.path.basename(path)
+        output = subprocess.run(['vyper', '-f', 'source_map', self.file], cwd=os.path.dirname(path),
+                                capture_output=True, text=True, check=True).stdout
+        sourceMap = json.loads(output)
+        self.lines = {int(pc): pos[0] for pc, pos in sourceMap['pc_pos_map'].items() if pos}
+        self.jumps = {int(pc): kind for pc, kind in sourceMap['pc_jump_map'].items()}
+        # a function's body runs from the line after its def to the next def
+        # (the def line itself is the selector check and argument decoding)
+        starts = []
+        with open(path) as f:
+            for lineno, text in enumerate(f, 1):
+                match = re.match(r'def (\w+)', text)
+                if match:
+                    starts.append((lineno, match[1]))
+        ends = [start for start, _ in starts[1:]] + [float('inf')]
+        self.functions = {pc: name for pc, line in self.lines.items()
+                          for (start, name), end in zip(starts, ends) if start < line < end}
+
+class Frame:
+    # the code running at one call depth: the stack of its functions, each with the
+    # line it last started, which is charged for the pcs the source map leaves out
+
+    def __init__(self, sourceMap, address):
+        self.sourceMap = sourceMap
+        self.address = address
+        self.functions = [] # [name, line]
+        self.entering = False
+
+    def names(self):
+        if not self.sourceMap:
+            return [self.address]
+        if not self.functions:
+            return [f'{self.sourceMap.name}.(dispatch)']
+        return [f'{self.sourceMap.name}.{name}' for name, _ in self.functions]
+
+    def step(self, pc):
+        # follows the function stack to pc; returns the frames to charge within the top function
+        if not self.sourceMap:
+            return ()
+        function = self.sourceMap.functions.get(pc)
+        if function:
+            names = [name for name, _ in self.functions]
+            if function in names:
+                # returned to a caller
+                del self.functions[names.index(function) + 1:]
+            elif self.entering or not self.functions:
+                self.functions.append([function, None])
+            else:
+                self.functions[-1][0] = function
+            self.functions[-1][1] = self.sourceMap.lines[pc]
+            self.entering = False
+        if self.sourceMap.jumps.get(pc) == 'i':
+            self.entering = True
+        if self.functions and self.functions[-1][1]:
+            return (f'{self.sourceMap.file}:{self.functions[-1][1]}',)
+        return ()
+
+def stepCosts(steps):
+    # the gas each step spent itself: a call is charged what it used
+    # less what the steps of the called code spent
+    costs = [0] * len(steps)
+    calls = [] # (index of the call step, total spent before the called code ran)
+    spent = 0
+    for i, step in enumerate(steps):
+        last = i + 1 == len(steps)
+        if last or steps[i + 1]['depth'] < step['depth']:
+            # the end of a call (or of the transaction)
+            costs[i] = step['gasCost']
+        elif steps[i + 1]['depth'] > step['depth']:
+            calls.append((i, spent))
+            continue
+        else:
+            costs[i] = step['gas'] - steps[i + 1]['gas']
+        spent += costs[i]
+        while not last and calls and steps[i + 1]['depth'] == steps[calls[-1][0]]['depth']:
+            j, before = calls.pop()
+            costs[j] = steps[j]['gas'] - steps[i + 1]['gas'] - (spent - before)
+            spent += costs[j]
+    return costs
+
+def callee(step):
+    # the address a call step calls (the second word from the top of its stack)
+    word = int(step['stack'][-2], 16) & (2 ** 160 - 1)
+    return to_checksum_address(word.to_bytes(20, 'big'))
+
+class Profiler:
+    def __init__(self, rpc, contracts):
+        # contracts: address -> SourceMap of the code deployed there
+        self.rpc = RPC(rpc) if isinstance(rpc, str) else rpc
+        self.contracts = {to_checksum_address(a): s for a, s in contracts.items()}
+
+    def frame(self, address):
+        return Frame(self.contracts.get(address), address)
+
+    def stacks(self, txHash):
+        # collapsed stack (a tuple of frames, outermost first) -> gas
+        if not isinstance(txHash, str):
+            txHash = '0x' + bytes(txHash).hex()
+        tx = self.rpc('eth_getTransactionByHash', txHash)
+        trace = self.rpc('debug_traceTransaction', txHash,
+                         dict(disableStorage=True, disableStack=False, enableMemory=False))
+        steps = trace['structLogs']
+        costs = stepCosts(steps)
+        result = defaultdict(int)
+        frames = [self.frame(to_checksum_address(tx['to']))]
+        for i, step in enumerate(steps):
+            del frames[step['depth']:]
+            leaf = frames[-1].step(step['pc'])
+            result[tuple(name for frame in frames for name in frame.names()) + leaf] += costs[i]
+            if i + 1 < len(steps) and steps[i + 1]['depth'] > step['depth']:
+                frames.append(self.frame(callee(step)) if step['op'] in CALLS
+                              else Frame(None, f'({step["op"]})'))
+        result[(OVERHEAD,)] += trace['gas'] - sum(costs)
+        return dict(result)
+
+def contractProfiler(rpc, **contracts):
+    # a Profiler for contracts given by name, e.g. contractProfiler(url, Deck=deck, Room=room)
+    return Profiler(rpc, {contract.address: SourceMap(name) for name, contract in contracts.items()})
+
+def merge(profiles):
+    result = defaultdict(int)
+    for stacks in profiles:
+        for stack, gas in stacks.items():
+            result[stack] += gas
+    return dict(result)
+
+def collapsed(stacks):
+    # the lines of a flamegraph.pl input, heaviest first (flame graphs take no negative gas)
+    return [f"{';'.join(stack)} {gas}"
+            for stack, gas in sorted(stacks.items(), key=lambda item: -item[1]) if gas > 0]
+
+def functionTable(stacks):
+    # function -> [self gas, inclusive gas], counting a function once per stack it is on
+    table = defaultdict(lambda: [0, 0])
+    for stack, gas in stacks.items():
+        functions = [frame for frame in stack if '.' in frame and ':' not in frame]
+        if not functions:
+            table[stack[-1]][0] += gas
+            table[stack[-1]][1] += gas
+            continue
+        table[functions[-1]][0] += gas
+        for function in set(functions):
+            table[function][1] += gas
+    return dict(table)
+
+def lineTable(stacks):
+    table = defaultdict(int)
+    for stack, gas in stacks.items():
+        if ':' in stack[-1]:
+            table[stack[-1]] += gas
+    return dict(table)
+
+def formatTables(stacks, lines=20):
+    # shares are of the gas the steps spent (the execution gas)
+    overhead = stacks.get((OVERHEAD,), 0)
+    stacks = {stack: gas for stack, gas in stacks.items() if stack != (OVERHEAD,)}
+    execution = sum(stacks.values()) or 1
+    rows = [f"{'function':<36}{'self gas':>12}{'self':>8}{'inclusive':>12}{'incl.':>8}"]
+    for name, (own, inclusive) in sorted(functionTable(stacks).items(), key=lambda item: -item[1][0]):
+        rows.append(f"{name:<36}{own:>12}{own / execution:>8.1%}"
+                    f"{inclusive:>12}{inclusive / execution:>8.1%}")
+    if lines:
+        rows.append(f"{'line':<36}{'gas':>12}")
+        for line, gas in sorted(lineTable(stacks).items(), key=lambda item: -item[1])[:lines]:
+            rows.append(f"{line:<36}{gas:>12}{gas / execution:>8.1%}")
+    rows.append(f"{'execution':<36}{sum(stacks.values()):>12}")
+    rows.append(f"{OVERHEAD:<36}{overhead:>12}")
+    rows.append(f"{'gas used':<36}{sum(stacks.values()) + overhead:>12}")
+    return '\n'.join(rows)
+
+def writeProfiles(profiler, hashes, directory, lines=20):
+    # for each name -> transaction hash, writes name.folded and name.txt (the tables)
+    os.makedirs(directory, exist_ok=True)
+    for name, txHash in hashes.items():
+        stacks = profiler.stacks(txHash)
+        with open(os.path.join(directory, f'{name}.folded'), 'w') as f:
+            f.write('\n'.join(collapsed(stacks)) + '\n')
+        with open(os.path.join(directory, f'{name}.txt'), 'w') as f:
+            f.write(f'{name} {txHash}\n{formatTables(stacks, lines)}\n')
+
+def main():
+    parser = argparse.ArgumentParser(description='attribute the gas of transactions to Vyper source')
+    parser.add_argument('--rpc', required=True)
+    parser.add_argument('--contract', action='append', default=[], metavar='NAME=ADDRESS',
+                        help='contracts/NAME.vy is deployed at ADDRESS (or NAME=ADDRESS=PATH)')
+    parser.add_argument('--folded', help='write the collapsed stacks to this file')
+    parser.add_argument('--lines', type=int, default=20, help='heaviest source lines to list')
+    parser.add_argument('tx', nargs='+', help='transaction hashes (their gas is summed)')
+    args = parser.parse_args()
+    contracts = {}
+    for spec in args.contract:
+        name, address, *path = spec.split('=')
+        contracts[address] = SourceMap(name, *path)
+    profiler = Profiler(args.rpc, contracts)
+    stacks = merge(profiler.stacks(tx) for tx in args.tx)
+    if args.folded:
+        with open(args.folded, 'w') as f:
+            f.write('\n'.join(collapsed(stacks)) + '\n')
+    print(formatTables(stacks, args.lines))
+
+if __name__ == '__main__':
+    main()
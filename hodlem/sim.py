@@ -0,0 +1,337 @@
+# headless sit-n-go tournaments against deployed Room, Game and Deck contracts
+# every seat is a bot with its own secrets (a DeckClient) and a betting policy,
+# tables run concurrently as asyncio tasks, and the blocking contract calls and
+# card cryptography run in worker threads
+# the contracts are used as ape contract instances (calls take sender=account)
+# each table records its transactions, gas, hands, and the blocks and seconds
+# spent in each phase; simulate() gathers these into a report
+
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+Req_DECK = 0
+Req_SHOW = 2
+Phase_PREP = 2
+Phase_SHUF = 3
+Phase_DEAL = 4
+Phase_PLAY = 5
+Phase_SHOW = 6
+PHASES = {Phase_PREP: "prep", Phase_SHUF: "shuffle", Phase_DEAL: "deal",
+          Phase_PLAY: "play", Phase_SHOW: "show"}
+
+# policies choose a betting action from a view of the table:
+# toCall (chips needed to call), minRaiseTo (smallest legal raise), stack, pot
+# and return ("fold",), ("call",) (which checks when there is nothing to call)
+# or ("raise", raiseTo), where raiseTo is capped by the table at an all-in
+
+def callPolicy(rng, view):
+    return ("call",)
+
+def raisePolicy(rng, view):
+    return ("raise", view["minRaiseTo"])
+
+def randomPolicy(rng, view):
+    r = rng.random()
+    if view["toCall"] and r < 0.15:
+        return ("fold",)
+    if r > 0.8:
+        return ("raise", view["minRaiseTo"] + rng.randrange(3) * (view["minRaiseTo"] - view["bet"]))
+    return ("call",)
+
+POLICIES = {"call": callPolicy, "raise": raisePolicy, "random": randomPolicy}
+
+class Stalled(Exception):
+    pass
+
+class TableStats:
+    def __init__(self):
+        self.txs = 0
+        self.gas = 0
+        self.hands = 0
+        self.methods = defaultdict(lambda: [0, 0])
+        self.worst = {} # name -> (gas, transaction hash) of the costliest call
+        self.phaseBlocks = defaultdict(list)
+        self.phaseSeconds = defaultdict(list)
+        self.finished = False
+        self.error = None
+
+    def add(self, name, receipt):
+        self.txs += 1
+        self.gas += receipt.gas_used
+        self.methods[name][0] += 1
+        self.methods[name][1] += receipt.gas_used
+        if receipt.gas_used > self.worst.get(name, (0,))[0]:
+            self.worst[name] = (receipt.gas_used, receipt.txn_hash)
+        self.hands += sum(1 for e in receipt.events
+                          if e.event_name == "DealRound" and e.event_arguments["street"] == 1)
+
+class Table:
+    def __init__(self, room, game, deck, config, players, clients, policies, rng, maxHands):
+        self.room = room
+        self.game = game
+        self.deck = deck
+        self.config = config
+        self.players = players
+        self.clients = clients
+        self.policies = policies
+        self.rng = rng
+        self.maxHands = maxHands
+        self.numSeats = config["startsWith"]
+        self.stats = TableStats()
+        self.tableId = None
+        self.block = 0
+
+    async def call(self, f, *args, **kwargs):
+        return await asyncio.to_thread(f, *args, **kwargs)
+
+    async def send(self, name, f, *args, **kwargs):
+        receipt = await self.call(f, *args, **kwargs)
+        self.stats.add(name, receipt)
+        self.block = max(self.block, receipt.block_number)
+        return receipt
+
+    async def each(self, coroutines):
+        # run one table step's independent transactions concurrently
+        # (each is from a different seat, so they never share a nonce)
+        await asyncio.gather(*coroutines)
+
+    async def join(self):
+        value = f"{self.config['bond'] + self.config['buyIn']} wei"
+        tx = await self.send("createTable", self.room.createTable, 0, self.config,
+                             sender=self.players[0], value=value)
+        self.tableId = tx.return_value
+        await self.each(self.send("joinTable", self.room.joinTable, self.tableId, seatIndex,
+                                  sender=self.players[seatIndex], value=value)
+                        for seatIndex in range(1, self.numSeats))
+        self.deckId = (await self.call(self.room.configParams, self.tableId))[-1]
+
+    async def run(self):
+        try:
+            await self.join()
+            phase, since, start = None, self.block, time.monotonic()
+            while True:
+                current = (await self.call(self.room.phaseCommit, self.tableId))[0]
+                if current != phase:
+                    if phase in PHASES:
+                        self.stats.phaseBlocks[PHASES[phase]].append(self.block - since)
+                        self.stats.phaseSeconds[PHASES[phase]].append(time.monotonic() - start)
+                    phase, since, start = current, self.block, time.monotonic()
+                if phase not in PHASES:
+                    # the game is over and the table deleted
+                    self.stats.finished = True
+                    break
+                if phase == Phase_SHUF and self.maxHands and self.stats.hands >= self.maxHands:
+                    break
+                await getattr(self, PHASES[phase])()
+        except Exception as e:
+            self.stats.error = f"{type(e).__name__}: {e}"
+        return self.stats
+
+    async def prep(self):
+        submitted = [await self.call(self.deck.hasSubmittedPrep, self.deckId, seatIndex)
+                     for seatIndex in range(self.numSeats)]
+        if not all(submitted):
+            await self.each(self.submitPrep(seatIndex) for seatIndex in range(self.numSeats)
+                            if not submitted[seatIndex])
+            return
+        pending = [seatIndex for seatIndex in range(self.numSeats)
+                   if not await self.call(self.deck.hasVerifiedPrep, self.deckId, seatIndex)]
+        await self.each(self.verifyPrep(seatIndex) for seatIndex in pending)
+
+    async def submitPrep(self, seatIndex):
+        player = self.players[seatIndex]
+        hash = await self.call(self.clients[seatIndex].submitPrep, player.address, self.tableId)
+        await self.send("submitPrep", self.room.submitPrep, self.tableId, seatIndex, hash, sender=player)
+
+    async def verifyPrep(self, seatIndex):
+        player = self.players[seatIndex]
+        prep = await self.call(self.clients[seatIndex].verifyPrep, player.address, self.tableId)
+        await self.send("verifyPrep", self.room.verifyPrep, self.tableId, seatIndex, prep, sender=player)
+
+    async def shuffle(self):
+        # shuffles go in seat order (the Room shuffles for eliminated seats),
+        # then verifications in any order
+        seatIndex = await self.call(self.deck.shuffleCount, self.deckId)
+        if seatIndex < self.numSeats:
+            if not await self.call(self.room.present, self.tableId, seatIndex):
+                raise Stalled(f"table {self.tableId}: eliminated seat {seatIndex} to shuffle")
+            player = self.players[seatIndex]
+            cards, hash = await self.call(self.clients[seatIndex].shuffle, player.address,
+                                          self.tableId, self.deckId, self.config["verifRounds"])
+            await self.send("submitShuffle", self.room.submitShuffle, self.tableId, seatIndex,
+                            cards, hash, sender=player)
+            return
+        shuffled = await self.call(self.room.shuffled, self.tableId)
+        pending = [seatIndex for seatIndex in range(self.numSeats) if not shuffled & (1 << seatIndex)
+                   and await self.call(self.room.present, self.tableId, seatIndex)]
+        if not pending:
+            raise Stalled(f"table {self.tableId}: no shuffle to verify")
+        await self.each(self.verifyShuffle(seatIndex) for seatIndex in pending)
+
+    async def verifyShuffle(self, seatIndex):
+        player = self.players[seatIndex]
+        c, s, p = await self.call(self.clients[seatIndex].verifyShuffle, player.address,
+                                  self.tableId, self.deckId, seatIndex)
+        await self.send("verifyShuffle", self.room.verifyShuffle, self.tableId, seatIndex, c, s, p,
+                        sender=player)
+
+    async def deal(self):
+        # every seat decrypts, in seat order, each card that is not left in the deck;
+        # each seat whose turn it is on some cards goes at once, and once everything is
+        # decrypted the cards to be shown are revealed by the seats they were drawn to
+        # the last transaction of the deal ends it, so it is sent after the others
+        req, drawIndex, decryptCount, opened = await self.call(self.room.cardInfo, self.tableId)
+        present = [await self.call(self.room.present, self.tableId, seatIndex)
+                   for seatIndex in range(self.numSeats)]
+        turns = defaultdict(list)
+        for cardIndex in range(26):
+            if req[cardIndex] != Req_DECK and decryptCount[cardIndex] < self.numSeats:
+                turns[decryptCount[cardIndex]].append(cardIndex)
+        reveals = defaultdict(list)
+        for cardIndex in range(26):
+            if req[cardIndex] == Req_SHOW and opened[cardIndex] == 0:
+                reveals[drawIndex[cardIndex]].append(cardIndex)
+        if turns:
+            absent = [seatIndex for seatIndex in turns if not present[seatIndex]]
+            if absent:
+                raise Stalled(f"table {self.tableId}: eliminated seat {absent[0]} to decrypt")
+            def afterTurn(seatIndex):
+                nextSeat = seatIndex + 1
+                while nextSeat < self.numSeats and not present[nextSeat]:
+                    nextSeat += 1
+                return nextSeat
+            final = not reveals and all(afterTurn(s) == self.numSeats for s in turns)
+            actions = [(self.decryptCards, seatIndex, cardIndices, drawIndex)
+                       for seatIndex, cardIndices in sorted(turns.items())]
+        elif reveals:
+            final = True
+            actions = [(self.revealCards, seatIndex, cardIndices, None)
+                       for seatIndex, cardIndices in sorted(reveals.items())]
+        else:
+            raise Stalled(f"table {self.tableId}: nothing left to deal")
+        *rest, last = actions
+        await self.each(f(seatIndex, cardIndices, info, False) for f, seatIndex, cardIndices, info in rest)
+        f, seatIndex, cardIndices, info = last
+        await f(seatIndex, cardIndices, info, final)
+
+    async def decryptCards(self, seatIndex, cardIndices, drawIndex, end):
+        player = self.players[seatIndex]
+        lists = await self.call(self.clients[seatIndex].decryptCards, player.address, self.tableId,
+                                self.deckId, seatIndex, cardIndices, [drawIndex[i] for i in cardIndices])
+        await self.send("decryptCards", self.room.decryptCards, self.tableId, seatIndex, lists, end,
+                        sender=player)
+
+    async def revealCards(self, seatIndex, cardIndices, _, end):
+        player = self.players[seatIndex]
+        lists = await self.call(self.clients[seatIndex].revealCards, player.address, self.tableId,
+                                self.deckId, seatIndex, cardIndices)
+        await self.send("revealCards", self.room.revealCards, self.tableId, seatIndex, lists, end,
+                        sender=player)
+
+    async def play(self):
+        data = await self.call(self.game.games, self.tableId)
+        seatIndex = data["actionIndex"]
+        player = self.players[seatIndex]
+        bet = data["bet"][data["betIndex"]]
+        stack = data["stack"][seatIndex]
+        myBet = data["bet"][seatIndex]
+        view = dict(toCall=min(bet - myBet, stack), bet=bet, minRaiseTo=bet + data["minRaise"],
+                    stack=stack, pot=sum(data["pot"]) + sum(data["bet"]))
+        action = self.policies[seatIndex](self.rng, view)
+        if action[0] == "raise" and stack > bet - myBet:
+            raiseTo = min(action[1], myBet + stack)
+            await self.send("raiseBet", self.game.raiseBet, self.tableId, seatIndex, raiseTo,
+                            sender=player)
+        elif action[0] == "fold" and bet > myBet:
+            await self.send("fold", self.game.fold, self.tableId, seatIndex, sender=player)
+        else:
+            await self.send("callBet", self.game.callBet, self.tableId, seatIndex, sender=player)
+
+    async def show(self):
+        data = await self.call(self.game.games, self.tableId)
+        seatIndex = data["actionIndex"]
+        player = self.players[seatIndex]
+        lists = await self.call(self.clients[seatIndex].revealCards, player.address, self.tableId,
+                                self.deckId, seatIndex, list(data["hands"][seatIndex]))
+        await self.send("showCards", self.game.showCards, self.tableId, seatIndex, lists,
+                        sender=player)
+
+def mean(xs):
+    return sum(xs) / len(xs) if xs else 0
+
+async def simulate(room, game, deck, config, players, clients, policies,
+                   numTables, seed=0, maxHands=0):
+    # players[t][i] (an account) with clients[t][i] (a DeckClient) and policies[t][i]
+    # sits at seat i of table t; maxHands (0 for no limit) stops a table between hands
+    tables = [Table(room, game, deck, config, players[t], clients[t], policies[t],
+                    random.Random(seed * numTables + t), maxHands)
+              for t in range(numTables)]
+    start = time.monotonic()
+    stats = await asyncio.gather(*(table.run() for table in tables))
+    elapsed = time.monotonic() - start
+    hands = sum(s.hands for s in stats)
+    methods = defaultdict(lambda: [0, 0])
+    worst = {}
+    phaseBlocks = defaultdict(list)
+    phaseSeconds = defaultdict(list)
+    for s in stats:
+        for name, (count, gas) in s.methods.items():
+            methods[name][0] += count
+            methods[name][1] += gas
+        for name, (gas, txHash) in s.worst.items():
+            if gas > worst.get(name, (0,))[0]:
+                worst[name] = (gas, txHash)
+        for name in s.phaseBlocks:
+            phaseBlocks[name] += s.phaseBlocks[name]
+            phaseSeconds[name] += s.phaseSeconds[name]
+    return dict(
+        tables=numTables,
+        finished=sum(s.finished for s in stats),
+        errors={table.tableId: table.stats.error for table in tables if table.stats.error},
+        seconds=elapsed,
+        hands=hands,
+        handsPerMinute=hands * 60 / elapsed if elapsed else 0,
+        txs=sum(s.txs for s in stats),
+        gas=sum(s.gas for s in stats),
+        txsPerHand=sum(s.txs for s in stats) / hands if hands else 0,
+        gasPerHand=sum(s.gas for s in stats) / hands if hands else 0,
+        methods={name: dict(count=count, gas=gas, meanGas=gas / count)
+                 for name, (count, gas) in sorted(methods.items())},
+        worstTxs={name: txHash for name, (_, txHash) in sorted(worst.items())},
+        phases={name: dict(count=len(phaseBlocks[name]),
+                           meanBlocks=mean(phaseBlocks[name]), maxBlocks=max(phaseBlocks[name]),
+                           meanSeconds=mean(phaseSeconds[name]), maxSeconds=max(phaseSeconds[name]))
+                for name in PHASES.values() if phaseBlocks[name]})
+
+def formatReport(report):
+    lines = [f"{report['finished']}/{report['tables']} tournaments finished, "
+             f"{report['hands']} hands in {report['seconds']:.1f}s "
+             f"({report['handsPerMinute']:.1f} hands/minute)",
+             f"{report['txs']} transactions, {report['gas']} gas: "
+             f"{report['txsPerHand']:.1f} transactions and {report['gasPerHand']:.0f} gas per hand"]
+    for tableId, error in report["errors"].items():
+        lines.append(f"table {tableId}: {error}")
+    lines.append(f"{'method':<14}{'count':>8}{'mean gas':>12}")
+    for name, m in report["methods"].items():
+        lines.append(f"{name:<14}{m['count']:>8}{m['meanGas']:>12.0f}")
+    lines.append(f"{'phase':<14}{'count':>8}{'mean blocks':>12}{'max blocks':>12}{'mean s':>10}{'max s':>10}")
+    for name, p in report["phases"].items():
+        lines.append(f"{name:<14}{p['count']:>8}{p['meanBlocks']:>12.1f}{p['maxBlocks']:>12}"
+                     f"{p['meanSeconds']:>10.2f}{p['maxSeconds']:>10.2f}")
+    return "\n".join(lines)
+
+def formatComparison(before, after):
+    # gas per hand, and mean gas per entry point, of report after against report before
+    # (e.g. the same tournament before and after a contract change)
+    def change(old, new):
+        return f"{(new - old) / old:>+9.1%}" if old else f"{'':>9}"
+    lines = [f"{'':<14}{'before':>12}{'after':>12}{'change':>9}",
+             f"{'gas per hand':<14}{before['gasPerHand']:>12.0f}{after['gasPerHand']:>12.0f}"
+             f"{change(before['gasPerHand'], after['gasPerHand'])}"]
+    for name in sorted(set(before["methods"]) | set(after["methods"])):
+        old = before["methods"].get(name, dict(meanGas=0))["meanGas"]
+        new = after["methods"].get(name, dict(meanGas=0))["meanGas"]
+        lines.append(f"{name:<14}{old:>12.0f}{new:>12.0f}{change(old, new)}")
+    return "\n".join(lines)
@@ -0,0 +1,91 @@
+# typed snapshots of whole tables, read with one Game.tableState call each
+# (instead of configParams, phaseCommit, games, cardInfo and per-seat lookups)
+# per-seat lists are cut to the table's number of seats
+
+from dataclasses import dataclass
+
+NUM_CARDS = 26 # cards tracked per hand (Room.cardInfo)
+
+@dataclass
+class Config:
+    buyIn: int
+    bond: int
+    startsWith: int
+    untilLeft: int
+    structure: list[int]
+    levelBlocks: int
+    verifRounds: int
+    prepBlocks: int
+    shuffBlocks: int
+    verifBlocks: int
+    dealBlocks: int
+    actBlocks: int
+
+@dataclass
+class Card:
+    requirement: int  # Req_DECK, Req_HAND or Req_SHOW
+    drawIndex: int    # seat the card is drawn to
+    decryptCount: int # seats that have decrypted it
+    opened: int       # 1 + the card, or 0 while not opened
+
+@dataclass
+class GameState:
+    startBlock: int
+    stack: list[int]
+    dealer: int
+    hands: list[list[int]]
+    board: list[int]
+    bet: list[int]
+    betIndex: int
+    stopIndex: int
+    minRaise: int
+    liveUntil: list[int]
+    pot: list[int]
+    numInHand: int
+    untilPot: int
+    actionIndex: int
+    actionBlock: int
+
+@dataclass
+class TableState:
+    tableId: int
+    config: Config
+    deckId: int
+    seats: list[str]
+    phase: int          # 0 once the table is deleted
+    commitBlock: int
+    present: list[bool] # seats contributing to the current shuffle
+    shuffled: list[bool] # seats that have verified their current shuffle
+    deckIndex: int
+    cards: list[Card]
+    game: GameState
+
+def bits(mask, n):
+    return [bool(mask >> i & 1) for i in range(n)]
+
+def decodeTableState(tableId, value):
+    # value is the tableState return value, as a tuple or an ape struct
+    config, deckId, seats, phase, commitBlock, present, shuffled, deckIndex, cards, game = (
+        value[i] for i in range(10))
+    config = Config(*(list(config[i]) if i == 4 else config[i] for i in range(12)))
+    n = config.startsWith
+    game = [game[i] for i in range(15)]
+    for i in (1, 5, 9): # per-seat arrays
+        game[i] = list(game[i][:n])
+    game[3] = [list(hand) for hand in game[3][:n]]
+    game[4], game[10] = list(game[4]), list(game[10])
+    return TableState(
+        tableId, config, deckId, list(seats[:n]), phase, commitBlock,
+        bits(present, n), bits(shuffled, n), deckIndex,
+        [Card(*(cards[j][i] for j in range(4))) for i in range(NUM_CARDS)],
+        GameState(*game))
+
+class TableStateClient:
+    def __init__(self, game):
+        self.game = game
+
+    def read(self, tableId):
+        return decodeTableState(tableId, self.game.tableState(tableId))
+
+    def readMany(self, tableIds):
+        return {tableId: self.read(tableId) for tableId in tableIds}
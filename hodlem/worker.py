@@ -0,0 +1,180 @@
+# client for a long-lived `interface/deck.js serve` worker
+# an alternative to hodlem.deck that keeps the JavaScript implementation:
+# node, ethers, the Deck contract and the JsonDB are loaded once per worker
+
+import json
+import math
+import subprocess
+
+from .db import dumpDb, loadDb
+
+def unflatten(words, shape):
+    if len(shape) == 1:
+        return words
+    step = math.prod(shape[1:])
+    return [unflatten(words[i * step:(i + 1) * step], shape[1:]) for i in range(shape[0])]
+
+def readFrames(data):
+    # parse deck.js --format bin output into one nested list per frame
+    # by slicing the words straight out of the buffer
+    mv = memoryview(data)
+    frames = []
+    offset = 0
+    while offset < len(mv):
+        rank = mv[offset]
+        offset += 1
+        shape = [int.from_bytes(mv[offset + 4 * i:offset + 4 * (i + 1)], 'big') for i in range(rank)]
+        offset += 4 * rank
+        end = offset + 32 * math.prod(shape)
+        words = [int.from_bytes(mv[o:o + 32], 'big') for o in range(offset, end, 32)]
+        frames.append(unflatten(words, shape))
+        offset = end
+    return frames
+
+def prepDict(c):
+    return dict(g=c[0:2], h=c[2:4], gx=c[4:6], hx=c[6:8],
+                p=dict(gs=c[8:10], hs=c[10:12], scx=c[12]))
+
+def readPrep(f):
+    a = []
+    def n():
+        return int(next(f), 16)
+    for _ in range(53):
+        a.append(dict(g=[n(), n()], h=[n(), n()],
+                      gx=[n(), n()], hx=[n(), n()],
+                      p=dict(gs=[n(), n()], hs=[n(), n()], scx=n())))
+    return a
+
+def readShuffle(f):
+    a = []
+    def n():
+        return int(next(f), 16)
+    for _ in range(53):
+        a.append([n(), n()])
+    return a
+
+def readVerification(f):
+    # one commitment (53 points), scalar and permutation (53 indices) per round
+    words = [int(w, 16) for w in f]
+    rounds = len(words) // (53 * 2 + 1 + 53)
+    c = unflatten(words[:rounds * 106], [rounds, 53, 2])
+    s = words[rounds * 106:rounds * 107]
+    p = unflatten(words[rounds * 107:], [rounds, 53])
+    return c, s, p
+
+def readIntLists(f, z):
+    a = []
+    def n():
+        return int(next(f), 16)
+    for _ in range(26):
+        try:
+            a.append([n() for _ in range(z)])
+        except StopIteration:
+            break
+    return a
+
+class DeckWorker:
+    # same interface as hodlem.deck.DeckClient
+
+    def __init__(self, deckAddress, rpc, db, abi='.build/Deck.json', script='interface/deck.js',
+                 format='bin', seed=None):
+        self.db = db
+        self.format = format
+        seeded = [] if seed is None else ['--seed', str(seed)]
+        self.process = subprocess.Popen(
+            [script, '--db', db, '--rpc', rpc, '--deck', deckAddress, '--abi', abi,
+             '--format', format, *seeded, 'serve'],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.nextId = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def read(self, n):
+        data = self.process.stdout.read(n)
+        if len(data) < n:
+            raise RuntimeError(f'deck.js worker exited with {self.process.wait()}')
+        return data
+
+    def request(self, command, **options):
+        # returns the frames (bin format) or an iterator over the printed values (text format)
+        id = self.nextId
+        self.nextId += 1
+        line = json.dumps(dict(id=id, command=command, options=options)) + '\n'
+        self.process.stdin.write(line.encode())
+        self.process.stdin.flush()
+        if self.format == 'bin':
+            head = self.read(5)
+            body = self.read(int.from_bytes(head[1:], 'big'))
+            if head[0] != 0:
+                raise RuntimeError(body.decode())
+            return readFrames(body)
+        line = self.process.stdout.readline()
+        if not line:
+            raise RuntimeError(f'deck.js worker exited with {self.process.wait()}')
+        response = json.loads(line)
+        assert response['id'] == id, 'deck.js worker out of sync'
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return iter(response['result'])
+
+    def submitPrep(self, address, tableId):
+        result = self.request('submitPrep', **{'from': address, 'id': tableId})
+        hash = result[0][0] if self.format == 'bin' else int(next(result), 16)
+        return hash.to_bytes(32, 'big')
+
+    def verifyPrep(self, address, tableId):
+        result = self.request('verifyPrep', **{'from': address, 'id': tableId})
+        if self.format == 'bin':
+            return [prepDict(c) for c in result[0]]
+        return readPrep(result)
+
+    def shuffle(self, address, tableId, deckId, verifRounds, permutation=None):
+        options = {'from': address, 'id': tableId, 'deckId': deckId, 'verifRounds': verifRounds}
+        if permutation is not None:
+            options['order'] = ','.join(map(str, permutation))
+        result = self.request('shuffle', **options)
+        if self.format == 'bin':
+            cards, [hash] = result
+        else:
+            cards, hash = readShuffle(result), int(next(result), 16)
+        return cards, hash.to_bytes(32, 'big')
+
+    def verifyShuffle(self, address, tableId, deckId, seatIndex):
+        result = self.request('verifyShuffle', **{'from': address, 'id': tableId,
+                                                  'deckId': deckId, 'seatIndex': seatIndex})
+        return tuple(result) if self.format == 'bin' else readVerification(result)
+
+    def decryptCards(self, address, tableId, deckId, seatIndex, cardIndices, drawIndices):
+        result = self.request('decryptCards', **{'from': address, 'id': tableId,
+                                                 'deckId': deckId, 'seatIndex': seatIndex,
+                                                 'indices': ','.join(map(str, cardIndices)),
+                                                 'drawIndices': ','.join(map(str, drawIndices))})
+        return result[0] if self.format == 'bin' else readIntLists(result, 8)
+
+    def revealCards(self, address, tableId, deckId, seatIndex, cardIndices):
+        result = self.request('revealCards', **{'from': address, 'id': tableId,
+                                                'deckId': deckId, 'seatIndex': seatIndex,
+                                                'indices': ','.join(map(str, cardIndices))})
+        return result[0] if self.format == 'bin' else readIntLists(result, 7)
+
+    def lookAtCards(self, address, tableId, deckId, cardIndices):
+        result = self.request('lookAtCards', **{'from': address, 'id': tableId, 'deckId': deckId,
+                                                'indices': ','.join(map(str, cardIndices))})
+        return result[0] if self.format == 'bin' else [int(w, 16) for w in result]
+
+    def dump(self):
+        return dumpDb(self.db)
+
+    def load(self, text):
+        # replace the secrets with an earlier dump(), which the worker then reopens
+        loadDb(self.db, text)
+        self.request('reload')
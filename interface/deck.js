@@ -1,154 +1,242 @@
 #!/usr/bin/env node
 
 import * as fs from 'node:fs'
+import * as readline from 'node:readline'
 import { ethers } from 'ethers'
-import { JsonDB, Config as JsonDBConfig } from 'node-json-db'
 import { program } from 'commander'
 import { submitPrep, verifyPrep,
          shuffle, shuffleWithPermutation, verifyShuffle,
-         decryptCards, revealCards, bytesToHex } from './lib.js'
+         decryptCards, lookAtCards, revealCards, bytesToHex, seededRandom } from './lib.js'
+import { openDb } from './store.js'
 
 program
-  .option('--db <name>', 'json database file name', 'db')
+  .option('--db <name>', 'database file name: *.log for an append-only log, otherwise json', 'db')
   .option('--id <num>', 'table id in database', 0)
   .option('--rpc <url>', 'RPC provider', 'http://localhost:8545')
   .requiredOption('--deck <addr>', 'address of deck contract')
-  .requiredOption('--from <addr>', 'address of sender')
+  .option('--from <addr>', 'address of sender')
   .option('--abi <path>', 'path to ABI for deck contract', '.build/Deck.json')
+  .option('--format <text|bin>', 'output format', 'text')
+  .option('--seed <string>', 'seed for reproducible randomness: each --from account draws its own stream, continued across serve requests')
 
-program
-  .command('submitPrep')
-  .action(async (_, cmd) => {
-    const options = cmd.optsWithGlobals()
-    const db = new JsonDB(new JsonDBConfig(options.db))
-    const socket = {account: {address: options.from}}
-    const hash = await submitPrep(db, socket, options.id)
-    console.log(bytesToHex(hash))
-  })
-
-program
-  .command('verifyPrep')
-  .action(async (_, cmd) => {
-    const options = cmd.optsWithGlobals()
-    const db = new JsonDB(new JsonDBConfig(options.db))
-    const prep = await verifyPrep(db, {account: {address: options.from}}, options.id)
-    const ts = n => console.log(`0x${n.toString(16)}`)
-    prep.forEach(p => {
-      p.g.forEach(ts)
-      p.h.forEach(ts)
-      p.gx.forEach(ts)
-      p.hx.forEach(ts)
-      p.p.gs.forEach(ts)
-      p.p.hs.forEach(ts)
-      ts(p.p.scx)
-    })
-  })
+// opened once per process, so a server keeps them between requests
+const dbs = {}
+function getDb(options) {
+  if (!(options.db in dbs))
+    dbs[options.db] = openDb(options.db)
+  return dbs[options.db]
+}
 
-program
-  .command('shuffle')
-  .option('-o, --order <comma-separated-nums>', 'desired permutation; omit for random')
-  .requiredOption('-v, --verif-rounds <num>', 'number of rounds of verification')
-  .requiredOption('-j, --deck-id <num>', 'deck id')
-  .action(async (_, cmd) => {
-    const options = cmd.optsWithGlobals()
-    const db = new JsonDB(new JsonDBConfig(options.db))
-    const socket = {account: {address: options.from},
-                    gameConfigs: {[options.id]: {deckId: options.deckId,
-                                                 formatted: {verifRounds: parseInt(options.verifRounds)}}}}
+let deckContract
+function getDeck(options) {
+  if (!deckContract) {
     const provider = new ethers.providers.JsonRpcProvider(options.rpc)
-    const deck = new ethers.Contract(options.deck,
+    deckContract = new ethers.Contract(options.deck,
       JSON.parse(fs.readFileSync(options.abi, 'utf8')).abi,
       provider)
+  }
+  return deckContract
+}
+
+// seeded streams by `${seed}/${from}`, as hodlem.deck.DeckClient(seed=...) draws them
+const rngs = {}
+
+function getSocket(options) {
+  if (!options.from) throw new Error('missing --from')
+  const socket = {account: {address: options.from}}
+  if (options.seed !== undefined) {
+    const key = `${options.seed}/${options.from}`
+    if (!(key in rngs))
+      rngs[key] = seededRandom(key)
+    socket.rng = rngs[key]
+  }
+  return socket
+}
+
+const toBigInt = a =>
+  ethers.BigNumber.isBigNumber(a) ? a.toBigInt() : BigInt(a)
+
+const nums = s => s.split(',').map(s => parseInt(s))
+
+// each command returns a list of frames, each an array of uint256 values with a shape
+// text format: every value in hex on its own line
+// bin format: per frame, a header (uint8 rank, then rank uint32 dimensions)
+//             followed by the values as 32-byte big-endian words
+const frame = (shape, values) => ({shape, values})
+
+function encodeFrames(frames) {
+  const size = frames.reduce((n, f) => n + 1 + 4 * f.shape.length + 32 * f.values.length, 0)
+  const buf = Buffer.alloc(size)
+  let offset = 0
+  const mask = (1n << 64n) - 1n
+  for (const f of frames) {
+    offset = buf.writeUInt8(f.shape.length, offset)
+    for (const d of f.shape)
+      offset = buf.writeUInt32BE(d, offset)
+    for (const a of f.values) {
+      const n = toBigInt(a)
+      for (const shift of [192n, 128n, 64n, 0n])
+        offset = buf.writeBigUInt64BE((n >> shift) & mask, offset)
+    }
+  }
+  return buf
+}
+
+function formatText(frames) {
+  return frames.flatMap(f => f.values.map(a =>
+    typeof a === 'string' && a.startsWith('0x') ? a : `0x${toBigInt(a).toString(16)}`))
+}
+
+const commands = {
+  submitPrep: async options => {
+    const hash = await submitPrep(getDb(options), getSocket(options), options.id)
+    return [frame([1], [bytesToHex(hash)])]
+  },
+
+  verifyPrep: async options => {
+    const prep = await verifyPrep(getDb(options), getSocket(options), options.id)
+    return [frame([prep.length, 13], prep.flatMap(p => [
+      ...p.g, ...p.h, ...p.gx, ...p.hx, ...p.p.gs, ...p.p.hs, p.p.scx
+    ]))]
+  },
+
+  shuffle: async options => {
+    const socket = getSocket(options)
+    socket.gameConfigs = {[options.id]: {deckId: options.deckId,
+                                         formatted: {verifRounds: parseInt(options.verifRounds)}}}
     const shuffler = options.order ?
       (db, deck, socket, tableId) => shuffleWithPermutation(db, deck, socket, tableId,
-        options.order.split(',').map(s => parseInt(s)))
+        nums(options.order))
       : shuffle
-    const [cards, hash] = await shuffler(db, deck, socket, options.id)
-    cards.forEach(c => c.forEach(n => console.log(`0x${n.toString(16)}`)))
-    console.log(bytesToHex(hash))
-  })
+    const [cards, hash] = await shuffler(getDb(options), getDeck(options), socket, options.id)
+    return [frame([cards.length, 2], cards.flat()), frame([1], [bytesToHex(hash)])]
+  },
 
-program
-  .command('verifyShuffle')
+  verifyShuffle: async options => {
+    const socket = getSocket(options)
+    socket.gameConfigs = {[options.id]: {deckId: options.deckId}}
+    socket.activeGames = {[options.id]: {seatIndex: options.seatIndex}}
+    const [c, s, p] = await verifyShuffle(getDb(options), getDeck(options), socket, options.id)
+    return [frame([c.length, 53, 2], c.flat(2)),
+            frame([s.length], s),
+            frame([p.length, 53], p.flat())]
+  },
+
+  decryptCards: async options => {
+    const cardIndices = nums(options.indices)
+    const drawIndices = nums(options.drawIndices)
+    const socket = getSocket(options)
+    socket.gameConfigs = {[options.id]: {deckId: options.deckId}}
+    socket.activeGames = {[options.id]: {
+                            seatIndex: parseInt(options.seatIndex),
+                            drawIndex: Object.fromEntries(
+                              cardIndices.map((i, j) => [i, drawIndices[j]]))}}
+    const result = await decryptCards(getDb(options), getDeck(options), socket, options.id, cardIndices)
+    return [frame([result.length, 8], result.flat())]
+  },
+
+  revealCards: async options => {
+    const cardIndices = nums(options.indices)
+    const socket = getSocket(options)
+    socket.gameConfigs = {[options.id]: {deckId: options.deckId}}
+    socket.activeGames = {[options.id]: {seatIndex: parseInt(options.seatIndex)}}
+    const result = await revealCards(getDb(options), getDeck(options), socket, options.id, cardIndices)
+    return [frame([result.length, 7], result.flat())]
+  },
+
+  lookAtCards: async options => {
+    const [looked] = await lookAtCards(getDb(options), getDeck(options), getSocket(options),
+      options.id, options.deckId, nums(options.indices))
+    return [frame([looked.length], looked.map(c => c.openIndex))]
+  },
+
+  // for serve: reopen the db on the next request, after its file was replaced
+  reload: async options => {
+    delete dbs[options.db]
+    return []
+  }
+}
+
+function command(name) {
+  return program
+    .command(name)
+    .action(async (_, cmd) => {
+      const options = cmd.optsWithGlobals()
+      const frames = await commands[name](options)
+      if (options.format === 'bin')
+        process.stdout.write(encodeFrames(frames))
+      else
+        formatText(frames).forEach(l => console.log(l))
+    })
+}
+
+command('submitPrep')
+
+command('verifyPrep')
+
+command('shuffle')
+  .option('-o, --order <comma-separated-nums>', 'desired permutation; omit for random')
+  .requiredOption('-v, --verif-rounds <num>', 'number of rounds of verification')
+  .requiredOption('-j, --deck-id <num>', 'deck id')
+
+command('verifyShuffle')
   .requiredOption('-j, --deck-id <num>', 'deck id')
   .requiredOption('-s, --seat-index <num>', 'seat index')
-  .action(async (_, cmd) => {
-    const options = cmd.optsWithGlobals()
-    const db = new JsonDB(new JsonDBConfig(options.db))
-    const socket = {account: {address: options.from},
-                    gameConfigs: {[options.id]: {deckId: options.deckId}},
-                    activeGames: {[options.id]: {seatIndex: options.seatIndex}}}
-    const provider = new ethers.providers.JsonRpcProvider(options.rpc)
-    const deck = new ethers.Contract(options.deck,
-      JSON.parse(fs.readFileSync(options.abi, 'utf8')).abi,
-      provider)
-    const [c, s, p] = await verifyShuffle(db, deck, socket, options.id)
-    const ts = a => {
-      const n = typeof a === 'string' ? BigInt(a) : a
-      console.log(`0x${n.toString(16)}`)
-    }
-    c.forEach(d => d.forEach(c => c.forEach(ts)))
-    s.forEach(ts)
-    p.forEach(c => c.forEach(ts))
-  })
 
-program
-  .command("decryptCards")
+command('decryptCards')
   .requiredOption('--indices <comma-separated-nums>', 'card indices to decrypt')
   .requiredOption('--draw-indices <comma-separated-nums>', 'seat indices for each index')
   .requiredOption('-j, --deck-id <num>', 'deck id')
   .requiredOption('-s, --seat-index <num>', 'seat index')
-  .action(async (_, cmd) => {
-    const options = cmd.optsWithGlobals()
-    const db = new JsonDB(new JsonDBConfig(options.db))
-    const cardIndices = options.indices.split(',').map(s => parseInt(s))
-    const drawIndices = options.drawIndices.split(',').map(s => parseInt(s))
-    const seatIndex = parseInt(options.seatIndex)
-    const socket = {account: {address: options.from},
-                    gameConfigs: {[options.id]: {deckId: options.deckId}},
-                    activeGames: {[options.id]: {
-                      seatIndex: seatIndex,
-                      drawIndex: Object.fromEntries(
-                        cardIndices.map((i, j) => [i, drawIndices[j]]))}}}
-    const provider = new ethers.providers.JsonRpcProvider(options.rpc)
-    const deck = new ethers.Contract(options.deck,
-      JSON.parse(fs.readFileSync(options.abi, 'utf8')).abi,
-      provider)
-    const result = await decryptCards(db, deck, socket, options.id, cardIndices)
-    const ts = a => {
-      if (ethers.BigNumber.isBigNumber(a))
-        console.log(a.toHexString())
-      else
-        console.log(`0x${a.toString(16)}`)
-    }
-    result.forEach(a => a.forEach(ts))
-  })
 
-program
-  .command('revealCards')
+command('revealCards')
   .requiredOption('--indices <comma-separated-nums>', 'card indices to decrypt')
   .requiredOption('-j, --deck-id <num>', 'deck id')
   .requiredOption('-s, --seat-index <num>', 'seat index')
+
+command('lookAtCards')
+  .requiredOption('--indices <comma-separated-nums>', 'card indices to look at')
+  .requiredOption('-j, --deck-id <num>', 'deck id')
+
+// long-lived worker: one JSON request per line on stdin
+// request: {"id": any, "command": name, "options": {same options as the command line}}
+// text format response, one JSON line:
+//   {"id": any, "result": [printed values]} or {"id": any, "error": message}
+// bin format response, in request order:
+//   uint8 status (0 = ok, 1 = error), uint32 byte length, then the frames or the error message
+program
+  .command('serve')
   .action(async (_, cmd) => {
-    const options = cmd.optsWithGlobals()
-    const db = new JsonDB(new JsonDBConfig(options.db))
-    const cardIndices = options.indices.split(',').map(s => parseInt(s))
-    const seatIndex = parseInt(options.seatIndex)
-    const socket = {account: {address: options.from},
-                    gameConfigs: {[options.id]: {deckId: options.deckId}},
-                    activeGames: {[options.id]: {seatIndex: seatIndex}}}
-    const provider = new ethers.providers.JsonRpcProvider(options.rpc)
-    const deck = new ethers.Contract(options.deck,
-      JSON.parse(fs.readFileSync(options.abi, 'utf8')).abi,
-      provider)
-    const result = await revealCards(db, deck, socket, options.id, cardIndices)
-    const ts = a => {
-      if (ethers.BigNumber.isBigNumber(a))
-        console.log(a.toHexString())
-      else
-        console.log(`0x${a.toString(16)}`)
+    const globals = cmd.optsWithGlobals()
+    const bin = globals.format === 'bin'
+    const respond = (id, result, error) => {
+      if (bin) {
+        const body = error === undefined ? encodeFrames(result) : Buffer.from(error)
+        const head = Buffer.alloc(5)
+        head.writeUInt8(error === undefined ? 0 : 1, 0)
+        head.writeUInt32BE(body.length, 1)
+        process.stdout.write(Buffer.concat([head, body]))
+      }
+      else {
+        const response = error === undefined ? {id, result: formatText(result)} : {id, error}
+        process.stdout.write(`${JSON.stringify(response)}\n`)
+      }
+    }
+    const lines = readline.createInterface({input: process.stdin, terminal: false})
+    for await (const line of lines) {
+      if (!line.trim()) continue
+      let id = null
+      try {
+        const request = JSON.parse(line)
+        id = request.id
+        if (!(request.command in commands))
+          throw new Error(`unknown command ${request.command}`)
+        respond(id, await commands[request.command]({...globals, ...request.options}))
+      }
+      catch (e) {
+        respond(id, undefined, e.toString())
+      }
     }
-    result.forEach(a => a.forEach(ts))
   })
 
 await program.parseAsync()
@@ -1,16 +1,57 @@
+import { randomBytes } from 'node:crypto'
 import { bn254 } from '@noble/curves/bn'
 import { invert } from '@noble/curves/abstract/modular'
+import { transaction } from './store.js'
 
-const MAX_SECURITY = 63
+// randomness comes from node's CSPRNG, or from socket.rng, a seededRandom for reproducible runs
 
-function randomPoint() {
-  return bn254.ProjectivePoint.fromPrivateKey(bn254.utils.randomPrivateKey())
+// a CSPRNG stream: SHA-256 of a key (the hash of the seed) and a 64-bit block counter,
+// the same bytes as SeededRandom in hodlem/bn254.py
+export function seededRandom(seed) {
+  const key = bn254.CURVE.hash(new TextEncoder().encode(`${seed}`))
+  let counter = 0n
+  let buffer = new Uint8Array(0)
+  return {
+    bytes: n => {
+      while (buffer.length < n) {
+        const block = new Uint8Array(40)
+        block.set(key)
+        new DataView(block.buffer).setBigUint64(32, counter)
+        counter += 1n
+        const next = new Uint8Array(buffer.length + 32)
+        next.set(buffer)
+        next.set(bn254.CURVE.hash(block), buffer.length)
+        buffer = next
+      }
+      const out = buffer.slice(0, n)
+      buffer = buffer.slice(n)
+      return out
+    }
+  }
+}
+
+const systemRandom = {bytes: n => new Uint8Array(randomBytes(n))}
+
+// uniform in [0, n), by rejection of the values of n's bit length that are too big
+function randomBelow(n, rng) {
+  const k = n.toString(2).length
+  const mask = (1n << BigInt(k)) - 1n
+  while (true) {
+    const v = bytesToUint256((rng || systemRandom).bytes(Math.ceil(k / 8))) & mask
+    if (v < n) return v
+  }
 }
 
-function randomScalar() {
+function randomScalar(rng) {
+  if (rng) return randomBelow(bn254.CURVE.n - 1n, rng) + 1n
   return bn254.utils.normPrivateKeyToScalar(bn254.utils.randomPrivateKey())
 }
 
+function randomPoint(rng) {
+  if (rng) return bn254.ProjectivePoint.BASE.multiply(randomScalar(rng))
+  return bn254.ProjectivePoint.fromPrivateKey(bn254.utils.randomPrivateKey())
+}
+
 function pointToUints(p) {
   const a = p.toAffine()
   return [a.x, a.y]
@@ -59,25 +100,27 @@ function bigIntegersToPoint(a) {
 }
 
 export async function submitPrep(db, socket, id) {
+  const tx = transaction(db)
   const key = `/${socket.account.address}/${id}/prep`
   const hash = new Uint8Array(32 + 3 * 64)
   for (const i of Array(53).keys()) {
-    const g = randomPoint()
+    const g = randomPoint(socket.rng)
     const gb = pointToBytes(g)
-    await db.push(`${key}/${i}/g`, gb.join())
-    const x = randomScalar()
-    await db.push(`${key}/${i}/x`, x.toString())
+    tx.push(`${key}/${i}/g`, gb.join())
+    const x = randomScalar(socket.rng)
+    tx.push(`${key}/${i}/x`, x.toString())
     const gx = g.multiply(x)
     const gxb = pointToBytes(gx)
-    await db.push(`${key}/${i}/gx`, gxb.join())
-    const h = randomPoint()
+    tx.push(`${key}/${i}/gx`, gxb.join())
+    const h = randomPoint(socket.rng)
     const hb = pointToBytes(h)
-    await db.push(`${key}/${i}/h`, hb.join())
+    tx.push(`${key}/${i}/h`, hb.join())
     hash.set(gb, 32)
     hash.set(gxb, 32 + 64)
     hash.set(hb, 32 + 128)
     hash.set(bn254.CURVE.hash(hash))
   }
+  await tx.commit()
   return hash.slice(0, 32)
 }
 
@@ -93,7 +136,7 @@ export async function verifyPrep(db, socket, id) {
     const hb = Uint8Array.from((await db.getData(`${key}/${i}/h`)).split(','))
     const h = bytesToPoint(hb)
     const hx = h.multiply(x)
-    const s = randomScalar()
+    const s = randomScalar(socket.rng)
     const gs = g.multiply(s)
     const hs = h.multiply(s)
     const toHash = new Uint8Array(6 * 64)
@@ -116,9 +159,10 @@ export async function verifyPrep(db, socket, id) {
   return cards
 }
 
-function shuffleArray(array) {
+// Fisher-Yates
+function shuffleArray(array, rng) {
   for (let i = array.length - 1; i > 0; i--) {
-    const j = Math.floor(Math.random() * i)
+    const j = Number(randomBelow(BigInt(i + 1), rng))
     ;[array[i], array[j]] = [array[j], array[i]]
   }
 }
@@ -135,46 +179,60 @@ function hashCommitment(c) {
   return hash.slice(0, 32)
 }
 
+// shuffle[index] (submitted by player index - 1) of a hashed deck, which keeps it only in logs
+export async function shuffleFromLogs(deck, deckId, index) {
+  // from the block the deck was made or last reshuffled in
+  const fromBlock = (await deck.logsFrom(deckId)).toNumber()
+  const logs = await deck.queryFilter(deck.filters.SubmitShuffle(deckId, index - 1), fromBlock)
+  return logs.at(-1).args.cards
+}
+
+export async function lastShuffle(deck, deckId) {
+  const count = (await deck.shuffleCount(deckId)).toNumber()
+  if (count && await deck.hashed(deckId))
+    return shuffleFromLogs(deck, deckId, count)
+  return deck.lastShuffle(deckId)
+}
+
 export async function shuffleWithPermutation(db, deck, socket, tableId, permutation) {
   const config = socket.gameConfigs[tableId]
-  const x = randomScalar()
-  await db.push(`/${socket.account.address}/${tableId}/shuffle/secret`, x.toString())
-  await db.push(`/${socket.account.address}/${tableId}/shuffle/permutation`, permutation)
-  const lastCards = await deck.lastShuffle(config.deckId)
+  const tx = transaction(db)
+  const x = randomScalar(socket.rng)
   permutation.unshift(0)
+  tx.push(`/${socket.account.address}/${tableId}/shuffle/secret`, x.toString())
+  tx.push(`/${socket.account.address}/${tableId}/shuffle/permutation`, permutation)
+  const lastCards = await lastShuffle(deck, config.deckId)
   const cards = permutation.map(i =>
     pointToUints(
       bigIntegersToPoint(lastCards[i]).multiply(x)
     )
   )
-  const secrets = Array.from({length: config.formatted.verifRounds}, _ => randomScalar())
+  const secrets = Array.from({length: config.formatted.verifRounds}, _ => randomScalar(socket.rng))
   const permutations = secrets.map(_ => {
     const a = Array.from({length: 53}, (_, i) => i)
-    shuffleArray(a)
+    shuffleArray(a, socket.rng)
     return a
   })
-  await db.push(`/${socket.account.address}/${tableId}/shuffle/secrets`, secrets.map(x => x.toString()))
-  await db.push(`/${socket.account.address}/${tableId}/shuffle/permutations`, permutations)
+  tx.push(`/${socket.account.address}/${tableId}/shuffle/secrets`, secrets.map(x => x.toString()))
+  tx.push(`/${socket.account.address}/${tableId}/shuffle/permutations`, permutations)
   const commitment = permutations.map((p, k) =>
     p.map(i => pointToUints(
         bn254.ProjectivePoint.fromAffine(
           {x: cards[i][0],
            y: cards[i][1]})
         .multiply(secrets[k]))))
-  await db.push(`/${socket.account.address}/${tableId}/shuffle/commitment`,
-                commitment.map(d => d.map(c => c.map(i => i.toString()))))
+  tx.push(`/${socket.account.address}/${tableId}/shuffle/commitment`,
+          commitment.map(d => d.map(c => c.map(i => i.toString()))))
+  await tx.commit()
   return [cards, hashCommitment(commitment)]
 }
 
 export async function shuffle(db, deck, socket, tableId) {
   const permutation = Array.from({length: 52}, (_, i) => i + 1)
-  shuffleArray(permutation)
+  shuffleArray(permutation, socket.rng)
   return shuffleWithPermutation(db, deck, socket, tableId, permutation)
 }
 
-const emptyCommitment = Array.from({length: 53}, _ => [0, 0])
-const emptyPermutation = Array(53).fill(0)
-
 export async function verifyShuffle(db, deck, socket, tableId) {
   let challenge = await deck.challengeRnd(
     socket.gameConfigs[tableId].deckId,
@@ -197,78 +255,109 @@ export async function verifyShuffle(db, deck, socket, tableId) {
     }
     challenge = challenge.div(2)
   })
-  const pad = {length: MAX_SECURITY - scalars.length}
-  commitment.push(...Array.from(pad, _ => emptyCommitment))
-  scalars.push(...Array.from(pad, _ => 0))
-  responsePermutations.push(...Array.from(pad, _ => emptyPermutation))
   return [commitment, scalars, responsePermutations]
 }
 
 export async function decryptCards(db, deck, socket, tableId, cardIndices) {
   const deckId = socket.gameConfigs[tableId].deckId
   const data = socket.activeGames[tableId]
+  const proving = cardIndices.some(i => data.drawIndex[i] !== data.seatIndex)
+  // one round-trip: the cards' last decryptions and, if any needs a proof, this seat's shuffle bases
+  const [lastDecrypts, shuffleBases] = await Promise.all([
+    deck.lastDecrypts(deckId, cardIndices),
+    proving ? deck.shuffleBases(deckId, [data.seatIndex, data.seatIndex + 1]) : []
+  ])
   const result = []
-  for (const cardIndex of cardIndices) {
-    const lastDecrypt = await deck.lastDecrypt(deckId, cardIndex)
+  if (!proving) {
+    cardIndices.forEach((cardIndex, k) =>
+      result.push([cardIndex, lastDecrypts[k][0], lastDecrypts[k][1], 0, 0, 0, 0, 0]))
+    return result
+  }
+  /*
+    g: self.decks[_id].shuffle[_playerIdx][0],
+    h: _card, <- aka decrypt
+    gx: self.decks[_id].shuffle[unsafe_add(_playerIdx, 1)][0],
+    hx: self.decks[_id].cards[_cardIdx].c[_playerIdx], <- aka lastDecrypt
+  */
+  const secret = BigInt(await db.getData(`/${socket.account.address}/${tableId}/shuffle/secret`))
+  const inverse = invert(secret, bn254.CURVE.n)
+  const [g, gx] = shuffleBases.map(b => bigIntegersToPoint(b))
+  cardIndices.forEach((cardIndex, k) => {
+    const lastDecrypt = lastDecrypts[k]
     if (data.drawIndex[cardIndex] === data.seatIndex) {
       result.push([cardIndex, lastDecrypt[0], lastDecrypt[1], 0, 0, 0, 0, 0])
+      return
     }
-    else {
-      /*
-        g: self.decks[_id].shuffle[_playerIdx][0],
-        h: _card, <- aka decrypt
-        gx: self.decks[_id].shuffle[unsafe_add(_playerIdx, 1)][0],
-        hx: self.decks[_id].cards[_cardIdx].c[_playerIdx], <- aka lastDecrypt
-      */
-      const secret = BigInt(await db.getData(`/${socket.account.address}/${tableId}/shuffle/secret`))
-      const inverse = invert(secret, bn254.CURVE.n)
-      const hx = bigIntegersToPoint(lastDecrypt)
-      const decrypt = hx.multiply(inverse)
-      const g = bigIntegersToPoint(await deck.shuffleBase(deckId, data.seatIndex))
-      const gx = bigIntegersToPoint(await deck.shuffleBase(deckId, data.seatIndex + 1))
-      const s = randomScalar()
-      const gs = g.multiply(s)
-      const hs = decrypt.multiply(s)
-      const toHash = new Uint8Array(6 * 64)
-      ;[g, decrypt, gx, hx, gs, hs].forEach((p, i) => {
-        toHash.set(pointToBytes(p), i * 64)
-      })
-      const c = bytesToUint256(bn254.CURVE.hash(toHash))
-      const proof = {
-          gs: pointToUints(gs),
-          hs: pointToUints(hs),
-          scx: (s + c * secret) % bn254.CURVE.n
-        }
-      const card = pointToUints(decrypt)
-      result.push([cardIndex, card[0], card[1], proof.gs[0], proof.gs[1], proof.hs[0], proof.hs[1], proof.scx])
-    }
-  }
+    const hx = bigIntegersToPoint(lastDecrypt)
+    const decrypt = hx.multiply(inverse)
+    const s = randomScalar(socket.rng)
+    const gs = g.multiply(s)
+    const hs = decrypt.multiply(s)
+    const toHash = new Uint8Array(6 * 64)
+    ;[g, decrypt, gx, hx, gs, hs].forEach((p, i) => {
+      toHash.set(pointToBytes(p), i * 64)
+    })
+    const c = bytesToUint256(bn254.CURVE.hash(toHash))
+    const proof = {
+        gs: pointToUints(gs),
+        hs: pointToUints(hs),
+        scx: (s + c * secret) % bn254.CURVE.n
+      }
+    const card = pointToUints(decrypt)
+    result.push([cardIndex, card[0], card[1], proof.gs[0], proof.gs[1], proof.hs[0], proof.hs[1], proof.scx])
+  })
   return result
 }
 
-export async function lookAtCard(db, deck, socket, tableId, deckId, cardIndex) {
+const pointKey = p => pointToUints(p).join()
+
+// card => its index in baseCards, for finding the index of a decrypted card in one lookup
+// the base cards are fixed once the deck is prepped, so each index is built once per deck,
+// keyed by deck and base card since deck ids repeat when a chain is restored
+const cardIndexCache = new Map()
+
+async function baseCardIndex(deck, deckId, base) {
+  const key = `${deck.address}/${deckId}/${pointKey(base)}`
+  if (!cardIndexCache.has(key)) {
+    const bases = await deck.baseCards(deckId)
+    cardIndexCache.set(key, new Map(bases.map((c, i) => [pointKey(bigIntegersToPoint(c)), i])))
+  }
+  return cardIndexCache.get(key)
+}
+
+// one shuffleBases and one lastDecrypts call, in parallel, for all the cards
+// with seatIndex, also returns the bases of that seat's shuffle for revealing
+export async function lookAtCards(db, deck, socket, tableId, deckId, cardIndices, seatIndex) {
   const secret = BigInt(await db.getData(`/${socket.account.address}/${tableId}/shuffle/secret`))
   const inverse = invert(secret, bn254.CURVE.n)
-  const bases = (await deck.baseCards(deckId)).map(c => bigIntegersToPoint(c))
-  const lastDecrypt = bigIntegersToPoint(await deck.lastDecrypt(deckId, cardIndex))
-  let openIndex = 0
-  for (const b of bases) {
-    if (lastDecrypt.multiply(inverse).equals(bases[openIndex])) break
-    openIndex += 1
-  }
-  return {openIndex, card: bases[openIndex], lastDecrypt, secret}
+  const idxs = seatIndex === undefined ? [0] : [0, seatIndex, seatIndex + 1]
+  const [shuffleBases, lastDecrypts] = await Promise.all([
+    deck.shuffleBases(deckId, idxs).then(a => a.map(b => bigIntegersToPoint(b))),
+    deck.lastDecrypts(deckId, cardIndices)
+  ])
+  const index = await baseCardIndex(deck, deckId, shuffleBases[0])
+  const looked = lastDecrypts.map(d => {
+    const lastDecrypt = bigIntegersToPoint(d)
+    const card = lastDecrypt.multiply(inverse)
+    const openIndex = index.get(pointKey(card)) ?? index.size
+    return {openIndex, card, lastDecrypt, secret}
+  })
+  return [looked, shuffleBases.slice(1)]
+}
+
+export async function lookAtCard(db, deck, socket, tableId, deckId, cardIndex) {
+  return (await lookAtCards(db, deck, socket, tableId, deckId, [cardIndex]))[0][0]
 }
 
 export async function revealCards(db, deck, socket, tableId, cardIndices) {
   const deckId = socket.gameConfigs[tableId].deckId
   const data = socket.activeGames[tableId]
-  const g = bigIntegersToPoint(await deck.shuffleBase(deckId, data.seatIndex))
-  const gx = bigIntegersToPoint(await deck.shuffleBase(deckId, data.seatIndex + 1))
+  const [looked, [g, gx]] =
+    await lookAtCards(db, deck, socket, tableId, deckId, cardIndices, data.seatIndex)
   const result = []
-  for (const cardIndex of cardIndices) {
-    const {secret, card: h, lastDecrypt: hx, openIndex} =
-      await lookAtCard(db, deck, socket, tableId, deckId, cardIndex)
-    const s = randomScalar()
+  cardIndices.forEach((cardIndex, k) => {
+    const {secret, card: h, lastDecrypt: hx, openIndex} = looked[k]
+    const s = randomScalar(socket.rng)
     const gs = g.multiply(s)
     const hs = h.multiply(s)
     const toHash = new Uint8Array(6 * 64)
@@ -282,6 +371,6 @@ export async function revealCards(db, deck, socket, tableId, cardIndices) {
         scx: (s + c * secret) % bn254.CURVE.n
       }
     result.push([cardIndex, openIndex, proof.gs[0], proof.gs[1], proof.hs[0], proof.hs[1], proof.scx])
-  }
+  })
   return result
 }
@@ -7,7 +7,7 @@ import * as path from 'node:path'
 import { createServer } from 'http'
 import { Server as SocketIOServer } from 'socket.io'
 import { JsonDB, Config as JsonDBConfig } from 'node-json-db'
-import { submitPrep, verifyPrep, shuffle, verifyShuffle, decryptCards, lookAtCard, revealCards } from './lib.js'
+import { submitPrep, verifyPrep, shuffle, verifyShuffle, decryptCards, lookAtCards, revealCards } from './lib.js'
 
 const app = express()
 const dirname = path.dirname(fileURLToPath(import.meta.url))
@@ -41,6 +41,10 @@ const deck = new ethers.Contract(await room.deckAddress(),
   JSON.parse(fs.readFileSync(process.env.DECK_ABI || '../.build/Deck.json', 'utf8')).abi,
   provider)
 console.log(`Deck is ${deck.address}`)
+const lobby = new ethers.Contract(process.env.LOBBY,
+  JSON.parse(fs.readFileSync(process.env.LOBBY_ABI || '../.build/Lobby.json', 'utf8')).abi,
+  provider)
+console.log(`Lobby is ${lobby.address}`)
 
 function processArg(arg, index, name) {
   if (['RaiseBet', 'CallBet', 'PostBlind', 'CollectPot'].includes(name) && index >= 1) return ethers.utils.formatEther(arg)
@@ -106,24 +110,26 @@ async function refreshFeeData(socket) {
   }
 }
 
+const LOBBY_PAGE = 64
+
+// table summaries (tableId, params, structure, seats) a page per call
+async function getPages(method, ...args) {
+  const tables = []
+  let cursor = ethers.constants.Zero
+  do {
+    const page = await lobby[method](...args, cursor, LOBBY_PAGE)
+    tables.push(...page.tables)
+    cursor = page.cursor
+  } while (!cursor.isZero())
+  return tables
+}
+
 async function getPendingGames() {
-  const tableIds = []
-  let id = await room.nextWaitingTable(0)
-  while (!ethers.BigNumber.from(id).isZero()) {
-    tableIds.push(id)
-    id = await room.nextWaitingTable(id)
-   }
-  return tableIds
+  return await getPages('waitingTables')
 }
 
 async function getActiveGames(socket) {
-  const tableIds = []
-  let id = await room.nextLiveTable(socket.account.address, 0)
-  while (!ethers.BigNumber.from(id).isZero()) {
-    tableIds.push(id)
-    id = await room.nextLiveTable(socket.account.address, id)
-  }
-  return tableIds
+  return await getPages('liveTables', socket.account.address)
 }
 
 const Phase_PREP = 2
@@ -138,16 +144,16 @@ const configKeys = [
   'buyIn', 'bond', 'startsWith', 'untilLeft', 'levelBlocks', 'verifRounds',
   'prepBlocks', 'shuffBlocks', 'verifBlocks', 'dealBlocks', 'actBlocks', 'deckId']
 
-async function getGameConfigs(socket, tableIds) {
+function getGameConfigs(socket, tables) {
   if (!('gameConfigs' in socket))
     socket.gameConfigs = {}
-  await Promise.all(tableIds.map(async idNum => {
-    const id = idNum.toString()
+  tables.forEach(table => {
+    const id = table.tableId.toString()
     if (!(id in socket.gameConfigs)) {
       const data = {id: id}
       socket.gameConfigs[id] = data
-      data.structure = await room.configStructure(idNum)
-      ;(await room.configParams(id)).forEach((v, i) => {
+      data.structure = table.structure
+      table.params.forEach((v, i) => {
         data[configKeys[i]] = v
       })
       data.formatted = Object.fromEntries(
@@ -157,50 +163,48 @@ async function getGameConfigs(socket, tableIds) {
       data.formatted.id = data.id
       data.formatted.structure = data.structure.map(x => ethers.utils.formatEther(x))
     }
-  }))
+  })
 }
 
 async function refreshPendingGames(socket) {
-  const tableIds = await getPendingGames()
-  await getGameConfigs(socket, tableIds)
+  const tables = await getPendingGames()
+  getGameConfigs(socket, tables)
   const seats = {}
-  await Promise.all(tableIds.map(async idNum => {
-    const id = idNum.toString()
-    seats[id] = []
-    for (const seatIndex of Array(socket.gameConfigs[id].startsWith.toNumber()).keys()) {
-      seats[id].push(await room.playerAt(idNum, seatIndex))
-    }
-  }))
+  tables.forEach(table => {
+    const id = table.tableId.toString()
+    seats[id] = table.seats.slice(0, socket.gameConfigs[id].startsWith.toNumber())
+  })
   socket.emit('pendingGames',
-    tableIds.map(idNum => socket.gameConfigs[idNum.toString()].formatted),
+    tables.map(table => socket.gameConfigs[table.tableId.toString()].formatted),
     seats)
 }
 
 async function refreshActiveGames(socket) {
-  const tableIds = await getActiveGames(socket)
-  await getGameConfigs(socket, tableIds)
+  const tables = await getActiveGames(socket)
+  getGameConfigs(socket, tables)
+  const tableIds = tables.map(table => table.tableId)
   if (!('activeGames' in socket))
     socket.activeGames = {}
-  await Promise.all(tableIds.map(async idNum => {
-    const id = idNum.toString()
+  tables.forEach(table => {
+    const id = table.tableId.toString()
     const numPlayers = socket.gameConfigs[id].startsWith.toNumber()
     if (!(id in socket.activeGames)) {
-      const players = []
-      for (const seatIndex of Array(numPlayers).keys()) {
-        const player = await room.playerAt(idNum, seatIndex)
-        players.push(player)
+      const players = table.seats.slice(0, numPlayers)
+      players.forEach((player, seatIndex) => {
         if (player === socket.account.address) {
           socket.activeGames[id] = { seatIndex, players }
         }
-      }
+      })
     }
-  }))
+  })
   for (const [id, data] of Object.entries(socket.activeGames)) {
     const config = socket.gameConfigs[id]
     const deckId = config.deckId
     const numPlayers = config.formatted.startsWith
-    ;[data.phase, data.commitBlock] = (await room.phaseCommit(id)).map(i => i.toNumber())
-    const gameData = await game.games(id)
+    const state = await game.tableState(id)
+    data.phase = state.phase.toNumber()
+    data.commitBlock = state.commitBlock.toNumber()
+    const gameData = state.game
     data.board = gameData.board.flatMap(i => i.isZero() ? [] : [i.toNumber()])
     data.hand = []
     data.stack = gameData.stack.slice(0, numPlayers).map(s => ethers.utils.formatEther(s))
@@ -209,8 +213,8 @@ async function refreshActiveGames(socket) {
     data.betIndex = gameData.betIndex.toNumber()
     data.pot = gameData.pot.slice(0, numPlayers).flatMap(p => p.isZero() ? [] : [ethers.utils.formatEther(p)])
     if (data.phase > Phase_DEAL || (data.phase === Phase_DEAL && data.pot.length)) {
-      for (const idx of gameData.hands[data.seatIndex])
-        data.hand.push((await lookAtCard(db, deck, socket, id, deckId, idx)).openIndex)
+      const [looked] = await lookAtCards(db, deck, socket, id, deckId, gameData.hands[data.seatIndex])
+      data.hand = looked.map(c => c.openIndex)
     }
     if (!data.pot.length) data.pot.push('0')
     const betsTotal = playerBets.reduce((a, b) => a.add(b))
@@ -234,7 +238,7 @@ async function refreshActiveGames(socket) {
       }
     }
     if (data.phase === Phase_SHUF) {
-      let shuffled = await room.shuffled(id)
+      let shuffled = state.shuffled
       data.shuffleCount = (await deck.shuffleCount(deckId)).toNumber()
       if (data.shuffleCount === numPlayers) {
         data.waitingOn = []
@@ -248,7 +252,7 @@ async function refreshActiveGames(socket) {
     }
     if (data.phase === Phase_DEAL) {
       const [cardReq, drawIndex, decryptCount, openedCard] = (
-        await room.cardInfo(id)).map(a => a.map(i => {
+        state.cards).map(a => a.map(i => {
           try { return i.toNumber() } catch { return i }
         }))
       data.waitingOn = []
@@ -0,0 +1,124 @@
+import * as fs from 'node:fs'
+import { JsonDB, Config as JsonDBConfig } from 'node-json-db'
+
+// secret storage for deck preparation and shuffles
+//
+// LogDB is an append-only log: each committed transaction is one line per namespace
+//   {"ns": "<address>/<tableId>", "set": {"<rest of path>": value, ...}}
+// written with a single append, so an operation costs one write however many
+// values it stores. The same format is read and written by hodlem/db.py.
+// A torn last line (from a crash mid-append) is dropped, so transactions are atomic.
+
+function splitPath(path) {
+  const keys = path.split('/').filter(k => k)
+  return [keys.slice(0, 2).join('/'), keys.slice(2).join('/')]
+}
+
+export class LogDB {
+  constructor(filename) {
+    this.filename = filename
+    this.data = {}
+    if (fs.existsSync(filename)) {
+      const log = fs.readFileSync(filename)
+      const end = log.lastIndexOf('\n') + 1
+      for (const line of log.subarray(0, end).toString('utf8').split('\n')) {
+        if (!line) continue
+        const record = JSON.parse(line)
+        Object.assign(this.data[record.ns] ??= {}, record.set)
+      }
+      // drop a torn last line so the next append starts on a fresh line
+      if (end < log.length)
+        fs.truncateSync(filename, end)
+    }
+  }
+
+  async getData(path) {
+    const [ns, key] = splitPath(path)
+    if (!(ns in this.data && key in this.data[ns]))
+      throw new Error(`Can't find dataPath: ${path}`)
+    return this.data[ns][key]
+  }
+
+  async exists(path) {
+    const [ns, key] = splitPath(path)
+    return ns in this.data && key in this.data[ns]
+  }
+
+  async push(path, value) {
+    const tx = this.transaction()
+    tx.push(path, value)
+    await tx.commit()
+  }
+
+  transaction() {
+    return new LogTransaction(this)
+  }
+}
+
+class LogTransaction {
+  constructor(db) {
+    this.db = db
+    this.writes = {}
+  }
+
+  async getData(path) {
+    const [ns, key] = splitPath(path)
+    if (ns in this.writes && key in this.writes[ns])
+      return this.writes[ns][key]
+    return this.db.getData(path)
+  }
+
+  push(path, value) {
+    const [ns, key] = splitPath(path)
+    ;(this.writes[ns] ??= {})[key] = value
+  }
+
+  async commit() {
+    const lines = Object.entries(this.writes).map(([ns, set]) =>
+      `${JSON.stringify({ns, set})}\n`)
+    if (!lines.length) return
+    fs.appendFileSync(this.db.filename, lines.join(''))
+    for (const [ns, set] of Object.entries(this.writes))
+      Object.assign(this.db.data[ns] ??= {}, set)
+    this.writes = {}
+  }
+}
+
+// batches pushes to a node-json-db database into a single save
+class JsonDBTransaction {
+  constructor(db) {
+    this.db = db
+    this.writes = []
+  }
+
+  async getData(path) {
+    return this.db.getData(path)
+  }
+
+  push(path, value) {
+    this.writes.push([path, value])
+  }
+
+  async commit() {
+    const saveOnPush = this.db.config.saveOnPush
+    this.db.config.saveOnPush = false
+    try {
+      for (const [path, value] of this.writes)
+        await this.db.push(path, value)
+    }
+    finally {
+      this.db.config.saveOnPush = saveOnPush
+    }
+    await this.db.save()
+    this.writes = []
+  }
+}
+
+export function transaction(db) {
+  return db instanceof LogDB ? db.transaction() : new JsonDBTransaction(db)
+}
+
+// *.log files are LogDBs, anything else is a node-json-db database
+export function openDb(name) {
+  return name.endsWith('.log') ? new LogDB(name) : new JsonDB(new JsonDBConfig(name))
+}
@@ -8,12 +8,14 @@ def deploy():
     room = project.Room.deploy(deck.address, sender=acc[0])
     game = project.Game.deploy(room.address, sender=acc[0])
     room.setGameAddress(game.address, sender=acc[0])
-    return deck, room, game
+    lobby = project.Lobby.deploy(room.address, sender=acc[0])
+    return deck, room, game, lobby
 
 def main():
-    _, _, game = deploy()
+    _, _, game, lobby = deploy()
     with open("interface/.env", "w") as f:
         f.write(f'RPC={networks.active_provider.web3.provider.endpoint_uri}\n')
         f.write(f'GAME={game.address}\n')
+        f.write(f'LOBBY={lobby.address}\n')
     acc[0].transfer('0xCcbd1e8d367F6AC608b97260D8De9bad27C11ADc', '6.9 ether')
     IPython.embed()
@@ -0,0 +1,66 @@
+import time
+import click
+from ape import accounts, project
+from ape.cli import NetworkBoundCommand, network_option
+
+# fills the lobby with waiting tables and times listing them the old way
+# (walking nextWaitingTable, then configParams, configStructure and playerAt per table)
+# against Lobby.waitingTables pages, e.g.
+#   ape run lobby_bench --tables 2000 --page 64
+
+def walk(room):
+    calls, tables = 0, []
+    tableId = room.nextWaitingTable(0)
+    calls += 1
+    while tableId:
+        params = room.configParams(tableId)
+        structure = room.configStructure(tableId)
+        seats = [room.playerAt(tableId, seatIndex) for seatIndex in range(params[2])]
+        calls += 3 + len(seats)
+        tables.append((tableId, list(params), list(structure), seats))
+        tableId = room.nextWaitingTable(tableId)
+    return calls, tables
+
+def paged(lobby, count):
+    calls, tables, cursor = 0, [], 0
+    while True:
+        page = lobby.waitingTables(cursor, count)
+        calls += 1
+        tables.extend((t["tableId"], list(t["params"]), list(t["structure"]),
+                       list(t["seats"])[:t["params"][2]]) for t in page["tables"])
+        cursor = page["cursor"]
+        if cursor == 0:
+            return calls, tables
+
+@click.command(cls=NetworkBoundCommand)
+@network_option()
+@click.option("--tables", default=1000, help="waiting tables to create")
+@click.option("--seats", default=9, help="seats per table")
+@click.option("--page", default=64, help="tables per Lobby call (at most 64)")
+def cli(network, tables, seats, page):
+    deployer = accounts.test_accounts[0]
+    deck = project.Deck.deploy(sender=deployer)
+    room = project.Room.deploy(deck.address, sender=deployer)
+    game = project.Game.deploy(room.address, sender=deployer)
+    room.setGameAddress(game.address, sender=deployer)
+    lobby = project.Lobby.deploy(room.address, sender=deployer)
+
+    config = dict(buyIn=1, bond=1, startsWith=seats, untilLeft=1, structure=[1, 2, 4],
+                  levelBlocks=10, verifRounds=1, prepBlocks=10, shuffBlocks=10,
+                  verifBlocks=10, dealBlocks=10, actBlocks=10)
+    start = time.monotonic()
+    for i in range(tables):
+        creator = accounts.test_accounts[i % len(accounts.test_accounts)]
+        room.createTable(i % seats, config, sender=creator, value="2 wei")
+    click.echo(f"created {tables} waiting tables in {time.monotonic() - start:.1f}s")
+
+    start = time.monotonic()
+    walkCalls, walked = walk(room)
+    walkSeconds = time.monotonic() - start
+    start = time.monotonic()
+    pageCalls, pages = paged(lobby, page)
+    pageSeconds = time.monotonic() - start
+    assert walked == pages, "listings differ"
+    click.echo(f"walk:  {walkCalls:6} calls {walkSeconds:8.2f}s")
+    click.echo(f"paged: {pageCalls:6} calls {pageSeconds:8.2f}s "
+               f"({walkSeconds / pageSeconds:.1f}x faster)")
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import random
+import tempfile
+import time
+import click
+from ape import accounts, networks, project
+from ape.cli import NetworkBoundCommand, network_option
+from hodlem.bn254 import N, multiply
+from hodlem.db import openDb
+from hodlem.deck import DeckClient, point
+from hodlem.sim import PHASES, Phase_PLAY, Table, callPolicy
+from hodlem.state import TableStateClient
+from hodlem.worker import DeckWorker
+
+# deals a hand at one table, then times what refreshActiveGames (interface/run.js) does for
+# each seat on every refresh: read the table with Game.tableState and identify the seat's
+# hole cards, either scanning the base cards (fetched again for every card) or looking them
+# up in the deck client's cached base card index, e.g.
+#   ape run refresh_bench --seats 9 --refreshes 20
+# --client node does the indexed lookups with interface/deck.js (via hodlem.worker)
+
+def scanCard(db, deck, address, tableId, deckId, cardIndex):
+    # lookAtCard without the index
+    secret = int(db.getData(f'/{address}/{tableId}/shuffle/secret'))
+    bases = [point(c) for c in deck.baseCards(deckId)]
+    card = multiply(point(deck.lastDecrypt(deckId, cardIndex)), pow(secret, -1, N))
+    return next((i for i, b in enumerate(bases) if b == card), len(bases))
+
+async def deal(table):
+    await table.join()
+    while True:
+        phase = (await table.call(table.room.phaseCommit, table.tableId))[0]
+        if phase == Phase_PLAY:
+            return
+        await getattr(table, PHASES[phase])()
+
+def refresh(reader, table, look):
+    # look(seatIndex, address, cardIndices) gives the open index of each card
+    hands = []
+    for seatIndex, player in enumerate(table.players):
+        state = reader.read(table.tableId)
+        hands.append(look(seatIndex, player.address, state.game.hands[seatIndex]))
+    return hands
+
+def timed(refreshes, f):
+    start = time.monotonic()
+    for _ in range(refreshes):
+        result = f()
+    return (time.monotonic() - start) / refreshes, result
+
+@click.command(cls=NetworkBoundCommand)
+@network_option()
+@click.option("--seats", default=9, help="players at the table")
+@click.option("--refreshes", default=10, help="refreshes of every seat to time")
+@click.option("--client", default="python", help="deck client for the indexed lookups: python or node")
+def cli(network, seats, refreshes, client):
+    deployer = accounts.test_accounts[0]
+    deck = project.Deck.deploy(sender=deployer)
+    room = project.Room.deploy(deck.address, sender=deployer)
+    game = project.Game.deploy(room.address, sender=deployer)
+    room.setGameAddress(game.address, sender=deployer)
+
+    config = dict(buyIn=1000, bond=1000, startsWith=seats, untilLeft=1, structure=[5, 10, 15],
+                  levelBlocks=10**6, verifRounds=1, prepBlocks=10**6, shuffBlocks=10**6,
+                  verifBlocks=10**6, dealBlocks=10**6, actBlocks=10**6)
+    players = []
+    for _ in range(seats):
+        player = accounts.test_accounts.generate_test_account()
+        networks.provider.set_balance(player.address, 10**21)
+        players.append(player)
+
+    with tempfile.TemporaryDirectory() as db:
+        paths = [os.path.join(db, f"{player.address}.log") for player in players]
+        if client == "node":
+            rpc = networks.active_provider.web3.provider.endpoint_uri
+            clients = [DeckWorker(deck.address, rpc, path) for path in paths]
+        else:
+            clients = [DeckClient(deck, path) for path in paths]
+        table = Table(room, game, deck, config, players, clients, [callPolicy] * seats,
+                      random.Random(0), 0)
+        start = time.monotonic()
+        asyncio.run(deal(table))
+        click.echo(f"dealt a hand at {seats} seats in {time.monotonic() - start:.1f}s")
+
+        reader = TableStateClient(game)
+        dbs = [openDb(path) for path in paths]
+
+        def scan(seatIndex, address, cardIndices):
+            return [scanCard(dbs[seatIndex], deck, address, table.tableId, table.deckId, cardIndex)
+                    for cardIndex in cardIndices]
+
+        def lookUp(seatIndex, address, cardIndices):
+            return clients[seatIndex].lookAtCards(address, table.tableId, table.deckId, cardIndices)
+
+        scanSeconds, scanned = timed(refreshes, lambda: refresh(reader, table, scan))
+        indexSeconds, indexed = timed(refreshes, lambda: refresh(reader, table, lookUp))
+        assert scanned == indexed, "hands differ"
+        click.echo(f"scan:    {scanSeconds * 1000:8.1f}ms per refresh of {seats} seats")
+        click.echo(f"indexed: {indexSeconds * 1000:8.1f}ms per refresh of {seats} seats "
+                   f"({scanSeconds / indexSeconds:.1f}x faster)")
+        if client == "node":
+            for worker in clients:
+                worker.close()
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import click
+from ape import accounts, project
+from ape.cli import NetworkBoundCommand, network_option
+from hodlem.deck import DeckClient, cryptoPool
+
+# times one seat's card cryptography (without sending the transactions) on a prepped deck:
+# the prep, and the shuffle with its commitments at each number of verification rounds,
+# in this process (1 worker) and over pools of processes, e.g.
+#   ape run shuffle_bench --workers 1,4,8 --rounds 1,4,16,63
+
+MAX_SECURITY = 63 # Deck.vy
+
+def nums(s):
+    return [int(n) for n in s.split(",")]
+
+def timed(f, *args):
+    start = time.monotonic()
+    f(*args)
+    return time.monotonic() - start
+
+@click.command(cls=NetworkBoundCommand)
+@network_option()
+@click.option("--workers", default=f"1,{os.cpu_count()}", help="comma-separated pool sizes")
+@click.option("--rounds", default="1,2,4,8,16,32,63", help="comma-separated verification rounds")
+def cli(network, workers, rounds):
+    workers, rounds = nums(workers), nums(rounds)
+    assert max(rounds) <= MAX_SECURITY, "too many rounds"
+    deployer = accounts.test_accounts[0]
+    address = deployer.address
+    deck = project.Deck.deploy(sender=deployer)
+    deckId = deck.newDeck(1, sender=deployer).return_value
+
+    with tempfile.TemporaryDirectory() as db:
+        client = DeckClient(deck, os.path.join(db, "prep.log"))
+        deck.submitPrep(deckId, 0, client.submitPrep(address, 0), sender=deployer)
+        deck.finishSubmit(deckId, sender=deployer)
+        deck.verifyPrep(deckId, 0, client.verifyPrep(address, 0), sender=deployer)
+        deck.finishPrep(deckId, sender=deployer)
+
+        seconds = {}
+        for count in workers:
+            pool = cryptoPool(count)
+            if pool:
+                # start the processes before timing
+                list(pool.map(abs, range(count)))
+            client = DeckClient(deck, os.path.join(db, f"{count}.log"), pool)
+            seconds[count, "prep"] = (timed(client.submitPrep, address, 0) +
+                                      timed(client.verifyPrep, address, 0))
+            for r in rounds:
+                seconds[count, r] = timed(client.shuffle, address, 0, deckId, r)
+            if pool:
+                pool.shutdown()
+
+    click.echo(f"{'rounds':>8}" + "".join(f"{f'{count} workers':>12}" for count in workers))
+    for r in ["prep"] + rounds:
+        click.echo(f"{r:>8}" + "".join(f"{seconds[count, r]:>11.2f}s" for count in workers))
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import os
+import click
+from ape import accounts, networks, project
+from ape.cli import NetworkBoundCommand, network_option
+from hodlem.deck import DeckClient, cryptoPool
+from hodlem.profile import contractProfiler, writeProfiles
+from hodlem.sim import POLICIES, simulate, formatComparison, formatReport
+
+# plays whole sit-n-go tournaments on many tables at once, e.g.
+#   ape run simulate --tables 16 --seats 6 --policies random,call,raise
+# and to compare the gas of a change, e.g. a 9-seat tournament before and after:
+#   ape run simulate --tables 1 --seats 9 --report before.json
+#   ape run simulate --tables 1 --seats 9 --compare before.json
+# --profile DIR writes the gas profile (hodlem.profile) of the costliest call of each entry point
+
+def secrets(db, player):
+    path = os.path.join(db, f"{player.address}.log")
+    if os.path.exists(path):
+        os.remove(path)
+    return path
+
+@click.command(cls=NetworkBoundCommand)
+@network_option()
+@click.option("--tables", default=4, help="tables played at once")
+@click.option("--seats", default=3, help="players per table")
+@click.option("--until-left", default=1, help="players left when a tournament ends")
+@click.option("--verif-rounds", default=1, help="shuffle verification rounds")
+@click.option("--level-blocks", default=100, help="blocks per blind level (counted over all tables)")
+@click.option("--policies", default="random", help="comma-separated betting policies, dealt round the seats: "
+                                                   + ", ".join(POLICIES))
+@click.option("--max-hands", default=0, help="stop each table after this many hands (0: play to the end)")
+@click.option("--seed", default=0, help="seed for the betting policies")
+@click.option("--workers", default=1, help="processes for the card cryptography, shared by all seats")
+@click.option("--deck-seed", default=None, help="seed for the card cryptography, for reproducible runs")
+@click.option("--db", default="sim-db", help="directory for the players' secrets, one file each")
+@click.option("--report", default=None, help="also write the report to this JSON file")
+@click.option("--compare", default=None, help="compare gas with the report in this JSON file")
+@click.option("--profile", default=None, help="write gas profiles of the costliest calls to this directory")
+def cli(network, tables, seats, until_left, verif_rounds, level_blocks, policies, max_hands, seed,
+        workers, deck_seed, db, report, compare, profile):
+    if compare:
+        with open(compare) as f:
+            before = json.load(f)
+    deployer = accounts.test_accounts[0]
+    deck = project.Deck.deploy(sender=deployer)
+    room = project.Room.deploy(deck.address, sender=deployer)
+    game = project.Game.deploy(room.address, sender=deployer)
+    room.setGameAddress(game.address, sender=deployer)
+
+    # deadlines are long since every table's transactions advance the same chain
+    config = dict(
+            buyIn=1000,
+            bond=1000,
+            startsWith=seats,
+            untilLeft=until_left,
+            structure=[5, 10, 15, 20, 30, 40, 60, 80, 100, 150, 200, 300, 500],
+            levelBlocks=level_blocks,
+            verifRounds=verif_rounds,
+            prepBlocks=10**6,
+            shuffBlocks=10**6,
+            verifBlocks=10**6,
+            dealBlocks=10**6,
+            actBlocks=10**6)
+
+    os.makedirs(db, exist_ok=True)
+    players = []
+    for _ in range(tables * seats):
+        player = accounts.test_accounts.generate_test_account()
+        networks.provider.set_balance(player.address, 10**21)
+        players.append(player)
+    names = policies.split(",")
+    seated = [players[t * seats:(t + 1) * seats] for t in range(tables)]
+    pool = cryptoPool(workers)
+    result = asyncio.run(simulate(
+        room, game, deck, config, seated,
+        [[DeckClient(deck, secrets(db, p), pool, deck_seed) for p in table] for table in seated],
+        [[POLICIES[names[i % len(names)]] for i in range(seats)] for _ in range(tables)],
+        tables, seed, max_hands))
+    if pool:
+        pool.shutdown()
+    click.echo(formatReport(result))
+    if report:
+        with open(report, "w") as f:
+            json.dump(result, f, indent=2)
+    if compare:
+        click.echo(formatComparison(before, result))
+    if profile:
+        profiler = contractProfiler(networks.active_provider.web3.provider.endpoint_uri,
+                                    Deck=deck, Room=room, Game=game)
+        writeProfiles(profiler, result["worstTxs"], profile)
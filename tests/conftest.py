@@ -0,0 +1,223 @@
+from eth.constants import BLANK_ROOT_HASH, EMPTY_SHA3
+from hodlem.deck import DeckClient, cryptoPool
+from hodlem.worker import DeckWorker
+import copy
+import functools
+import hashlib
+import hodlem.db
+import hodlem.deck
+import hodlem.worker
+import inspect
+import json
+import os
+import pytest
+import rlp
+
+STATE_CACHE = os.environ.get("STATE_CACHE", "tests/.state-cache")
+# bump when what a cached state holds changes
+STATE_VERSION = 1
+
+# under pytest-xdist (ape test -n auto) every worker is its own process,
+# so it gets its own anvil (the foundry provider picks a free port), its own
+# deployment from the session fixtures below, and its own deck DB file
+
+def deckDbPath():
+    path = os.environ.get("DECK_DB", "tests/db.log")
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker:
+        base, ext = os.path.splitext(path)
+        path = f"{base}-{worker}{ext}"
+    return path
+
+@pytest.fixture(scope="session")
+def deck(project, accounts):
+    return project.Deck.deploy(sender=accounts[0])
+
+@pytest.fixture(scope="session")
+def room(project, accounts, deck):
+    return project.Room.deploy(deck.address, sender=accounts[0])
+
+@pytest.fixture(scope="session")
+def game(project, accounts, room):
+    game = project.Game.deploy(room.address, sender=accounts[0])
+    room.setGameAddress(game.address, sender=accounts[0])
+    return game
+
+@pytest.fixture(scope="session")
+def lobby(project, accounts, room):
+    return project.Lobby.deploy(room.address, sender=accounts[0])
+
+@pytest.fixture(scope="session")
+def deckClient(networks, deck):
+    db_path = deckDbPath()
+    try:
+        os.remove(db_path)
+    except FileNotFoundError:
+        pass
+    # DECK_SEED: seed the secrets, permutations and proofs, for reproducible runs
+    seed = os.environ.get("DECK_SEED")
+    if os.environ.get("DECK_CLIENT") == "node":
+        with DeckWorker(deck.address, networks.active_provider.web3.provider.endpoint_uri,
+                        db_path, seed=seed) as worker:
+            yield worker
+    else:
+        # DECK_WORKERS: processes for the card cryptography
+        pool = cryptoPool(int(os.environ.get("DECK_WORKERS", 1)))
+        yield DeckClient(deck, db_path, pool, seed)
+        if pool:
+            pool.shutdown()
+
+@functools.cache
+def fileDigest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def deckClientSources():
+    if os.environ.get("DECK_CLIENT") == "node":
+        return [hodlem.db.__file__, hodlem.worker.__file__, "interface/deck.js", "interface/lib.js"]
+    return [hodlem.deck.__file__, hodlem.db.__file__]
+
+# ape's test provider (py-evm) has no anvil_dumpState: its states are dumped as the
+# state root with every trie node and contract code under it, and loaded by mining
+# a block on top of that root
+
+def evmStateNodes(db, root):
+    # {hash: node} for the account trie at root and the storage tries and code of its accounts
+    nodes = {}
+    pending = [(root, True)]
+    while pending:
+        node, accounts = pending.pop()
+        if isinstance(node, bytes):
+            if node == BLANK_ROOT_HASH or node in nodes:
+                continue
+            nodes[node] = db[node]
+            node = rlp.decode(nodes[node])
+        if len(node) == 17:
+            pending.extend((child, accounts) for child in node[:16] if child)
+        elif not node[0][0] & 0x20:
+            # extension
+            pending.append((node[1], accounts))
+        elif accounts:
+            _, _, storageRoot, codeHash = rlp.decode(node[1])
+            pending.append((storageRoot, False))
+            if codeHash != EMPTY_SHA3:
+                nodes[codeHash] = db[codeHash]
+    return nodes
+
+def dumpEvmState(backend):
+    root = backend.chain.get_canonical_head().state_root
+    nodes = evmStateNodes(backend.chain.chaindb.db, root)
+    return dict(root=root.hex(), nodes={k.hex(): v.hex() for k, v in nodes.items()})
+
+def loadEvmState(backend, dump):
+    db = backend.chain.chaindb.db
+    for k, v in dump["nodes"].items():
+        db[bytes.fromhex(k)] = bytes.fromhex(v)
+    backend.chain.header = backend.chain.header.copy(state_root=bytes.fromhex(dump["root"]))
+
+class ChainStates:
+    # prepared tables as chain states, each paired with the deck DB holding its secrets
+    # every state is built on top of the fresh deployment (the root), possibly via a parent
+    # state, and is kept as an anvil_dumpState dump (or a py-evm state dump on ape's test
+    # provider): restoring one reverts to the root snapshot and loads the dump, so tests
+    # using it never see each other's transactions
+    # (restoring always starts from the root because anvil drops every later snapshot
+    # on a revert, so the states cannot all be live snapshots)
+    # built states are also saved under STATE_CACHE (set it empty to turn this off),
+    # keyed by a hash of the provider, the deployment, the deck client's source (its secret format),
+    # the file defining each state's builder, and the parameters of the state and its parents,
+    # so later runs with the same contracts and fixtures skip building them
+    #
+    # isolation: the root is snapshotted when the first prepared table is needed; ape
+    # reverts to its session state before setting up a session fixture that comes after
+    # its module and function snapshots, so the root is the bare deployment. Reverting
+    # to the root drops those later snapshots, and ape then skips undoing the test, so
+    # every fixture restoring a state must reset() to the root when its test is done
+
+    def __init__(self, chain, accounts, contracts, deckClient):
+        self.chain = chain
+        self.deckClient = deckClient
+        # None on anvil
+        self.evm = getattr(chain.provider, "evm_backend", None)
+        key = hashlib.sha256(f"{STATE_VERSION}{os.path.splitext(deckDbPath())[1]}".encode())
+        key.update(chain.provider.name.encode())
+        for path in deckClientSources():
+            key.update(fileDigest(path).encode())
+        for account in list(accounts)[:10]:
+            key.update(account.address.encode())
+        for contract in contracts:
+            key.update(contract.address.encode())
+            key.update(bytes(chain.provider.get_code(contract.address)))
+        self.root = dict(key=key.hexdigest(), db=deckClient.dump())
+        self.snapshot = chain.snapshot()
+
+    def request(self, method, *params):
+        response = self.chain.provider.web3.provider.make_request(method, list(params))
+        if "error" in response:
+            raise RuntimeError(f"{method}: {response['error']}")
+        return response["result"]
+
+    def dumpChain(self):
+        if self.evm:
+            return dumpEvmState(self.evm)
+        return self.request("anvil_dumpState")
+
+    def loadChain(self, dump, height):
+        if self.evm:
+            # the loaded root takes effect in the next block
+            loadEvmState(self.evm, dump)
+            self.chain.mine(max(height - self.chain.blocks.height, 1))
+            return
+        self.request("anvil_loadState", dump)
+        # older anvils do not restore the block number, which deadlines are relative to
+        if self.chain.blocks.height < height:
+            self.chain.mine(height - self.chain.blocks.height)
+
+    def cacheFile(self, key):
+        return os.path.join(STATE_CACHE, f"{key}.json")
+
+    def build(self, name, params, make, parent=None):
+        # make() runs in the parent's state (the root if None) and returns the state's value,
+        # which must be JSON, e.g. a table id and its config
+        parent = parent or self.root
+        builder = fileDigest(inspect.getsourcefile(make))
+        key = hashlib.sha256(json.dumps([parent["key"], name, params, builder]).encode()).hexdigest()
+        if STATE_CACHE:
+            try:
+                with open(self.cacheFile(key)) as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                pass
+        self.restore(parent)
+        state = dict(key=key, value=make(), height=self.chain.blocks.height,
+                     chain=self.dumpChain(), db=self.deckClient.dump())
+        if STATE_CACHE:
+            os.makedirs(STATE_CACHE, exist_ok=True)
+            tmp = f"{self.cacheFile(key)}.{os.getpid()}"
+            with open(tmp, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp, self.cacheFile(key))
+        return state
+
+    def reset(self):
+        # back to the root, chain and deck DB
+        if self.evm:
+            # py-evm snapshots are block hashes, so ape's own snapshot at the root block is
+            # the root's too, and ape forgets it once it restores that; revert by the hash
+            self.chain.provider.restore(self.snapshot)
+        else:
+            self.chain.restore(self.snapshot)
+            self.snapshot = self.chain.snapshot()
+        self.deckClient.load(self.root["db"])
+
+    def restore(self, state):
+        self.reset()
+        if "chain" in state:
+            self.loadChain(state["chain"], state["height"])
+        self.deckClient.load(state["db"])
+        return copy.deepcopy(state.get("value"))
+
+# requested only by the prepared table fixtures, so tests without them need no chain
+@pytest.fixture(scope="session")
+def states(chain, accounts, deck, room, game, lobby, deckClient):
+    return ChainStates(chain, accounts, [deck, room, game, lobby], deckClient)
@@ -0,0 +1,19 @@
+from hodlem.db import openDb
+import pytest
+
+@pytest.mark.parametrize("name", ["db.json", "db.log"])
+def test_transaction_dropped_on_error(tmp_path, name):
+    filename = str(tmp_path / name)
+    db = openDb(filename)
+    with db.transaction() as tx:
+        tx.push("/0xa/1/secret", "1")
+    with pytest.raises(RuntimeError):
+        with db.transaction() as tx:
+            tx.push("/0xa/1/secret", "2")
+            tx.push("/0xa/2/secret", "3")
+            assert tx.getData("/0xa/1/secret") == "2"
+            raise RuntimeError("failed mid-operation")
+    db.save()
+    for store in [db, openDb(filename)]:
+        assert store.getData("/0xa/1/secret") == "1"
+        assert not store.exists("/0xa/2/secret")
@@ -0,0 +1,172 @@
+# gas benchmarks: play a whole hand at various table sizes and compare the
+# worst gas_used of every entry point against tests/gas_baseline.json
+# GAS_UPDATE=1 ape test tests/test_gas.py rewrites the baseline
+# GAS_TOLERANCE (default 0.02) is the allowed relative increase
+# GAS_PROFILE=DIR writes the gas profile (hodlem.profile) of the costliest call
+# of each entry point to DIR/seats=N,verifRounds=R/
+
+import fcntl
+import json
+import os
+import pytest
+from hodlem.profile import contractProfiler, writeProfiles
+
+BASELINE = os.path.join(os.path.dirname(__file__), "gas_baseline.json")
+TOLERANCE = float(os.environ.get("GAS_TOLERANCE", "0.02"))
+
+Req_DECK = 0
+Req_SHOW = 2
+Phase_SHUF = 3
+Phase_DEAL = 4
+Phase_PLAY = 5
+Phase_SHOW = 6
+
+class GasRecord(dict):
+    def __init__(self):
+        super().__init__(total=0)
+        self.worst = {} # name -> hash of the transaction with the gas in self[name]
+
+    def add(self, name, tx):
+        if tx.gas_used > self.get(name, 0):
+            self[name] = tx.gas_used
+            self.worst[name] = tx.txn_hash
+        self["total"] += tx.gas_used
+        return tx
+
+def deal(gas, accounts, room, deckClient, tableId, deckId, numSeats):
+    # decrypt (in seat order) then reveal whatever the deal requires, ending on the last transaction
+    req, drawIndex, decryptCount, opened = room.cardInfo(tableId)
+    actions = []
+    for seatIndex in range(numSeats):
+        indices = [i for i in range(26) if req[i] != Req_DECK and decryptCount[i] <= seatIndex]
+        if indices:
+            actions.append(("decryptCards", seatIndex, indices))
+    for seatIndex in range(numSeats):
+        indices = [i for i in range(26)
+                   if req[i] == Req_SHOW and opened[i] == 0 and drawIndex[i] == seatIndex]
+        if indices:
+            actions.append(("revealCards", seatIndex, indices))
+    for k, (name, seatIndex, indices) in enumerate(actions):
+        account = accounts[seatIndex]
+        end = k == len(actions) - 1
+        if name == "decryptCards":
+            lists = deckClient.decryptCards(account.address, tableId, deckId, seatIndex,
+                                            indices, [drawIndex[i] for i in indices])
+            gas.add(name, room.decryptCards(tableId, seatIndex, lists, end, sender=account))
+        else:
+            lists = deckClient.revealCards(account.address, tableId, deckId, seatIndex, indices)
+            gas.add(name, room.revealCards(tableId, seatIndex, lists, end, sender=account))
+
+def shuffle(gas, accounts, room, deckClient, tableId, numSeats, verifRounds):
+    deckId = room.configParams(tableId)[-1]
+    permutation = list(range(1, 53))
+    for seatIndex in range(numSeats):
+        account = accounts[seatIndex]
+        cards, hash = deckClient.shuffle(account.address, tableId, deckId, verifRounds, permutation)
+        gas.add("submitShuffle", room.submitShuffle(tableId, seatIndex, cards, hash, sender=account))
+    for seatIndex in range(numSeats):
+        account = accounts[seatIndex]
+        c, s, p = deckClient.verifyShuffle(account.address, tableId, deckId, seatIndex)
+        gas.add("verifyShuffle", room.verifyShuffle(tableId, seatIndex, c, s, p, sender=account))
+    deal(gas, accounts, room, deckClient, tableId, deckId, numSeats)
+    return deckId
+
+def playHand(accounts, room, game, deckClient, numSeats, verifRounds):
+    gas = GasRecord()
+    config = dict(
+            buyIn=1000,
+            bond=2000,
+            startsWith=numSeats,
+            untilLeft=1,
+            structure=[10, 20, 30, 40],
+            levelBlocks=1000,
+            verifRounds=verifRounds,
+            prepBlocks=1000,
+            shuffBlocks=1000,
+            verifBlocks=1000,
+            dealBlocks=1000,
+            actBlocks=1000)
+    value = f"{config['bond'] + config['buyIn']} wei"
+    tx = gas.add("createTable", room.createTable(0, config, sender=accounts[0], value=value))
+    tableId = tx.return_value
+    for seatIndex in range(1, numSeats):
+        gas.add("joinTable", room.joinTable(tableId, seatIndex, sender=accounts[seatIndex], value=value))
+
+    for seatIndex in range(numSeats):
+        account = accounts[seatIndex]
+        hash = deckClient.submitPrep(account.address, tableId)
+        gas.add("submitPrep", room.submitPrep(tableId, seatIndex, hash, sender=account))
+    for seatIndex in range(numSeats):
+        account = accounts[seatIndex]
+        prep = deckClient.verifyPrep(account.address, tableId)
+        gas.add("verifyPrep", room.verifyPrep(tableId, seatIndex, prep, sender=account))
+
+    # select the dealer, then deal the hole cards
+    shuffle(gas, accounts, room, deckClient, tableId, numSeats, verifRounds)
+    deckId = shuffle(gas, accounts, room, deckClient, tableId, numSeats, verifRounds)
+
+    # preflop: the first to act raises, the next folds (if that leaves a hand), everyone else calls
+    # later streets are checked down to the showdown
+    bigBlind = config["structure"][0] * 2
+    raised = folded = False
+    while True:
+        phase = room.phaseCommit(tableId)[0]
+        if phase == Phase_DEAL:
+            deal(gas, accounts, room, deckClient, tableId, deckId, numSeats)
+        elif phase == Phase_PLAY:
+            seatIndex = game.games(tableId)["actionIndex"]
+            account = accounts[seatIndex]
+            if not raised:
+                gas.add("raiseBet", game.raiseBet(tableId, seatIndex, 3 * bigBlind, sender=account))
+                raised = True
+            elif not folded and numSeats > 2:
+                gas.add("fold", game.fold(tableId, seatIndex, sender=account))
+                folded = True
+            else:
+                gas.add("callBet", game.callBet(tableId, seatIndex, sender=account))
+        elif phase == Phase_SHOW:
+            data = game.games(tableId)
+            seatIndex = data["actionIndex"]
+            account = accounts[seatIndex]
+            lists = deckClient.revealCards(account.address, tableId, deckId, seatIndex,
+                                           list(data["hands"][seatIndex]))
+            gas.add("showCards", game.showCards(tableId, seatIndex, lists, sender=account))
+        else:
+            break
+    assert phase == Phase_SHUF, "onto shuffle for next hand"
+    return gas
+
+def updateBaseline(key, gas):
+    # read-modify-write under a lock, since xdist workers update the file concurrently
+    with open(BASELINE, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        text = f.read()
+        baseline = json.loads(text) if text else {}
+        baseline[key] = gas
+        f.seek(0)
+        f.truncate()
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+@pytest.mark.parametrize("verifRounds", [1, 4])
+@pytest.mark.parametrize("numSeats", [2, 3, 6, 9])
+def test_gas(networks, accounts, deck, room, game, deckClient, numSeats, verifRounds):
+    gas = playHand(accounts, room, game, deckClient, numSeats, verifRounds)
+    key = f"seats={numSeats},verifRounds={verifRounds}"
+    if os.environ.get("GAS_PROFILE"):
+        profiler = contractProfiler(networks.active_provider.web3.provider.endpoint_uri,
+                                    Deck=deck, Room=room, Game=game)
+        writeProfiles(profiler, gas.worst, os.path.join(os.environ["GAS_PROFILE"], key))
+    if os.environ.get("GAS_UPDATE"):
+        updateBaseline(key, gas)
+        return
+    try:
+        with open(BASELINE) as f:
+            baseline = json.load(f)
+    except FileNotFoundError:
+        baseline = {}
+    assert key in baseline, f"no baseline for {key}: run with GAS_UPDATE=1"
+    regressions = {name: (baseline[key][name], used) for name, used in gas.items()
+                   if used > baseline[key].get(name, 0) * (1 + TOLERANCE)}
+    assert not regressions, f"gas regressions (baseline, used): {regressions}"
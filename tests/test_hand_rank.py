@@ -0,0 +1,121 @@
+# differential test of Game.handRank (the single-pass evaluator behind bestHandRank)
+# and of hodlem.hand against the previous evaluator:
+# handRank on each of the 21 5-card subsets, ported as is
+
+from hodlem.hand import handRanks
+from itertools import combinations
+import random
+import pytest
+
+def checkStraight(hand):
+    count = 1 if hand[12] else 0
+    for i in range(13):
+        count = count + 1 if hand[i] else 0
+        if count == 5:
+            return i
+    return 0
+
+def checkFlush(hand):
+    count = [0] * 4
+    for i in range(13):
+        for suit in range(4):
+            if hand[i] & (1 << suit):
+                count[suit] += 1
+                if count[suit] == 5:
+                    return suit + 1
+    return 0
+
+def getRanksByCount(hand):
+    result = [[], [], [], []]
+    for rank in range(13):
+        count = bin(hand[rank]).count("1")
+        if count:
+            result[count - 1].append(rank)
+    return result
+
+def encode(*components):
+    rank = 0
+    for c in components + (0,) * (6 - len(components)):
+        rank = (rank << 8) | c
+    return rank
+
+def handRank(hand):
+    straight = checkStraight(hand)
+    flush = checkFlush(hand)
+    if straight and flush:
+        return encode(9, straight)
+    ranks = getRanksByCount(hand)
+    if ranks[3]:
+        return encode(8, ranks[3][0], ranks[0][0])
+    if ranks[2] and ranks[1]:
+        return encode(7, ranks[2][0], ranks[1][0])
+    if flush:
+        return encode(6, *reversed(ranks[0]))
+    if straight:
+        return encode(5, straight)
+    if ranks[2]:
+        return encode(4, ranks[2][0], ranks[0][1], ranks[0][0])
+    if len(ranks[1]) == 2:
+        return encode(3, ranks[1][1], ranks[1][0], ranks[0][0])
+    if len(ranks[1]) == 1:
+        return encode(2, ranks[1][0], ranks[0][2], ranks[0][1], ranks[0][0])
+    return encode(1, *reversed(ranks[0]))
+
+def referenceRank(cards):
+    best = 0
+    for five in combinations(cards, 5):
+        hand = [0] * 13
+        for card in five:
+            hand[(card - 1) % 13] |= 1 << ((card - 1) // 13)
+        best = max(best, handRank(hand))
+    return best
+
+def card(rank, suit):
+    return 1 + suit * 13 + rank
+
+def adversarialHands():
+    # straight flushes (with the wheel) next to higher off-suit straights
+    for high in range(3, 13):
+        flush = [card((high - i) % 13 if high - i >= 0 else 12, 0) for i in range(5)]
+        yield flush + [card((high + 1) % 13, 1), card((high + 2) % 13, 2)]
+    # wheel against 6-high straight, broken wrap-arounds
+    yield [card(r, r % 4) for r in (12, 0, 1, 2, 3)] + [card(4, 1), card(9, 2)]
+    yield [card(r, r % 4) for r in (11, 12, 0, 1, 2)] + [card(5, 1), card(7, 2)]
+    yield [card(r, r % 2) for r in (8, 9, 10, 11, 12)] + [card(0, 2), card(1, 3)]
+    # flushes of six and seven cards, with an off-suit straight
+    yield [card(r, 1) for r in (0, 2, 4, 6, 8, 10, 12)]
+    yield [card(r, 2) for r in (1, 2, 3, 4, 6, 11)] + [card(5, 0)]
+    # quads with trips, quads with pairs, two trips, three pairs, trips and two pairs
+    yield [card(7, s) for s in range(4)] + [card(3, s) for s in range(3)]
+    yield [card(0, s) for s in range(4)] + [card(12, 0), card(12, 1), card(5, 2)]
+    yield [card(9, s) for s in range(3)] + [card(10, s) for s in range(3)] + [card(2, 3)]
+    yield [card(r, s) for r in (4, 8, 11) for s in (0, 1)] + [card(2, 3)]
+    yield [card(r, s) for r in (4, 8, 11) for s in (0, 1)] + [card(12, 3)]
+    yield [card(6, s) for s in range(3)] + [card(r, s) for r in (1, 10) for s in (0, 1)]
+    # full house next to a flush and a straight
+    yield [card(r, 0) for r in (2, 3, 4, 5)] + [card(6, 0), card(6, 1), card(6, 2)]
+    # plain pairs and high cards with kicker ties
+    yield [card(r, r % 4) for r in (0, 1, 3, 5, 7, 9, 11)]
+    yield [card(0, 0), card(0, 1)] + [card(r, (r + 1) % 4) for r in (3, 5, 7, 9, 11)]
+
+def randomHands(n, seed=20230405):
+    rng = random.Random(seed)
+    return [rng.sample(range(1, 53), 7) for _ in range(n)]
+
+@pytest.mark.parametrize("batch", range(4))
+def test_hand_rank_random(game, batch):
+    for cards in randomHands(500, seed=batch):
+        assert game.handRank(cards) == referenceRank(cards), cards
+
+def test_hand_rank_adversarial(game):
+    for cards in adversarialHands():
+        assert len(set(cards)) == 7, cards
+        assert game.handRank(cards) == referenceRank(cards), cards
+
+def test_python_hand_rank():
+    rng = random.Random(1)
+    hands = list(adversarialHands()) + randomHands(3000)
+    for size in (5, 6):
+        short = [rng.sample(range(1, 53), size) for _ in range(1000)]
+        assert list(handRanks(short)) == [referenceRank(cards) for cards in short]
+    assert list(handRanks(hands)) == [referenceRank(cards) for cards in hands]
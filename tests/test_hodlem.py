@@ -1,26 +1,12 @@
 from ape import reverts
-import json
-import os
+from hodlem.bn254 import ZERO, compress, decompress, randomPoint
+from hodlem.deck import DeckClient, lastShuffle, lookAtCards, point, shuffleSources
+from hodlem.hand import handRank, encode, FLUSH
+from hodlem.state import TableStateClient
 import pytest
-import subprocess
 
-MAX_SECURITY = 63
 Phase_SHUF = 3
 
-@pytest.fixture(scope="session")
-def deck(project, accounts):
-    return project.Deck.deploy(sender=accounts[0])
-
-@pytest.fixture(scope="session")
-def room(project, accounts, deck):
-    return project.Room.deploy(deck.address, sender=accounts[0])
-
-@pytest.fixture(scope="session")
-def game(project, accounts, room):
-    game = project.Game.deploy(room.address, sender=accounts[0])
-    room.setGameAddress(game.address, sender=accounts[0])
-    return game
-
 def test_new_deck_ids_distinct(accounts, deck):
     tx1 = deck.newDeck(13, sender=accounts[0])
     tx2 = deck.newDeck(9, sender=accounts[0])
@@ -31,8 +17,73 @@ def test_new_deck_invalid_players(accounts, deck):
         deck.newDeck(0, sender=accounts[0])
     with reverts("invalid players"):
         deck.newDeck(128, sender=accounts[0])
+    # deck ids are sequential, starting from however many decks this worker's tables made
     tx = deck.newDeck(127, sender=accounts[0])
-    assert tx.return_value == 0
+    assert deck.newDeck(1, sender=accounts[0]).return_value == tx.return_value + 1
+
+def test_shuffle_stored_compressed(accounts, deck):
+    deckId = deck.newDeck(1, sender=accounts[0]).return_value
+    points = [ZERO] + [randomPoint() for _ in range(52)]
+    assert [decompress(compress(p)) for p in points] == points
+    offCurve = list(points)
+    offCurve[7] = (points[7][0], points[7][1] + 1)
+    with reverts("invalid point"):
+        deck.submitShuffle(deckId, 0, offCurve, sender=accounts[0])
+    deck.submitShuffle(deckId, 0, points, sender=accounts[0])
+    assert [tuple(p) for p in deck.lastShuffle(deckId)] == points
+
+def test_hashed_deck(accounts, deck, tmp_path):
+    # a deck keeping only digests of the shuffles, with the cards in SubmitShuffle logs
+    tx = deck.newDeck(2, True, sender=accounts[0])
+    deckId = tx.return_value
+    assert deck.logsFrom(deckId) == tx.block_number
+    player = accounts[0]
+    clients = [DeckClient(deck, str(tmp_path / f"{i}.log")) for i in range(2)]
+    for i, client in enumerate(clients):
+        deck.submitPrep(deckId, i, client.submitPrep(player.address, i), sender=player)
+    deck.finishSubmit(deckId, sender=player)
+    for i, client in enumerate(clients):
+        deck.verifyPrep(deckId, i, client.verifyPrep(player.address, i), sender=player)
+    deck.finishPrep(deckId, sender=player)
+    shuffles = []
+    for i, client in enumerate(clients):
+        cards, hash = client.shuffle(player.address, i, deckId, 2)
+        tx = deck.submitShuffle(deckId, i, cards, sender=player)
+        shuffles.append([tuple(c) for c in cards])
+        assert [tuple(c) for c in tx.events[0].event_arguments["cards"]] == shuffles[i]
+        assert lastShuffle(deck, deckId) == shuffles[i]
+        if i == 0:
+            with reverts("in SubmitShuffle logs"):
+                deck.lastShuffle(deckId)
+        deck.challenge(deckId, i, 2, sender=player)
+        deck.respondChallenge(deckId, i, hash, sender=player)
+        sources = shuffleSources(deck, deckId, i, 2)
+        for args in zip(*client.verifyShuffle(player.address, i, deckId, i), sources):
+            deck.defuseNextChallenge(deckId, i, *args, sender=player)
+        assert not deck.challengeActive(deckId, i)
+    # the final shuffle is stored for drawing
+    assert [tuple(c) for c in deck.lastShuffle(deckId)] == shuffles[1]
+    deck.drawCard(deckId, 1, 0, sender=player)
+    for i, client in enumerate(clients):
+        [[_, *card, gs0, gs1, hs0, hs1, scx]] = client.decryptCards(player.address, i, deckId, i, [0], [1])
+        deck.decryptCard(deckId, i, 0, card, ((gs0, gs1), (hs0, hs1), scx), sender=player)
+    assert deck.decryptCount(deckId, 0) == 2
+    # after a reset, the card drawn in the last hand is undrawn (though not cleared)
+    tx = deck.resetShuffle(deckId, sender=player)
+    assert deck.shuffleCount(deckId) == 0
+    # the next hand's logs are read from the reset on
+    assert deck.logsFrom(deckId) == tx.block_number
+    assert deck.decryptCount(deckId, 0) == 2**256 - 1
+    with reverts("not drawn"):
+        deck.decryptCard(deckId, 0, 0, card, ((gs0, gs1), (hs0, hs1), scx), sender=player)
+    for i, client in enumerate(clients):
+        cards, _ = client.shuffle(player.address, i, deckId, 2)
+        deck.submitShuffle(deckId, i, cards, sender=player)
+        if i == 0:
+            assert lastShuffle(deck, deckId) == [tuple(c) for c in cards]
+    deck.drawCard(deckId, 0, 0, sender=player)
+    assert deck.decryptCount(deckId, 0) == 0
+    assert deck.openedCard(deckId, 0) == 0
 
 def test_create_invalid_seatIndex(accounts, room, game):
     with reverts("invalid seatIndex"):
@@ -193,42 +244,29 @@ def test_verify_prep_timeout(accounts, chain, room, game):
     with reverts("wrong phase"):
         room.verifyPrepTimeout(tableId, 1, sender=accounts[0])
 
-@pytest.fixture(scope="session")
-def deckArgs(networks, deck):
-    db_path = "tests/db.json"
-    try:
-        os.remove(db_path)
-    except FileNotFoundError:
-        pass
-    return ["interface/deck.js", "--db", db_path,
-            "--rpc", networks.active_provider.web3.provider.endpoint_uri,
-            "--deck", deck.address,
-            "--id", "0"]
-
-def submitPrep(deckArgs, account, room, tableId, seatIndex):
-    result = subprocess.run(
-                 deckArgs + ["--from", account.address, "submitPrep"],
-                 capture_output=True, check=True, text=True).stdout.strip()
-    return room.submitPrep(tableId, seatIndex, result, sender=account)
-
-def verifyPrep(deckArgs, account, room, tableId, seatIndex):
-    def readPrep(f):
-        a = []
-        def n():
-            return int(next(f), 16)
-        for _ in range(53):
-            a.append(dict(g=[n(), n()], h=[n(), n()],
-                          gx=[n(), n()], hx=[n(), n()],
-                          p=([n(), n()], [n(), n()], n())))
-        return a
-
-    lines = iter(subprocess.run(
-        deckArgs + ["--from", account.address, "verifyPrep"],
-        capture_output=True, check=True, text=True).stdout.splitlines())
-    return room.verifyPrep(tableId, seatIndex, readPrep(lines), sender=account)
+def submitPrep(deckClient, account, room, tableId, seatIndex):
+    hash = deckClient.submitPrep(account.address, tableId)
+    return room.submitPrep(tableId, seatIndex, hash, sender=account)
+
+def verifyPrep(deckClient, account, room, tableId, seatIndex):
+    prep = deckClient.verifyPrep(account.address, tableId)
+    return room.verifyPrep(tableId, seatIndex, prep, sender=account)
+
+def prepTable(accounts, room, deckClient, config, joinOrder, verifyOrder):
+    # a new table, seat 0 creating it and account i taking seat i, with every seat prepped
+    # the table fixtures build on this, so they do not depend on which tests ran before
+    value = f"{config['bond'] + config['buyIn']} wei"
+    tableId = room.createTable(0, config, sender=accounts[0], value=value).return_value
+    for seatIndex in joinOrder:
+        room.joinTable(tableId, seatIndex, sender=accounts[seatIndex], value=value)
+    for seatIndex in range(len(joinOrder) + 1):
+        submitPrep(deckClient, accounts[seatIndex], room, tableId, seatIndex)
+    for seatIndex in verifyOrder:
+        verifyPrep(deckClient, accounts[seatIndex], room, tableId, seatIndex)
+    return dict(tableId=tableId, config=config)
 
 @pytest.fixture(scope="session")
-def two_players_prepped(networks, accounts, deck, room, game, deckArgs):
+def two_players_prepped_state(states, accounts, room, deckClient):
     config = dict(
             buyIn=300,
             bond=500,
@@ -242,20 +280,16 @@ def two_players_prepped(networks, accounts, deck, room, game, deckArgs):
             verifBlocks=15,
             dealBlocks=10,
             actBlocks=15)
-    value = f"{config['bond'] + config['buyIn']} wei"
-    tx = room.createTable(0, config, sender=accounts[0], value=value)
-    tableId = tx.return_value
-    tx = room.joinTable(tableId, 1, sender=accounts[1], value=value)
+    return states.build("two_players_prepped", config,
+                        lambda: prepTable(accounts, room, deckClient, config, [1], [0, 1]))
 
-    submitPrep(deckArgs, accounts[0], room, tableId, 0)
-    submitPrep(deckArgs, accounts[1], room, tableId, 1)
-    verifyPrep(deckArgs, accounts[0], room, tableId, 0)
-    verifyPrep(deckArgs, accounts[1], room, tableId, 1)
-
-    return dict(tableId=tableId, config=config)
+@pytest.fixture
+def two_players_prepped(states, two_players_prepped_state):
+    yield states.restore(two_players_prepped_state)
+    states.reset()
 
 @pytest.fixture(scope="session")
-def three_players_prepped(networks, accounts, deck, room, game, deckArgs):
+def three_players_prepped_state(states, accounts, room, deckClient):
     config = dict(
             buyIn=1000,
             bond=5000000,
@@ -269,20 +303,8 @@ def three_players_prepped(networks, accounts, deck, room, game, deckArgs):
             verifBlocks=35,
             dealBlocks=15,
             actBlocks=10)
-    value = f"{config['bond'] + config['buyIn']} wei"
-    tx = room.createTable(0, config, sender=accounts[0], value=value)
-    tableId = tx.return_value
-    tx = room.joinTable(tableId, 2, sender=accounts[2], value=value)
-    tx = room.joinTable(tableId, 1, sender=accounts[1], value=value)
-
-    submitPrep(deckArgs, accounts[0], room, tableId, 0)
-    submitPrep(deckArgs, accounts[1], room, tableId, 1)
-    submitPrep(deckArgs, accounts[2], room, tableId, 2)
-    verifyPrep(deckArgs, accounts[2], room, tableId, 2)
-    verifyPrep(deckArgs, accounts[1], room, tableId, 1)
-    verifyPrep(deckArgs, accounts[0], room, tableId, 0)
-
-    return dict(tableId=tableId, config=config)
+    return states.build("three_players_prepped", config,
+                        lambda: prepTable(accounts, room, deckClient, config, [2, 1], [2, 1, 0]))
 
 def test_no_timeout_after_prep(accounts, two_players_prepped, room):
     tableId = two_players_prepped["tableId"]
@@ -318,83 +340,35 @@ def test_submit_shuffle_timeout(accounts, chain, two_players_prepped, room):
     assert accounts[1].balance == acc1_prev_balance + value
     assert room.balance == room_prev_balance - value - value
 
-def shuffle(deckArgs, account, verifRounds, deckId, perm, tableId, seatIndex, room):
-    def readShuffle(f):
-        a = []
-        def n():
-            return int(next(f), 16)
-        for _ in range(53):
-            a.append([n(), n()])
-        return a
-
-    lines = iter(subprocess.run(
-             deckArgs + ["--from", account.address, "shuffle",
-                         "-v", str(verifRounds), "-j", str(deckId),
-                         "--order", ','.join([str(n) for n in perm])],
-            stdout=subprocess.PIPE, check=True, text=True).stdout.splitlines())
-
-    return room.submitShuffle(tableId, seatIndex, readShuffle(lines), next(lines), sender=account)
-
-def verifyShuffle(deckArgs, account, deckId, seatIndex, tableId, room):
-    def readVerification(f):
-        c = []
-        s = []
-        p = []
-        def n():
-            return int(next(f), 16)
-        for _ in range(MAX_SECURITY):
-            d = []
-            for _ in range(53):
-                d.append([n(), n()])
-            c.append(d)
-        for _ in range(MAX_SECURITY):
-            s.append(n())
-        for _ in range(MAX_SECURITY):
-            d = []
-            for _ in range(53):
-                d.append(n())
-            p.append(d)
-        return c, s, p
-
-    lines = iter(subprocess.run(
-             deckArgs + ["--from", account.address, "verifyShuffle",
-                         "-j", str(deckId), "-s", str(seatIndex)],
-            stdout=subprocess.PIPE, check=True, text=True).stdout.splitlines())
-    c, s, p = readVerification(lines)
+def shuffle(deckClient, account, verifRounds, deckId, perm, tableId, seatIndex, room):
+    cards, hash = deckClient.shuffle(account.address, tableId, deckId, verifRounds, perm)
+    return room.submitShuffle(tableId, seatIndex, cards, hash, sender=account)
+
+def verifyShuffle(deckClient, account, deckId, seatIndex, tableId, room):
+    c, s, p = deckClient.verifyShuffle(account.address, tableId, deckId, seatIndex)
     return room.verifyShuffle(tableId, seatIndex, c, s, p, sender=account)
 
-def two_players_shuffle(accounts, two_players_prepped, deckArgs, room, perm0, perm1):
+def two_players_shuffle(accounts, two_players_prepped, deckClient, room, perm0, perm1):
     tableId = two_players_prepped["tableId"]
     deckId = room.configParams(tableId)[-1]
     config = two_players_prepped["config"]
     verifRounds = config["verifRounds"]
-    shuffle(deckArgs, accounts[0], verifRounds, deckId, perm0, tableId, 0, room)
-    shuffle(deckArgs, accounts[1], verifRounds, deckId, perm1, tableId, 1, room)
-    verifyShuffle(deckArgs, accounts[0], deckId, 0, tableId, room)
-    return verifyShuffle(deckArgs, accounts[1], deckId, 1, tableId, room)
+    shuffle(deckClient, accounts[0], verifRounds, deckId, perm0, tableId, 0, room)
+    shuffle(deckClient, accounts[1], verifRounds, deckId, perm1, tableId, 1, room)
+    verifyShuffle(deckClient, accounts[0], deckId, 0, tableId, room)
+    return verifyShuffle(deckClient, accounts[1], deckId, 1, tableId, room)
 
-def three_players_shuffle(accounts, three_players_prepped, deckArgs, room, perms):
+def three_players_shuffle(accounts, three_players_prepped, deckClient, room, perms):
     tableId = three_players_prepped["tableId"]
     deckId = room.configParams(tableId)[-1]
     config = three_players_prepped["config"]
     verifRounds = config["verifRounds"]
-    shuffle(deckArgs, accounts[0], verifRounds, deckId, perms[0], tableId, 0, room)
-    shuffle(deckArgs, accounts[1], verifRounds, deckId, perms[1], tableId, 1, room)
-    shuffle(deckArgs, accounts[2], verifRounds, deckId, perms[2], tableId, 2, room)
-    verifyShuffle(deckArgs, accounts[0], deckId, 0, tableId, room)
-    verifyShuffle(deckArgs, accounts[1], deckId, 1, tableId, room)
-    return verifyShuffle(deckArgs, accounts[2], deckId, 2, tableId, room)
-
-def readIntLists(f, z):
-    a = []
-    def n():
-        return int(next(f), 16)
-    for _ in range(26):
-        try:
-            a.append([n() for _ in range(z)])
-        except StopIteration:
-            break
-    return a
+    shuffle(deckClient, accounts[0], verifRounds, deckId, perms[0], tableId, 0, room)
+    shuffle(deckClient, accounts[1], verifRounds, deckId, perms[1], tableId, 1, room)
+    shuffle(deckClient, accounts[2], verifRounds, deckId, perms[2], tableId, 2, room)
+    verifyShuffle(deckClient, accounts[0], deckId, 0, tableId, room)
+    verifyShuffle(deckClient, accounts[1], deckId, 1, tableId, room)
+    return verifyShuffle(deckClient, accounts[2], deckId, 2, tableId, room)
 
 two_players_empty_shuffle = (
     #        1   2    3   4   5   6   7   8   9  10  11  12  13  14  15  16
@@ -411,79 +385,110 @@ two_players_empty_shuffle = (
              42, 19, 13, 37]
     )
 
-def decryptCards(deckArgs, deckId, seatIndex, account, tableId, room, indices, drawIndices, end=False):
-    lines = iter(subprocess.run(
-             deckArgs + ["--from", account.address, "decryptCards",
-                         "--indices", ",".join(map(str, indices)),
-                         "--draw-indices", ",".join(map(str, drawIndices)),
-                         "-j", str(deckId), "-s", str(seatIndex)],
-            stdout=subprocess.PIPE, check=True, text=True).stdout.splitlines())
-    lists = readIntLists(lines, 8)
+def decryptCards(deckClient, deckId, seatIndex, account, tableId, room, indices, drawIndices, end=False):
+    lists = deckClient.decryptCards(account.address, tableId, deckId, seatIndex, indices, drawIndices)
     return room.decryptCards(tableId, seatIndex, lists, end, sender=account)
 
-def revealCardsLists(deckArgs, deckId, seatIndex, account, indices):
-    lines = iter(subprocess.run(
-             deckArgs + ["--from", account.address, "revealCards",
-                         "--indices", ",".join(map(str, indices)),
-                         "-j", str(deckId), "-s", str(seatIndex)],
-            stdout=subprocess.PIPE, check=True, text=True).stdout.splitlines())
-    return readIntLists(lines, 7)
+def revealCardsLists(deckClient, deckId, seatIndex, account, tableId, indices):
+    return deckClient.revealCards(account.address, tableId, deckId, seatIndex, indices)
 
-def revealCards(deckArgs, deckId, seatIndex, account, tableId, room, indices, end=False):
-    lists = revealCardsLists(deckArgs, deckId, seatIndex, account, indices)
+def revealCards(deckClient, deckId, seatIndex, account, tableId, room, indices, end=False):
+    lists = revealCardsLists(deckClient, deckId, seatIndex, account, tableId, indices)
     return room.revealCards(tableId, seatIndex, lists, end, sender=account)
 
+def eventRecord(event):
+    # the parts of an event that can be kept with a cached state
+    return dict(event_name=event.event_name, event_arguments=dict(event.event_arguments))
+
 @pytest.fixture(scope="session")
-def two_players_selected_dealer(accounts, room, two_players_prepped, deckArgs):
-    perm0, perm1 = two_players_empty_shuffle
+def two_players_selected_dealer_state(states, accounts, room, two_players_prepped_state, deckClient):
+    def make():
+        prepped = two_players_prepped_state["value"]
+        perm0, perm1 = two_players_empty_shuffle
 
-    two_players_shuffle(accounts, two_players_prepped, deckArgs, room, perm0, perm1)
+        two_players_shuffle(accounts, prepped, deckClient, room, perm0, perm1)
 
-    tableId = two_players_prepped["tableId"]
-    deckId = room.configParams(tableId)[-1]
+        tableId = prepped["tableId"]
+        deckId = room.configParams(tableId)[-1]
 
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0,1], [0,1])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, [0,1], [0,1])
+        decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, [0,1], [0,1])
+        decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, [0,1], [0,1])
 
-    tx3 = revealCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0])
-    tx4 = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, [1], True)
+        tx3 = revealCards(deckClient, deckId, 0, accounts[0], tableId, room, [0])
+        tx4 = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, [1], True)
 
-    return two_players_prepped | {"revealCards0": tx3, "revealCards1": tx4}
+        return prepped | {"revealCards0": eventRecord(tx3.events[0]),
+                          "revealCards1": eventRecord(tx4.events[0])}
+    return states.build("two_players_selected_dealer", two_players_empty_shuffle, make,
+                        two_players_prepped_state)
+
+@pytest.fixture
+def two_players_selected_dealer(states, two_players_selected_dealer_state):
+    yield states.restore(two_players_selected_dealer_state)
+    states.reset()
 
 def test_select_dealer(accounts, two_players_selected_dealer, game):
     tableId = two_players_selected_dealer["tableId"]
     assert game.games(tableId)['dealer'] == 1
-    show_event = two_players_selected_dealer["revealCards0"].events[0]
-    assert show_event.event_name == "Show"
-    assert show_event.event_arguments == {
+    show_event = two_players_selected_dealer["revealCards0"]
+    assert show_event["event_name"] == "Show"
+    assert show_event["event_arguments"] == {
             "table": tableId,
             "player": accounts[0].address,
             "card": 0,
             "show": 1}
-    show_event = two_players_selected_dealer["revealCards1"].events[0]
-    assert show_event.event_name == "Show"
-    assert show_event.event_arguments == {
+    show_event = two_players_selected_dealer["revealCards1"]
+    assert show_event["event_name"] == "Show"
+    assert show_event["event_arguments"] == {
             "table": tableId,
             "player": accounts[1].address,
             "card": 1,
             "show": 2}
 
+def test_table_state(accounts, two_players_selected_dealer, room, game):
+    tableId = two_players_selected_dealer["tableId"]
+    state = TableStateClient(game).read(tableId)
+    assert state.seats == [accounts[0].address, accounts[1].address]
+    assert [state.phase, state.commitBlock] == list(room.phaseCommit(tableId))
+    assert state.deckId == room.configParams(tableId)[-1]
+    assert state.config.structure == list(room.configStructure(tableId))
+    assert state.present == [True, True]
+    assert state.deckIndex == room.deckIndex(tableId)
+    cardInfo = room.cardInfo(tableId)
+    assert [c.drawIndex for c in state.cards] == list(cardInfo[1])
+    assert [c.opened for c in state.cards] == list(cardInfo[3])
+    games = game.games(tableId)
+    assert state.game.dealer == games["dealer"] == 1
+    assert state.game.stack == list(games["stack"][:2])
+
+@pytest.mark.parametrize("run", range(2))
+def test_prepared_table_isolated(accounts, two_players_selected_dealer_state, two_players_selected_dealer,
+                                 deckClient, room, deck, run):
+    # each run starts from the prepared table and its secrets, whatever the one before sent
+    tableId = two_players_selected_dealer["tableId"]
+    deckId = room.configParams(tableId)[-1]
+    assert deck.shuffleCount(deckId) == 0
+    assert deckClient.dump() == two_players_selected_dealer_state["db"]
+    perm0, perm1 = two_players_empty_shuffle
+    two_players_shuffle(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
+    assert deck.shuffleCount(deckId) == 2
+
 def is_permutation(perm):
     return set(perm) == set(range(1, 53))
 
-def two_players_hole_cards(accounts, two_players_selected_dealer, deckArgs, room, perm0, perm1):
-    two_players_shuffle(accounts, two_players_selected_dealer, deckArgs, room, perm0, perm1)
+def two_players_hole_cards(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1):
+    two_players_shuffle(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
 
     tableId = two_players_selected_dealer["tableId"]
     deckId = room.configParams(tableId)[-1]
 
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0,1,2,3], [0,1,0,1])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, [0,1,2,3], [0,1,0,1], True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, [0,1,2,3], [0,1,0,1])
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, [0,1,2,3], [0,1,0,1], True)
 
-def test_fold_blind(accounts, two_players_selected_dealer, deckArgs, room, game):
+def test_fold_blind(accounts, two_players_selected_dealer, deckClient, room, game):
     perm0, perm1 = two_players_empty_shuffle
 
-    two_players_hole_cards(accounts, two_players_selected_dealer, deckArgs, room, perm0, perm1)
+    two_players_hole_cards(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
 
     tableId = two_players_selected_dealer["tableId"]
 
@@ -512,10 +517,10 @@ def test_fold_blind(accounts, two_players_selected_dealer, deckArgs, room, game)
     assert game.games(tableId)["stack"][0] == config["buyIn"] - smallBlind
     assert game.games(tableId)["stack"][1] == config["buyIn"] + smallBlind
 
-def test_dealer_fold_blind(accounts, two_players_selected_dealer, deckArgs, room, game):
+def test_dealer_fold_blind(accounts, two_players_selected_dealer, deckClient, room, game):
     perm0, perm1 = two_players_empty_shuffle
 
-    two_players_hole_cards(accounts, two_players_selected_dealer, deckArgs, room, perm0, perm1)
+    two_players_hole_cards(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
 
     tableId = two_players_selected_dealer["tableId"]
 
@@ -540,7 +545,29 @@ def test_dealer_fold_blind(accounts, two_players_selected_dealer, deckArgs, room
     assert game.games(tableId)["stack"][0] == config["buyIn"] + bigBlind
     assert game.games(tableId)["stack"][1] == config["buyIn"] - bigBlind
 
-def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
+def test_batched_deck_views(accounts, two_players_selected_dealer, deckClient, room, deck):
+    perm0, perm1 = two_players_empty_shuffle
+
+    two_players_hole_cards(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
+
+    tableId = two_players_selected_dealer["tableId"]
+    deckId = room.configParams(tableId)[-1]
+    assert ([point(p) for p in deck.lastDecrypts(deckId, [3, 0])] ==
+            [point(deck.lastDecrypt(deckId, i)) for i in [3, 0]])
+    assert ([point(p) for p in deck.shuffleBases(deckId, [0, 1, 2])] ==
+            [point(deck.shuffleBase(deckId, i)) for i in range(3)])
+    cache = {}
+    for seatIndex in range(2):
+        holeCards = [seatIndex, seatIndex + 2]
+        looked, _ = lookAtCards(deckClient.db, deck, accounts[seatIndex].address, tableId, deckId,
+                                holeCards, cache)
+        assert [c["openIndex"] for c in looked] == [perm0[perm1[i] - 1] for i in holeCards]
+        assert (deckClient.lookAtCards(accounts[seatIndex].address, tableId, deckId, holeCards) ==
+                [c["openIndex"] for c in looked])
+    # the base cards were read once for both seats
+    assert list(cache) == [(deckId, point(deck.shuffleBase(deckId, 0)))]
+
+def test_split_pot(accounts, two_players_selected_dealer, deckClient, room, game):
     # card indices of the deal:
     # 0 1 2 3 4 5 6 7 8 9 a b
     # 0 1 0 1 b f f f b t b r
@@ -562,7 +589,7 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
     assert is_permutation(perm0)
     assert is_permutation(perm1)
 
-    two_players_hole_cards(accounts, two_players_selected_dealer, deckArgs, room, perm0, perm1)
+    two_players_hole_cards(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
 
     tableId = two_players_selected_dealer["tableId"]
     deckId = room.configParams(tableId)[-1]
@@ -570,9 +597,9 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
     game.callBet(tableId, 0, sender=accounts[0])
     game.callBet(tableId, 1, sender=accounts[1])
 
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, [5,6,7], [1,1,1])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, [5,6,7], [1,1,1])
-    tx = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, [5,6,7], True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, [5,6,7], [1,1,1])
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, [5,6,7], [1,1,1])
+    tx = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, [5,6,7], True)
     show_event = tx.events[0]
     assert show_event.event_name == "Show"
     assert show_event.event_arguments == {
@@ -592,9 +619,9 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
     game.callBet(tableId, 0, sender=accounts[0])
     game.callBet(tableId, 1, sender=accounts[1])
 
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, [9], [1])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, [9], [1])
-    tx = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, [9], True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, [9], [1])
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, [9], [1])
+    tx = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, [9], True)
     show_event = tx.events[0]
     assert show_event.event_name == "Show"
     assert show_event.event_arguments == {
@@ -604,9 +631,9 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
     game.callBet(tableId, 0, sender=accounts[0])
     game.callBet(tableId, 1, sender=accounts[1])
 
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, [11], [1])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, [11], [1])
-    tx = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, [11], True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, [11], [1])
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, [11], [1])
+    tx = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, [11], True)
     show_event = tx.events[0]
     assert show_event.event_name == "Show"
     assert show_event.event_arguments == {
@@ -616,7 +643,7 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
     game.callBet(tableId, 0, sender=accounts[0])
     game.callBet(tableId, 1, sender=accounts[1])
 
-    lists = revealCardsLists(deckArgs, deckId, 0, accounts[0], [0,2])
+    lists = revealCardsLists(deckClient, deckId, 0, accounts[0], tableId, [0,2])
 
     with reverts("wrong turn"):
         game.showCards(tableId, 1, lists, sender=accounts[1])
@@ -636,9 +663,9 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
             "table": tableId, "player": accounts[0].address,
             "card": 2, "show": 3}
 
-    rank = (9 << (5 * 8)) + (12 << (4 * 8))
+    rank = handRank([48, 49, 50, 51, 52, 1, 3])
 
-    lists = revealCardsLists(deckArgs, deckId, 1, accounts[1], [1,3])
+    lists = revealCardsLists(deckClient, deckId, 1, accounts[1], tableId, [1,3])
     tx = game.showCards(tableId, 1, lists, sender=accounts[1])
     show_event = tx.events[0]
     assert show_event.event_name == "Show"
@@ -677,10 +704,10 @@ def test_split_pot(accounts, two_players_selected_dealer, deckArgs, room, game):
 
     assert room.phaseCommit(tableId)[0] == Phase_SHUF, "onto shuffle for next hand"
 
-def test_raise_all_in_blind_call(accounts, two_players_selected_dealer, deckArgs, room, game):
+def test_raise_all_in_blind_call(accounts, two_players_selected_dealer, deckClient, room, game):
     perm0, perm1 = two_players_empty_shuffle
 
-    two_players_hole_cards(accounts, two_players_selected_dealer, deckArgs, room, perm0, perm1)
+    two_players_hole_cards(accounts, two_players_selected_dealer, deckClient, room, perm0, perm1)
 
     tableId = two_players_selected_dealer["tableId"]
     config = two_players_selected_dealer["config"]
@@ -735,10 +762,10 @@ def test_raise_all_in_blind_call(accounts, two_players_selected_dealer, deckArgs
     deckId = room.configParams(tableId)[-1]
 
     cards = [5,6,7,9,11]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, [1,1,1,1,1])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, [1,1,1,1,1])
-    revealCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0,2])
-    tx = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards + [1,3], True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, [1,1,1,1,1])
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, [1,1,1,1,1])
+    revealCards(deckClient, deckId, 0, accounts[0], tableId, room, [0,2])
+    tx = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, cards + [1,3], True)
     assert len(tx.events) == 12
     for event, i in zip(tx.events, cards + [1,3]):
         assert event.event_name == "Show"
@@ -752,7 +779,8 @@ def test_raise_all_in_blind_call(accounts, two_players_selected_dealer, deckArgs
     assert round_event.event_arguments == {"table": tableId, "street": 5}
 
     # shown 2 4 6 7 8 10 12 = flush with ranks 3 5 7 8 9 J K
-    rank = (6 << (5 * 8)) + (11 << (4 * 8)) + (9 << (3 * 8)) + (7 << (2 * 8)) + (6 << (1 * 8)) + 5
+    rank = handRank([2, 4, 6, 7, 8, 10, 12])
+    assert rank == encode(FLUSH, 11, 9, 7, 6, 5)
     event = tx.events[8]
     assert event.event_name == "ShowHand"
     assert event.event_arguments == { "table": tableId, "seat": 0, "rank": rank}
@@ -771,13 +799,22 @@ def test_raise_all_in_blind_call(accounts, two_players_selected_dealer, deckArgs
     assert event.event_arguments == {"table": tableId, "seat": 1, "pot": buyIn}
 
 @pytest.fixture(scope="session")
-def three_players_arbitrary_shuffled(
-        accounts, three_players_prepped, deckArgs, room):
+def three_players_arbitrary_shuffled_state(
+        states, accounts, three_players_prepped_state, deckClient, room):
     perm0, perm1 = two_players_empty_shuffle
-    three_players_shuffle(accounts, three_players_prepped, deckArgs, room, [perm0, perm1, perm0])
-    return three_players_prepped
-
-def test_three_players_deal_timeout(accounts, chain, three_players_arbitrary_shuffled, deckArgs, room):
+    prepped = three_players_prepped_state["value"]
+    def make():
+        three_players_shuffle(accounts, prepped, deckClient, room, [perm0, perm1, perm0])
+        return prepped
+    return states.build("three_players_arbitrary_shuffled", [perm0, perm1, perm0], make,
+                        three_players_prepped_state)
+
+@pytest.fixture
+def three_players_arbitrary_shuffled(states, three_players_arbitrary_shuffled_state):
+    yield states.restore(three_players_arbitrary_shuffled_state)
+    states.reset()
+
+def test_three_players_deal_timeout(accounts, chain, three_players_arbitrary_shuffled, deckClient, room):
     tableId = three_players_arbitrary_shuffled["tableId"]
     with reverts("deadline not passed"):
         room.decryptTimeout(tableId, 0, 0, sender=accounts[1])
@@ -799,21 +836,31 @@ def test_three_players_deal_timeout(accounts, chain, three_players_arbitrary_shu
     assert tx.events[4].event_arguments == {"table": tableId}
 
 @pytest.fixture(scope="session")
-def three_players_selected_dealer(accounts, room, three_players_arbitrary_shuffled, deckArgs):
-    tableId = three_players_arbitrary_shuffled["tableId"]
-    deckId = room.configParams(tableId)[-1]
-
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0,1,2], [0,1,2])
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, [0,1,2], [0,1,2])
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, [0,1,2], [0,1,2])
-
-    revealCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0])
-    revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, [1])
-    revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, [2], True)
-
-    return three_players_arbitrary_shuffled
-
-def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dealer):
+def three_players_selected_dealer_state(
+        states, accounts, room, three_players_arbitrary_shuffled_state, deckClient):
+    shuffled = three_players_arbitrary_shuffled_state["value"]
+    def make():
+        tableId = shuffled["tableId"]
+        deckId = room.configParams(tableId)[-1]
+
+        decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, [0,1,2], [0,1,2])
+        decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, [0,1,2], [0,1,2])
+        decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, [0,1,2], [0,1,2])
+
+        revealCards(deckClient, deckId, 0, accounts[0], tableId, room, [0])
+        revealCards(deckClient, deckId, 1, accounts[1], tableId, room, [1])
+        revealCards(deckClient, deckId, 2, accounts[2], tableId, room, [2], True)
+
+        return shuffled
+    return states.build("three_players_selected_dealer", None, make,
+                        three_players_arbitrary_shuffled_state)
+
+@pytest.fixture
+def three_players_selected_dealer(states, three_players_selected_dealer_state):
+    yield states.restore(three_players_selected_dealer_state)
+    states.reset()
+
+def test_uneven_split(accounts, room, game, deckClient, three_players_selected_dealer):
     config = three_players_selected_dealer["config"]
     tableId = three_players_selected_dealer["tableId"]
     deckId = room.configParams(tableId)[-1]
@@ -825,13 +872,13 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
     perm[13] = 13
     perm[12] = 14
 
-    three_players_shuffle(accounts, three_players_selected_dealer, deckArgs, room,
+    three_players_shuffle(accounts, three_players_selected_dealer, deckClient, room,
                           two_players_empty_shuffle + (perm,))
     holeCards = [0,1,2,3,4,5]
     drawnTo   = [2,0,1,2,0,1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, holeCards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, holeCards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, holeCards, drawnTo, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, holeCards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, holeCards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, holeCards, drawnTo, True)
 
     with reverts("wrong turn"):
         game.raiseBet(tableId, 0, 1, sender=accounts[0])
@@ -868,10 +915,10 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
 
     flop = [7,8,9]
     drawnTo = [1,1,1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, flop, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, flop, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, flop, drawnTo)
-    revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, flop, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, flop, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, flop, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, flop, drawnTo)
+    revealCards(deckClient, deckId, 1, accounts[1], tableId, room, flop, True)
 
     game.callBet(tableId, 2, sender=accounts[2])
     game.callBet(tableId, 0, sender=accounts[0])
@@ -882,10 +929,10 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
 
     turn = [11]
     drawnTo = [1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, turn, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, turn, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, turn, drawnTo)
-    revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, turn, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, turn, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, turn, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, turn, drawnTo)
+    revealCards(deckClient, deckId, 1, accounts[1], tableId, room, turn, True)
 
     game.callBet(tableId, 2, sender=accounts[2])
     tx = game.callBet(tableId, 0, sender=accounts[0])
@@ -897,10 +944,10 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
 
     river = [13]
     drawnTo = [1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, river, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, river, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, river, drawnTo)
-    tx = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, river, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, river, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, river, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, river, drawnTo)
+    tx = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, river, True)
     assert len(tx.events) == 1
     show_event = tx.events[0]
     assert show_event.event_name == "Show"
@@ -914,7 +961,7 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
     assert tx.events[1].event_name == "DealRound"
     assert tx.events[1].event_arguments == {"table": tableId, "street": 5}
 
-    lists = revealCardsLists(deckArgs, deckId, 2, accounts[2], [0,3])
+    lists = revealCardsLists(deckClient, deckId, 2, accounts[2], tableId, [0,3])
     tx = game.showCards(tableId, 2, lists, sender=accounts[2])
     assert len(tx.events) == 2
     show_event = tx.events[0]
@@ -928,7 +975,7 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
             "table": tableId, "player": accounts[2].address,
             "card": 3, "show": 4}
 
-    lists = revealCardsLists(deckArgs, deckId, 0, accounts[0], [1,4])
+    lists = revealCardsLists(deckClient, deckId, 0, accounts[0], tableId, [1,4])
     tx = game.showCards(tableId, 0, lists, sender=accounts[0])
     assert len(tx.events) == 6
 
@@ -957,7 +1004,7 @@ def test_uneven_split(accounts, room, game, deckArgs, three_players_selected_dea
     assert collect_event.event_arguments == {
             "table": tableId, "seat": 2, "pot": bigBlind * 3 + 1}
 
-def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game):
+def test_side_pot(accounts, three_players_selected_dealer, deckClient, room, game):
     # one player all-in, the other two keep betting
     # (first need one hand to establish a short stack)
     config = three_players_selected_dealer["config"]
@@ -968,13 +1015,13 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
 
     perm = list(range(1, 53))
 
-    three_players_shuffle(accounts, three_players_selected_dealer, deckArgs, room,
+    three_players_shuffle(accounts, three_players_selected_dealer, deckClient, room,
                           two_players_empty_shuffle + (perm,))
     cards   = [0,1,2,3,4,5]
     drawnTo = [2,0,1,2,0,1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
 
     game.raiseBet(tableId, 1, bigBlind * 3, sender=accounts[1])
     game.callBet(tableId, 2, sender=accounts[2])
@@ -982,10 +1029,10 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
 
     cards   = [7,8,9]
     drawnTo = [1,1,1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
-    revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    revealCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, True)
 
     game.callBet(tableId, 2, sender=accounts[2])
     game.raiseBet(tableId, 1, bigBlind * 3, sender=accounts[1])
@@ -993,10 +1040,10 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
 
     cards   = [11]
     drawnTo = [1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
-    revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    revealCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, True)
 
     tx = game.fold(tableId, 2, sender=accounts[2])
 
@@ -1009,13 +1056,13 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
     # 1 is up 7BB, 2 is down 6BB, 0 is down 1BB
 
     # now 2 is dealer
-    three_players_shuffle(accounts, three_players_selected_dealer, deckArgs, room,
+    three_players_shuffle(accounts, three_players_selected_dealer, deckClient, room,
                           (perm,) + two_players_empty_shuffle)
     cards   = [0,1,2,3,4,5]
     drawnTo = [0,1,2,0,1,2]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
 
     buyIn = config["buyIn"]
     game.raiseBet(tableId, 2, buyIn - 6 * bigBlind, sender=accounts[2])
@@ -1024,10 +1071,10 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
 
     cards   = [7,8,9]
     drawnTo = [2,2,2]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
-    revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    revealCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, True)
 
     game.callBet(tableId, 0, sender=accounts[0])
     tx = game.raiseBet(tableId, 1, bigBlind, sender=accounts[1])
@@ -1043,10 +1090,10 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
 
     cards   = [11]
     drawnTo = [2]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
-    revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    revealCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, True)
 
     game.callBet(tableId, 0, sender=accounts[0])
     tx = game.raiseBet(tableId, 1, bigBlind, sender=accounts[1])
@@ -1071,12 +1118,12 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
 
     cards   = [13]
     drawnTo = [2]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
     with reverts("reveal not allowed"):
-        revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, [2,5])
-    tx = revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, True)
+        revealCards(deckClient, deckId, 2, accounts[2], tableId, room, [2,5])
+    tx = revealCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, True)
 
     assert len(tx.events) == 2
     assert tx.events[0].event_name == "Show"
@@ -1086,12 +1133,12 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
         game.raiseBet(tableId, 1, 2 * bigBlind, sender=accounts[1])
 
     with reverts("wrong phase"):
-        revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, [2,5], True)
+        revealCards(deckClient, deckId, 2, accounts[2], tableId, room, [2,5], True)
 
-    lists = revealCardsLists(deckArgs, deckId, 1, accounts[1], [1,4])
+    lists = revealCardsLists(deckClient, deckId, 1, accounts[1], tableId, [1,4])
     game.showCards(tableId, 1, lists, sender=accounts[1])
 
-    tx = revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, [2,5], True)
+    tx = revealCards(deckClient, deckId, 2, accounts[2], tableId, room, [2,5], True)
 
     assert len(tx.events) == 5
     assert tx.events[0].event_name == "Show"
@@ -1100,7 +1147,7 @@ def test_side_pot(accounts, three_players_selected_dealer, deckArgs, room, game)
     assert tx.events[3].event_name == "ShowHand"
     assert tx.events[4].event_name == "CollectPot"
 
-def test_all_in_blinds_eliminate(accounts, deckArgs, room, game):
+def test_all_in_blinds_eliminate(accounts, deckClient, room, game):
     config = dict(
             buyIn=10,
             bond=3000,
@@ -1114,40 +1161,28 @@ def test_all_in_blinds_eliminate(accounts, deckArgs, room, game):
             verifBlocks=35,
             dealBlocks=15,
             actBlocks=10)
-    value = f"{config['bond'] + config['buyIn']} wei"
-    tx = room.createTable(0, config, sender=accounts[0], value=value)
-    tableId = tx.return_value
-    tx = room.joinTable(tableId, 2, sender=accounts[2], value=value)
-    tx = room.joinTable(tableId, 1, sender=accounts[1], value=value)
-
-    submitPrep(deckArgs, accounts[0], room, tableId, 0)
-    submitPrep(deckArgs, accounts[1], room, tableId, 1)
-    submitPrep(deckArgs, accounts[2], room, tableId, 2)
-    verifyPrep(deckArgs, accounts[2], room, tableId, 2)
-    verifyPrep(deckArgs, accounts[1], room, tableId, 1)
-    verifyPrep(deckArgs, accounts[0], room, tableId, 0)
-
-    prepped = dict(tableId=tableId, config=config)
-    three_players_shuffle(accounts, prepped, deckArgs, room,
+    prepped = prepTable(accounts, room, deckClient, config, [2, 1], [2, 1, 0])
+    tableId = prepped["tableId"]
+    three_players_shuffle(accounts, prepped, deckClient, room,
                           two_players_empty_shuffle + (two_players_empty_shuffle[0],))
 
     deckId = room.configParams(tableId)[-1]
 
     cards = [0,1,2]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, cards)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, cards)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, cards)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, cards)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, cards)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, cards)
 
-    revealCards(deckArgs, deckId, 0, accounts[0], tableId, room, [0])
-    revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, [1])
-    tx = revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, [2], True)
+    revealCards(deckClient, deckId, 0, accounts[0], tableId, room, [0])
+    revealCards(deckClient, deckId, 1, accounts[1], tableId, room, [1])
+    tx = revealCards(deckClient, deckId, 2, accounts[2], tableId, room, [2], True)
     assert len(tx.events) == 2
     assert tx.events[-1].event_name == "SelectDealer"
     dealer = tx.events[-1].event_arguments["seat"]
     small = (dealer + 1) % 3
     big = (small + 1) % 3
 
-    tx = three_players_shuffle(accounts, prepped, deckArgs, room,
+    tx = three_players_shuffle(accounts, prepped, deckClient, room,
                                two_players_empty_shuffle + (two_players_empty_shuffle[1],))
     assert len(tx.events) == 2
     assert tx.events[-2].event_name == "Shuffle"
@@ -1155,9 +1190,9 @@ def test_all_in_blinds_eliminate(accounts, deckArgs, room, game):
 
     cards   = list(range(6))
     drawnTo = [small, big, dealer] * 2
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    tx = decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    tx = decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
 
     # blinds are both all-in
     with reverts("wrong turn"):
@@ -1173,13 +1208,13 @@ def test_all_in_blinds_eliminate(accounts, deckArgs, room, game):
     assert tx.events[3].event_name == 'DealRound'
     cards = [7,8,9,11,13]
     drawnTo = [dealer] * 5
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
-    revealCards(deckArgs, deckId, dealer, accounts[dealer], tableId, room, cards)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    revealCards(deckClient, deckId, dealer, accounts[dealer], tableId, room, cards)
     # and show cards
-    revealCards(deckArgs, deckId, small, accounts[small], tableId, room, [0,3])
-    tx = revealCards(deckArgs, deckId, big, accounts[big], tableId, room, [1,4], True)
+    revealCards(deckClient, deckId, small, accounts[small], tableId, room, [0,3])
+    tx = revealCards(deckClient, deckId, big, accounts[big], tableId, room, [1,4], True)
 
     assert len(tx.events) == 11
     assert tx.events[0].event_name == 'Show'
@@ -1194,7 +1229,7 @@ def test_all_in_blinds_eliminate(accounts, deckArgs, room, game):
     assert tx.events[9].event_name == 'LeaveTable'
     assert tx.events[10].event_name == 'EndGame'
 
-def test_no_shuffle_after_eliminated(accounts, three_players_selected_dealer, deckArgs, room, game):
+def test_no_shuffle_after_eliminated(accounts, three_players_selected_dealer, deckClient, room, game):
     config = three_players_selected_dealer["config"]
     tableId = three_players_selected_dealer["tableId"]
     deckId = room.configParams(tableId)[-1]
@@ -1204,13 +1239,13 @@ def test_no_shuffle_after_eliminated(accounts, three_players_selected_dealer, de
 
     perm = list(range(1, 53))
 
-    three_players_shuffle(accounts, three_players_selected_dealer, deckArgs, room,
+    three_players_shuffle(accounts, three_players_selected_dealer, deckClient, room,
                           two_players_empty_shuffle + (perm,))
     cards   = [0,1,2,3,4,5]
     drawnTo = [2,0,1,2,0,1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo, True)
 
     game.raiseBet(tableId, 1, buyIn, sender=accounts[1])
     game.callBet(tableId, 2, sender=accounts[2])
@@ -1218,11 +1253,11 @@ def test_no_shuffle_after_eliminated(accounts, three_players_selected_dealer, de
 
     cards   = [7,8,9,11,13]
     drawnTo = [1,1,1,1,1]
-    decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
-    decryptCards(deckArgs, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
-    revealCards(deckArgs, deckId, 2, accounts[2], tableId, room, [0,3])
-    tx = revealCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards + [2,5], True)
+    decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo)
+    decryptCards(deckClient, deckId, 2, accounts[2], tableId, room, cards, drawnTo)
+    revealCards(deckClient, deckId, 2, accounts[2], tableId, room, [0,3])
+    tx = revealCards(deckClient, deckId, 1, accounts[1], tableId, room, cards + [2,5], True)
 
     assert len(tx.events) == 12
     assert tx.events[0].event_name == 'Show'
@@ -1241,7 +1276,7 @@ def test_no_shuffle_after_eliminated(accounts, three_players_selected_dealer, de
 
     assert game.games(tableId)['dealer'] == 0
 
-    tx = two_players_shuffle(accounts, three_players_selected_dealer, deckArgs, room,
+    tx = two_players_shuffle(accounts, three_players_selected_dealer, deckClient, room,
                              *two_players_empty_shuffle)
     assert len(tx.events) == 2
     assert tx.events[0].event_name == "Shuffle"
@@ -1250,10 +1285,10 @@ def test_no_shuffle_after_eliminated(accounts, three_players_selected_dealer, de
 
     cards   = [0,1,2,3]
     drawnTo = [1,0,1,0]
-    tx = decryptCards(deckArgs, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
+    tx = decryptCards(deckClient, deckId, 0, accounts[0], tableId, room, cards, drawnTo)
     assert len(tx.events) == 4
     assert all(e.event_name == "Deal" for e in tx.events)
-    tx = decryptCards(deckArgs, deckId, 1, accounts[1], tableId, room, cards, drawnTo, True)
+    tx = decryptCards(deckClient, deckId, 1, accounts[1], tableId, room, cards, drawnTo, True)
     assert len(tx.events) == 6
     assert all(e.event_name == "Deal" for e in tx.events[:4])
     assert all(e.event_name == "PostBlind" for e in tx.events[4:])
@@ -0,0 +1,24 @@
+from hodlem.indexer import Indexer
+
+def test_index_table_history_across_reorg(networks, chain, accounts, room, game, tmp_path):
+    config = (100, 200, 2, 1, [1, 2, 3], 2, 2, 2, 2, 2, 2, 2)
+    tableId = room.createTable(0, config, sender=accounts[0], value="300 wei").return_value
+    indexer = Indexer(networks.active_provider.web3.provider.endpoint_uri,
+                      room.address, game.address, str(tmp_path / "events.sqlite"), batchSize=3)
+    assert indexer.sync() >= 1
+    assert [e["name"] for e in indexer.tableHistory(tableId)] == ["JoinTable"]
+
+    snapshot = chain.snapshot()
+    room.leaveTable(tableId, 0, sender=accounts[0])
+    indexer.sync()
+    assert [e["name"] for e in indexer.tableHistory(tableId)] == ["JoinTable", "LeaveTable"]
+
+    # replace the leave with a join in a block at the same height
+    chain.restore(snapshot)
+    room.joinTable(tableId, 1, sender=accounts[1], value="300 wei")
+    indexer.sync()
+    history = indexer.tableHistory(tableId)
+    assert [e["name"] for e in history] == ["JoinTable", "JoinTable", "StartGame"]
+    assert history[1]["args"] == dict(table=tableId, player=accounts[1].address, seat=1)
+    assert indexer.checkpoint() == chain.blocks.head.number
+    indexer.close()
@@ -0,0 +1,57 @@
+from ape import reverts
+import pytest
+
+config = dict(
+        buyIn=100,
+        bond=200,
+        startsWith=3,
+        untilLeft=1,
+        structure=[1, 2, 3],
+        levelBlocks=2,
+        verifRounds=1,
+        prepBlocks=2,
+        shuffBlocks=2,
+        verifBlocks=2,
+        dealBlocks=2,
+        actBlocks=2)
+
+def pages(method, *args, count):
+    tables, cursor = [], 0
+    while True:
+        page = method(*args, cursor, count)
+        tables.extend(page["tables"])
+        cursor = page["cursor"]
+        if cursor == 0:
+            return tables
+
+@pytest.mark.parametrize("count", [1, 2, 64])
+def test_waiting_tables_paged(accounts, room, game, lobby, count):
+    before = [t["tableId"] for t in pages(lobby.waitingTables, count=64)]
+    tableIds = [room.createTable(0, config, sender=accounts[0], value="300 wei").return_value
+                for _ in range(3)]
+    room.joinTable(tableIds[1], 2, sender=accounts[1], value="300 wei")
+    tables = pages(lobby.waitingTables, count=count)
+    # newest first
+    assert [t["tableId"] for t in tables] == tableIds[::-1] + before
+    assert list(tables[1]["params"])[:4] == [100, 200, 3, 1]
+    assert list(tables[1]["structure"]) == [1, 2, 3]
+    assert list(tables[1]["seats"])[:3] == [accounts[0].address, "0x" + "0" * 40, accounts[1].address]
+
+def test_live_tables_paged(accounts, room, game, lobby):
+    before = [t["tableId"] for t in pages(lobby.liveTables, accounts[2].address, count=64)]
+    tableIds = []
+    for _ in range(3):
+        tableId = room.createTable(0, config, sender=accounts[0], value="300 wei").return_value
+        room.joinTable(tableId, 1, sender=accounts[1], value="300 wei")
+        room.joinTable(tableId, 2, sender=accounts[2], value="300 wei")
+        tableIds.append(tableId)
+    tables = pages(lobby.liveTables, accounts[2].address, count=2)
+    assert [t["tableId"] for t in tables] == tableIds[::-1] + before
+    assert lobby.liveTables(accounts[3].address, 0, 2)["tables"] == []
+
+def test_empty_page_rejected(accounts, room, game, lobby):
+    room.createTable(0, config, sender=accounts[0], value="300 wei")
+    with reverts("invalid count"):
+        lobby.waitingTables(0, 0)
+    with reverts("invalid count"):
+        lobby.liveTables(accounts[0].address, 0, 0)
@@ -0,0 +1,226 @@
+# model-based test of pot settlement: a tournament of bots that often go all in is played
+# with hodlem.sim, and the chips each hand pays out (its CollectPot events) are compared with
+# a reference side-pot calculator over what each seat put in, the hands shown and their cards
+
+from collections import defaultdict
+from hodlem.deck import DeckClient
+from hodlem.sim import Table, Phase_SHUF, Phase_DEAL, Phase_PLAY, Phase_SHOW
+import asyncio
+import functools
+import random
+
+def referencePots(contributions, live):
+    # (amount, eligible seats) of each pot, lowest first: one for each amount put in by
+    # a seat still in the hand, with what every seat put in up to that amount
+    # (the top pot also takes what folded seats put in above it)
+    pots = []
+    below = 0
+    levels = sorted({contributions[seat] for seat in live})
+    for level in levels:
+        top = max(contributions.values()) if level == levels[-1] else level
+        amount = sum(min(put, top) - min(put, below) for put in contributions.values())
+        pots.append((amount, sorted(seat for seat in live if contributions[seat] >= level)))
+        below = level
+    return pots
+
+def cardKey(card):
+    # rank, then suit
+    return (card - 1) % 13 * 4 + (card - 1) // 13
+
+def referenceWinnings(contributions, live, ranks, keys):
+    # each pot is split among its best hands, the odd chips one each to the winners
+    # holding the highest cards (keys)
+    won = defaultdict(int)
+    for amount, eligible in referencePots(contributions, live):
+        if len(eligible) == 1:
+            winners = eligible
+        else:
+            best = max(ranks[seat] for seat in eligible)
+            winners = [seat for seat in eligible if ranks[seat] == best]
+        share, odd = divmod(amount, len(winners))
+        for seat in winners:
+            won[seat] += share
+        if odd:
+            for seat in sorted(winners, key=lambda seat: -keys[seat])[:odd]:
+                won[seat] += 1
+    return {seat: amount for seat, amount in won.items() if amount}
+
+def test_reference_side_pots():
+    # seats 0 and 1 are all in for 50 and 120, seat 2 covers them, seat 3 folds after 51
+    contributions = {0: 50, 1: 120, 2: 200, 3: 51}
+    assert referencePots(contributions, [0, 1, 2]) == [(200, [0, 1, 2]), (141, [1, 2]), (80, [2])]
+    ranks = {0: 3, 1: 2, 2: 2}
+    keys = {0: 0, 1: cardKey(13), 2: cardKey(52)} # aces, of the lowest and the highest suit
+    assert referenceWinnings(contributions, [0, 1, 2], ranks, keys) == {0: 200, 1: 70, 2: 151}
+    assert referenceWinnings(contributions, [2], ranks, keys) == {2: 421}
+    # seats 1 and 2 fold at the showdown: seat 0 takes their side pot too
+    assert referencePots(contributions, [0]) == [(421, [0])]
+
+def shovePolicy(rng, view):
+    # calls or raises, folding now and then, and goes all in once short: the stacks have
+    # drifted apart by then, so the all ins make side pots
+    r = rng.random()
+    if view["toCall"] and r < 0.2:
+        return ("fold",)
+    if view["stack"] < 200:
+        return ("raise", view["bet"] + view["stack"]) # capped at all in
+    if r < 0.8:
+        return ("call",)
+    return ("raise", view["minRaiseTo"])
+
+class CheckedTable(Table):
+    # checks each hand's payout against referenceWinnings when the hand ends
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.checked = 0
+        self.sidePots = 0 # hands with more than one pot contested
+        self.newHand(None)
+
+    def newHand(self, game):
+        self.holeCards = game and game["hands"]
+        self.put = defaultdict(int)
+        self.folded = set()
+        self.cards = {}
+        self.ranks = {}
+        self.collected = defaultdict(int)
+
+    async def send(self, name, f, *args, **kwargs):
+        receipt = await super().send(name, f, *args, **kwargs)
+        paid = False
+        for event in receipt.events:
+            data = event.event_arguments
+            if event.event_name == "DealRound" and data["street"] == 1:
+                self.newHand(await self.call(self.game.games, self.tableId))
+            elif event.event_name in ("PostBlind", "CallBet", "RaiseBet"):
+                self.put[data["seat"]] += data["placed"]
+            elif event.event_name == "Fold":
+                self.folded.add(data["seat"])
+            elif event.event_name == "Show":
+                self.cards[data["card"]] = data["show"] - 1
+            elif event.event_name == "ShowHand":
+                self.ranks[data["seat"]] = data["rank"]
+            elif event.event_name == "CollectPot":
+                self.collected[data["seat"]] += data["pot"]
+                paid = True
+        if paid:
+            phase = (await self.call(self.room.phaseCommit, self.tableId))[0]
+            if phase not in (Phase_DEAL, Phase_PLAY, Phase_SHOW):
+                self.check()
+            if phase == Phase_SHUF:
+                # the next hand starts with every pot paid out and no chip lost
+                game = await self.call(self.game.games, self.tableId)
+                assert not any(game["pot"]), f"hand {self.stats.hands}: pots {game['pot']}"
+                assert sum(game["stack"]) == self.numSeats * self.config["buyIn"]
+        return receipt
+
+    def check(self):
+        live = [seat for seat in self.put if seat not in self.folded]
+        keys = {seat: max(cardKey(self.cards[i]) for i in self.holeCards[seat]) for seat in self.ranks}
+        expected = referenceWinnings(self.put, live, self.ranks, keys)
+        collected = {seat: amount for seat, amount in self.collected.items() if amount}
+        assert collected == expected, f"hand {self.stats.hands}: put {dict(self.put)}, live {live}"
+        self.checked += 1
+        self.sidePots += sum(len(eligible) > 1 for _, eligible in referencePots(self.put, live)) > 1
+
+def test_pots_match_reference(accounts, deck, room, game, tmp_path):
+    # tournaments are played out until one has had a hand with side pots
+    config = dict(
+            buyIn=300,
+            bond=1000,
+            startsWith=4,
+            untilLeft=1,
+            structure=[5, 10, 15, 25, 40],
+            levelBlocks=50,
+            verifRounds=1,
+            prepBlocks=1000,
+            shuffBlocks=1000,
+            verifBlocks=1000,
+            dealBlocks=1000,
+            actBlocks=1000)
+    players = accounts[0:4]
+    sidePots = 0
+    for seed in range(8):
+        clients = [DeckClient(deck, str(tmp_path / f"{seed}-{p.address}.log"), seed=seed)
+                   for p in players]
+        table = CheckedTable(room, game, deck, config, players, clients, [shovePolicy] * 4,
+                             random.Random(seed), 0)
+        stats = asyncio.run(table.run())
+        assert stats.error is None, stats.error
+        assert stats.finished
+        assert table.checked == stats.hands
+        sidePots += table.sidePots
+        if sidePots:
+            break
+    assert sidePots
+
+class ShowdownFoldTable(CheckedTable):
+    # the first hand spreads the stacks; in the second the shortest stack goes all in, the
+    # others call it and bet on between themselves, then both fold at the showdown
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.policies = [functools.partial(self.policy, seatIndex) for seatIndex in range(self.numSeats)]
+        self.foldedSidePots = 0 # hands whose side pot all its contestants folded
+
+    def newHand(self, game):
+        super().newHand(game)
+        self.short = None
+        if game:
+            stacks = [game["stack"][seat] + game["bet"][seat] for seat in range(self.numSeats)]
+            if stacks.count(min(stacks)) == 1:
+                self.short = stacks.index(min(stacks))
+
+    def policy(self, seatIndex, rng, view):
+        if self.short is None:
+            # seat 0 checks or folds, the others bet 50 into every street and call
+            if view["toCall"]:
+                return ("fold",) if seatIndex == 0 else ("call",)
+            return ("call",) if seatIndex == 0 else ("raise", view["bet"] + 50)
+        if seatIndex == self.short:
+            return ("raise", view["bet"] + view["stack"]) # capped at all in
+        if view["toCall"] or view["stack"] <= 2 * (view["minRaiseTo"] - view["bet"]):
+            return ("call",)
+        return ("raise", view["minRaiseTo"])
+
+    async def show(self):
+        data = await self.call(self.game.games, self.tableId)
+        seatIndex = data["actionIndex"]
+        if self.short is None or seatIndex == self.short:
+            return await super().show()
+        await self.send("foldCards", self.game.foldCards, self.tableId, seatIndex,
+                        sender=self.players[seatIndex])
+
+    def check(self):
+        super().check()
+        live = [seat for seat in self.put if seat not in self.folded]
+        if self.ranks and live == [self.short] and max(self.put.values()) > self.put[self.short]:
+            self.foldedSidePots += 1
+
+def test_folds_at_showdown_leave_side_pot(accounts, deck, room, game, tmp_path):
+    # both players covering an all in fold at the showdown: the all in player takes every pot
+    config = dict(
+            buyIn=1000,
+            bond=1000,
+            startsWith=3,
+            untilLeft=2,
+            structure=[5, 10, 15, 25, 40],
+            levelBlocks=50,
+            verifRounds=1,
+            prepBlocks=1000,
+            shuffBlocks=1000,
+            verifBlocks=1000,
+            dealBlocks=1000,
+            actBlocks=1000)
+    players = accounts[0:3]
+    for seed in range(8):
+        clients = [DeckClient(deck, str(tmp_path / f"fold-{seed}-{p.address}.log"), seed=seed)
+                   for p in players]
+        table = ShowdownFoldTable(room, game, deck, config, players, clients, [None] * 3,
+                                  random.Random(seed), 2)
+        stats = asyncio.run(table.run())
+        assert stats.error is None, stats.error
+        assert table.checked == stats.hands == 2
+        if table.foldedSidePots:
+            break
+    assert table.foldedSidePots
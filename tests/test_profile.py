@@ -0,0 +1,25 @@
+from hodlem.profile import OVERHEAD, contractProfiler, functionTable, stepCosts
+
+def test_step_costs_charge_calls_less_callee():
+    # a call (forwarding 700) whose callee runs two steps, then returns 400
+    steps = [dict(depth=1, gas=1000, gasCost=3),
+             dict(depth=1, gas=997, gasCost=800),
+             dict(depth=2, gas=700, gasCost=100),
+             dict(depth=2, gas=600, gasCost=200),
+             dict(depth=1, gas=497, gasCost=0)]
+    assert stepCosts(steps) == [3, 200, 100, 200, 0]
+    assert sum(stepCosts(steps)) == 1000 - 497
+
+def test_profile_create_table(networks, accounts, deck, room, game):
+    config = (100, 200, 2, 1, [1, 2, 3], 2, 2, 2, 2, 2, 2, 2)
+    tx = room.createTable(0, config, sender=accounts[0], value="300 wei")
+    profiler = contractProfiler(networks.active_provider.web3.provider.endpoint_uri,
+                                Deck=deck, Room=room, Game=game)
+    stacks = profiler.stacks(tx.txn_hash)
+    assert sum(stacks.values()) == tx.gas_used
+    assert {stack[0] for stack in stacks} == {"Room.(dispatch)", "Room.createTable", OVERHEAD}
+    # Room.createTable calls Deck.newDeck, charged by line
+    assert any(stack[:2] == ("Room.createTable", "Deck.newDeck") and stack[-1].startswith("Deck.vy:")
+               for stack in stacks)
+    table = functionTable(stacks)
+    assert table["Room.createTable"][1] > table["Deck.newDeck"][1] > 0
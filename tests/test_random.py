@@ -0,0 +1,27 @@
+from collections import Counter
+from hodlem.bn254 import N, SeededRandom
+from hodlem.deck import DeckClient, shuffleArray
+
+def test_seeded_random_stream():
+    # the same stream as seededRandom in interface/lib.js (deck.js --seed)
+    rng = SeededRandom("hodlem/0xabc")
+    assert rng.bytes(5).hex() == "976fb5d817"
+    assert rng.below(N - 1) == 14643165133657225350477940890798363124109080232524820124596128568890381160789
+
+def test_shuffle_array_uniform():
+    # every ordering, including those leaving cards in place, about equally often
+    rng = SeededRandom(0)
+    counts = Counter()
+    for _ in range(6000):
+        a = [0, 1, 2]
+        shuffleArray(a, rng)
+        counts[tuple(a)] += 1
+    assert len(counts) == 6
+    assert all(800 < n < 1200 for n in counts.values())
+
+def test_seeded_prep_reproducible(tmp_path):
+    address = "0x" + "ab" * 20
+    hashes = [DeckClient(None, str(tmp_path / f"{i}.log"), seed=seed).submitPrep(address, 1)
+              for i, seed in enumerate([7, 7, 8])]
+    assert hashes[0] == hashes[1] != hashes[2]
+    assert DeckClient(None, str(tmp_path / "3.log")).submitPrep(address, 1) != hashes[0]
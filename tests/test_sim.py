@@ -0,0 +1,72 @@
+from hodlem.deck import DeckClient
+from hodlem.sim import POLICIES, Table, simulate, formatComparison
+import asyncio
+import random
+
+def test_simulate_hands(accounts, deck, room, game, tmp_path):
+    config = dict(
+            buyIn=1000,
+            bond=1000,
+            startsWith=2,
+            untilLeft=1,
+            structure=[10, 20, 40],
+            levelBlocks=100,
+            verifRounds=1,
+            prepBlocks=1000,
+            shuffBlocks=1000,
+            verifBlocks=1000,
+            dealBlocks=1000,
+            actBlocks=1000)
+    seated = [accounts[0:2], accounts[2:4]]
+    clients = [[DeckClient(deck, str(tmp_path / f"{p.address}.log")) for p in table] for table in seated]
+    policies = [[POLICIES["raise"], POLICIES["call"]], [POLICIES["random"], POLICIES["call"]]]
+    report = asyncio.run(simulate(room, game, deck, config, seated, clients, policies, 2, maxHands=2))
+    assert not report["errors"], report["errors"]
+    assert report["hands"] == 4
+    assert report["txs"] == sum(m["count"] for m in report["methods"].values())
+    assert {"prep", "shuffle", "deal", "play"} <= set(report["phases"])
+
+def foldPolicy(rng, view):
+    return ("fold",) if view["toCall"] else ("call",)
+
+def test_tournament_to_game_over(accounts, chain, deck, room, game, tmp_path):
+    # seats 0 and 1 raise until all in and seat 2 folds to any bet, until one is left;
+    # seat 0 is knocked out first, so the Room shuffles and decrypts for it while the
+    # others play on
+    config = dict(
+            buyIn=200,
+            bond=1000,
+            startsWith=3,
+            untilLeft=1,
+            structure=[10, 20, 40],
+            levelBlocks=100,
+            verifRounds=1,
+            prepBlocks=1000,
+            shuffBlocks=1000,
+            verifBlocks=1000,
+            dealBlocks=1000,
+            actBlocks=1000)
+    players = accounts[0:3]
+    seed = 1
+    clients = [DeckClient(deck, str(tmp_path / f"{p.address}.log"), seed=seed) for p in players]
+    policies = [POLICIES["raise"], POLICIES["raise"], foldPolicy]
+    start = chain.blocks.height
+    table = Table(room, game, deck, config, players, clients, policies, random.Random(seed), 0)
+    stats = asyncio.run(table.run())
+    assert stats.error is None, stats.error
+    assert stats.finished
+    logs = list(room.Eliminate.range(start, chain.blocks.height + 1,
+                                     search_topics=dict(table=table.tableId)))
+    # (every hand re-eliminates the seats already out)
+    assert logs[0].event_arguments["seat"] == 0
+    assert logs[0].block_number < logs[-1].block_number
+    assert room.phaseCommit(table.tableId)[0] == 0
+
+def test_format_comparison():
+    before = dict(gasPerHand=2000, methods=dict(callBet=dict(meanGas=400), drawCard=dict(meanGas=100)))
+    after = dict(gasPerHand=1500, methods=dict(callBet=dict(meanGas=300), fold=dict(meanGas=50)))
+    lines = formatComparison(before, after).splitlines()
+    assert lines[1].split() == ["gas", "per", "hand", "2000", "1500", "-25.0%"]
+    assert [line.split()[0] for line in lines[2:]] == ["callBet", "drawCard", "fold"]
+    assert lines[3].split() == ["drawCard", "100", "0", "-100.0%"]
+    assert lines[4].split() == ["fold", "0", "50"]